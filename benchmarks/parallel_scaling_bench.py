@@ -0,0 +1,51 @@
+# benchmarks/parallel_scaling_bench.py
+# Scaling of ParallelLogAnalyzer (summary + one filtered ID) across worker counts, against the
+# single-process CanAnalyzer.load_log_data + get_message_summary path on the same log.
+# Usage: python benchmarks/parallel_scaling_bench.py [rows] [max_workers]
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from can_analyzer import CanAnalyzer
+from can_parallel import ParallelLogAnalyzer
+from typed_schema_bench import write_synthetic_log
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2000000
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench_log.csv')
+        write_synthetic_log(path, rows)
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+        print(f"{rows} rows, {size_mb:.0f} MB CSV, {os.cpu_count()} CPUs")
+
+        analyzer = CanAnalyzer(path)
+        start = time.perf_counter()
+        analyzer.load_log_data()
+        expected = analyzer.get_message_summary()
+        expected_rows = len(analyzer.filter_by_can_id(0x123))
+        baseline = time.perf_counter() - start
+        print(f"{'single process':>16}: {baseline:7.2f} s")
+
+        workers = 1
+        while workers <= max_workers:
+            # Enough chunks per worker to balance load
+            chunk_bytes = max(1 << 20, int(os.path.getsize(path) / (workers * 4)))
+            parallel = ParallelLogAnalyzer(path, workers=workers, chunk_bytes=chunk_bytes)
+            start = time.perf_counter()
+            stats, filtered = parallel.run(can_ids=[0x123])
+            elapsed = time.perf_counter() - start
+            summary = stats.summary()
+            same = (summary['total_messages'] == expected['total_messages']
+                    and summary['unique_can_ids'] == expected['unique_can_ids']
+                    and summary['start_time'] == expected['start_time']
+                    and summary['end_time'] == expected['end_time']
+                    and len(filtered[0x123]) == expected_rows)
+            print(f"{workers:>8} workers: {elapsed:7.2f} s  speedup {baseline / elapsed:5.2f}x  "
+                  f"results match: {same}")
+            workers *= 2
+
+if __name__ == "__main__":
+    main()
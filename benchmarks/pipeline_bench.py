@@ -0,0 +1,266 @@
+# benchmarks/pipeline_bench.py
+# End-to-end throughput/latency benchmarks on the virtual bus:
+#   receive  - CanInterface Notifier callback: frames/s, send->callback latency, drops
+#   logger   - CanLogger.log_message per format and flush policy: frames/s, drops, queue high-water
+#   display  - CanBusApp receive->render latency with Tk replaced by a headless stub
+#   analyzer - CanAnalyzer load/summary/filter times across log sizes
+# Every section also records the process peak RSS so far. Results go to stdout and, with --output,
+# to a JSON file that can be diffed against earlier runs.
+# Usage: python benchmarks/pipeline_bench.py [--rate 5000] [--duration 3] [--sizes 100000 1000000]
+#                                            [--sections receive logger display analyzer] [--output run.json]
+import os
+import sys
+import json
+import time
+import types
+import random
+import argparse
+import platform
+import tempfile
+import threading
+
+import numpy as np
+import can
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import CAN_BUSTYPE, CAN_BITRATE, LOG_FORMAT
+from can_interface import CanInterface
+from can_logger import CanLogger, BinaryCanLogger
+from typed_schema_bench import write_synthetic_log
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024 # bytes on macOS, KiB elsewhere
+
+def latency_stats(latencies):
+    if not len(latencies):
+        return {'p50_ms': None, 'p99_ms': None, 'max_ms': None}
+    values = np.asarray(latencies) * 1000.0
+    return {'p50_ms': float(np.percentile(values, 50)), 'p99_ms': float(np.percentile(values, 99)),
+            'max_ms': float(values.max())}
+
+class TrafficGenerator:
+    # Synthetic frames at a target rate. id_mix maps CAN ID -> relative weight, dlc_mix maps DLC -> weight;
+    # IDs above 0x7FF are sent as extended frames.
+    def __init__(self, rate, id_mix=None, dlc_mix=None, seed=1):
+        self.rate = rate
+        self.id_mix = id_mix or {0x100 + i: 1 for i in range(32)}
+        self.dlc_mix = dlc_mix or {8: 8, 4: 1, 2: 1}
+        self.random = random.Random(seed)
+
+    def messages(self, count):
+        ids = self.random.choices(list(self.id_mix), weights=list(self.id_mix.values()), k=count)
+        dlcs = self.random.choices(list(self.dlc_mix), weights=list(self.dlc_mix.values()), k=count)
+        return [can.Message(arbitration_id=can_id, is_extended_id=can_id > 0x7FF,
+                            data=bytes((i + b) & 0xFF for b in range(dlc)))
+                for i, (can_id, dlc) in enumerate(zip(ids, dlcs))]
+
+    def run(self, send, duration):
+        # Calls send(msg) at self.rate for duration seconds, paced by absolute deadlines.
+        # Frames are stamped with time.time() at send so receivers can compute latency.
+        pool = self.messages(4096)
+        period = 1.0 / self.rate
+        clock = time.perf_counter
+        start = clock()
+        sent = 0
+        total = int(duration * self.rate)
+        while sent < total:
+            deadline = start + sent * period
+            remaining = deadline - clock()
+            if remaining > 0.001:
+                time.sleep(remaining)
+            msg = pool[sent % len(pool)]
+            msg.timestamp = time.time()
+            send(msg)
+            sent += 1
+        return sent, clock() - start
+
+def bench_receive(rate, duration, channel='bench_rx'):
+    received = []
+    latencies = []
+    def callback(msg):
+        latencies.append(time.time() - msg.timestamp)
+        received.append(1)
+
+    receiver = CanInterface(channel, CAN_BUSTYPE, CAN_BITRATE)
+    receiver.connect()
+    receiver.start_listening(callback=callback)
+    sender = can.interface.Bus(channel=channel, interface=CAN_BUSTYPE, preserve_timestamps=True)
+    sent, elapsed = TrafficGenerator(rate).run(sender.send, duration)
+    time.sleep(0.5) # Let the Notifier drain
+    receiver.disconnect()
+    sender.shutdown()
+    return {'target_rate': rate, 'frames_sent': sent, 'frames_received': len(received),
+            'dropped': sent - len(received), 'frames_per_second': len(received) / elapsed,
+            **latency_stats(latencies), 'peak_rss_mb': peak_rss_mb()}
+
+LOGGER_CASES = [
+    # name, backend, logger options
+    ('csv sync flush-every-frame', 'csv', dict()),
+    ('csv sync flush-1000', 'csv', dict(flush_every_n=1000)),
+    ('csv async flush-1000/500ms', 'csv', dict(async_mode=True, flush_every_n=1000, flush_interval_ms=500)),
+    ('binary sync flush-1000', 'binary', dict(flush_every_n=1000)),
+    ('binary async flush-1000/500ms', 'binary', dict(async_mode=True, flush_every_n=1000, flush_interval_ms=500)),
+]
+
+def bench_logger(frame_count, tmp):
+    msgs = TrafficGenerator(0).messages(frame_count)
+    for i, msg in enumerate(msgs):
+        msg.timestamp = i * 0.0001
+    results = {}
+    for name, backend, options in LOGGER_CASES:
+        path = os.path.join(tmp, f"bench_{backend}.log")
+        if os.path.exists(path):
+            os.remove(path)
+        logger = BinaryCanLogger(path, **options) if backend == 'binary' else CanLogger(path, LOG_FORMAT, **options)
+        logger._open_file()
+        start = time.perf_counter()
+        for msg in msgs:
+            logger.log_message(msg)
+        call_time = time.perf_counter() - start
+        logger.close() # Includes draining the async queue
+        total_time = time.perf_counter() - start
+        results[name] = {'frames': frame_count, 'frames_per_second': frame_count / total_time,
+                         'call_frames_per_second': frame_count / call_time,
+                         'dropped': logger.frames_dropped, 'queue_high_water': logger.queue_high_water,
+                         'bytes': os.path.getsize(path), 'peak_rss_mb': peak_rss_mb()}
+    return results
+
+class _Widget:
+    # Just enough of a Tk widget for CanBusApp to run headless
+    def __init__(self, *args, **kwargs):
+        self.line_count = 1
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+    def insert(self, index, text, *args, **kwargs):
+        if isinstance(text, str):
+            self.line_count += text.count('\n')
+    def delete(self, first, last=None, *args):
+        if last is not None and isinstance(last, str) and last[0].isdigit():
+            self.line_count -= int(last.split('.')[0]) - 1
+        else:
+            self.line_count = 1
+    def index(self, index):
+        return f"{self.line_count}.0"
+
+class _HeadlessMaster(_Widget):
+    # after() callbacks are collected and run by tick()
+    def __init__(self):
+        super().__init__()
+        self.pending = []
+    def after(self, ms, callback=None, *args):
+        if callback is not None:
+            self.pending.append((callback, args))
+        return 'after'
+    def tick(self):
+        pending, self.pending = self.pending, []
+        for callback, args in pending:
+            callback(*args)
+
+def install_headless_tk():
+    tk = types.ModuleType('tkinter')
+    for name in ('Tk', 'Button', 'Label', 'LabelFrame', 'Frame', 'Text', 'Toplevel', 'Checkbutton', 'Entry',
+                 'Scrollbar', 'StringVar', 'BooleanVar', 'IntVar'):
+        setattr(tk, name, _Widget)
+    for name in ('LEFT', 'RIGHT', 'TOP', 'BOTTOM', 'END', 'DISABLED', 'NORMAL', 'BOTH', 'X', 'Y', 'W', 'E'):
+        setattr(tk, name, name.lower())
+    scrolledtext = types.ModuleType('tkinter.scrolledtext')
+    scrolledtext.ScrolledText = _Widget
+    messagebox = types.ModuleType('tkinter.messagebox')
+    for name in ('showerror', 'showinfo', 'showwarning'):
+        setattr(messagebox, name, lambda *args, **kwargs: None)
+    messagebox.askyesno = lambda *args, **kwargs: False
+    ttk = types.ModuleType('tkinter.ttk')
+    for name in ('Treeview', 'Scrollbar', 'Frame', 'Label', 'Button', 'Progressbar'):
+        setattr(ttk, name, _Widget)
+    tk.scrolledtext, tk.messagebox, tk.ttk = scrolledtext, messagebox, ttk
+    backend = types.ModuleType('matplotlib.backends.backend_tkagg')
+    backend.FigureCanvasTkAgg = _Widget
+    sys.modules.update({'tkinter': tk, 'tkinter.scrolledtext': scrolledtext, 'tkinter.messagebox': messagebox,
+                        'tkinter.ttk': ttk, 'matplotlib.backends.backend_tkagg': backend})
+
+def bench_display(rate, duration):
+    install_headless_tk()
+    import main
+    master = _HeadlessMaster()
+    app = main.CanBusApp(master)
+    latencies = []
+    format_message = app._format_message
+    def timed_format(msg):
+        latencies.append(time.time() - msg.timestamp) # Frame rendered on this tick
+        return format_message(msg)
+    app._format_message = timed_format
+
+    stop = threading.Event()
+    def gui_loop():
+        # Stand-in for the Tk mainloop: run due after() callbacks every DISPLAY_REFRESH_MS
+        while not stop.is_set():
+            master.tick()
+            time.sleep(main.DISPLAY_REFRESH_MS / 1000.0)
+    gui = threading.Thread(target=gui_loop, daemon=True)
+    gui.start()
+    sent, elapsed = TrafficGenerator(rate).run(app.display_message, duration) # Called as the Notifier would
+    time.sleep(0.2)
+    stop.set()
+    gui.join()
+    return {'target_rate': rate, 'frames_sent': sent, 'frames_received': app.frames_received,
+            'frames_displayed': app.frames_displayed, 'display_dropped': app.frames_display_dropped,
+            'queue_dropped': app.frames_queue_dropped, 'frames_per_second': app.frames_received / elapsed,
+            **latency_stats(latencies), 'peak_rss_mb': peak_rss_mb()}
+
+def bench_analyzer(sizes, tmp):
+    from can_analyzer import CanAnalyzer
+    results = {}
+    for rows in sizes:
+        path = os.path.join(tmp, f"bench_{rows}.csv")
+        write_synthetic_log(path, rows)
+        analyzer = CanAnalyzer(path)
+        timings = {}
+        for name, step in (('load_s', analyzer.load_log_data), ('summary_s', analyzer.get_message_summary),
+                           ('filter_s', lambda: analyzer.filter_by_can_id(0x123))):
+            start = time.perf_counter()
+            step()
+            timings[name] = time.perf_counter() - start
+        results[str(rows)] = {**timings, 'frames_per_second': rows / timings['load_s'],
+                              'csv_mb': os.path.getsize(path) / 1e6, 'peak_rss_mb': peak_rss_mb()}
+        os.remove(path)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput/latency benchmarks on the virtual CAN bus")
+    parser.add_argument('--rate', type=int, nargs='+', default=[1000, 5000, 20000], help="Frames/s for receive/display")
+    parser.add_argument('--duration', type=float, default=3.0)
+    parser.add_argument('--logger-frames', type=int, default=200000)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100000, 1000000], help="Rows for analyzer runs")
+    parser.add_argument('--sections', nargs='+', default=['receive', 'logger', 'display', 'analyzer'])
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = {'python': platform.python_version(), 'python_can': can.__version__, 'platform': platform.platform(),
+               'cpus': os.cpu_count(), 'started': time.strftime('%Y-%m-%dT%H:%M:%S'), 'sections': {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        if 'receive' in args.sections:
+            results['sections']['receive'] = [bench_receive(rate, args.duration, f"bench_rx_{rate}")
+                                              for rate in args.rate]
+        if 'logger' in args.sections:
+            results['sections']['logger'] = bench_logger(args.logger_frames, tmp)
+        if 'display' in args.sections:
+            results['sections']['display'] = [bench_display(rate, args.duration) for rate in args.rate]
+        if 'analyzer' in args.sections:
+            results['sections']['analyzer'] = bench_analyzer(args.sizes, tmp)
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
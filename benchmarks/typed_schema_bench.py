@@ -0,0 +1,69 @@
+# benchmarks/typed_schema_bench.py
+# Compares the old string-column representation ('0x123' IDs, hex data strings) with the
+# typed representation produced by CanAnalyzer.load_log_data (uint32 IDs + uint8 payload matrix).
+# Usage: python benchmarks/typed_schema_bench.py [rows]
+import os
+import sys
+import csv
+import time
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from can_analyzer import CanAnalyzer
+
+def write_synthetic_log(path, rows, seed=1):
+    rng = np.random.default_rng(seed)
+    ids = rng.choice(np.arange(0x100, 0x180), size=rows)
+    payload = rng.integers(0, 256, size=(rows, 8), dtype=np.uint8)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['timestamp', 'arbitration_id', 'is_extended_id', 'is_remote_frame', 'is_error_frame', 'dlc', 'data'])
+        for i in range(rows):
+            writer.writerow([i * 0.0002, f"0x{ids[i]:X}", False, False, False, 8, payload[i].tobytes().hex()])
+
+def timed(fn, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench_log.csv')
+        write_synthetic_log(path, rows)
+
+        load_strings, string_df = timed(lambda: pd.read_csv(path), repeat=1)
+        analyzer = CanAnalyzer(path)
+        load_typed, _ = timed(analyzer.load_log_data, repeat=1)
+        typed_df = analyzer.df
+
+        string_mem = string_df.memory_usage(deep=True).sum()
+        typed_mem = typed_df.memory_usage(deep=True).sum() + analyzer.payload.nbytes
+
+        # Query 1: all frames of 0x100
+        string_filter, _ = timed(lambda: string_df[string_df['arbitration_id'] == '0x100'])
+        typed_filter, _ = timed(lambda: typed_df[typed_df['arbitration_id'].to_numpy() == 0x100])
+
+        # Query 2: frames of 0x100 where byte 2 > 0x80
+        def string_byte_query():
+            subset = string_df[string_df['arbitration_id'] == '0x100']
+            return subset[[bytes.fromhex(data)[2] > 0x80 for data in subset['data']]]
+        string_bytes, string_hits = timed(string_byte_query)
+        typed_bytes, typed_mask = timed(lambda: analyzer.payload_mask(2, '>', 0x80, can_id=0x100))
+        assert len(string_hits) == int(typed_mask.sum())
+
+    print(f"rows: {rows}")
+    print(f"{'':28}{'strings':>12}{'typed':>12}")
+    print(f"{'load (s)':28}{load_strings:>12.3f}{load_typed:>12.3f}")
+    print(f"{'memory (MB)':28}{string_mem / 1e6:>12.1f}{typed_mem / 1e6:>12.1f}")
+    print(f"{'filter by ID (ms)':28}{string_filter * 1e3:>12.2f}{typed_filter * 1e3:>12.2f}")
+    print(f"{'ID + byte 2 > 0x80 (ms)':28}{string_bytes * 1e3:>12.2f}{typed_bytes * 1e3:>12.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,363 @@
 # can_analyzer.py
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from collections import Counter
+import io
 import os
+import operator
+
+from can_logger import (BINARY_LOG_MAGIC, BINARY_LOG_VERSION, BINARY_HEADER_STRUCT, BINARY_FLAG_EXTENDED,
+                        BINARY_FLAG_REMOTE, BINARY_FLAG_ERROR)
+from can_archive import ArchiveReader, ArchiveWriter, is_archive_log, ARCHIVE_CHUNK_ROWS
+from can_index import load_index
+from can_dbc import load_dbc, SignalDecoder
+from can_stats import frame_bit_length
+from config import CAN_BITRATE, DBC_FILE_PATH
+
+def binary_record_dtype(payload_size):
+    # Must match can_logger.binary_record_struct (packed, little endian)
+    return np.dtype([
+        ('timestamp', '<f8'),
+        ('arbitration_id', '<u4'),
+        ('flags', 'u1'),
+        ('dlc', 'u1'),
+        ('data', 'u1', (payload_size,)),
+    ])
+
+def records_to_frame(records):
+    # DataFrame + payload matrix over binary-layout records (binary log memory map or ring buffer view).
+    # Timestamp, ID and DLC columns are strided views into the records (no copy).
+    # Only the flag columns are materialized since they are unpacked from one byte.
+    flags = records['flags']
+    df = pd.DataFrame({
+        'timestamp': records['timestamp'],
+        'arbitration_id': records['arbitration_id'],
+        'is_extended_id': (flags & BINARY_FLAG_EXTENDED).astype(bool),
+        'is_remote_frame': (flags & BINARY_FLAG_REMOTE).astype(bool),
+        'is_error_frame': (flags & BINARY_FLAG_ERROR).astype(bool),
+        'dlc': records['dlc'],
+    }, copy=False)
+    return df, records['data']
+
+def is_binary_log(log_file_path):
+    with open(log_file_path, 'rb') as f:
+        return f.read(len(BINARY_LOG_MAGIC)) == BINARY_LOG_MAGIC
+
+def format_can_id(can_id):
+    return f"0x{int(can_id):X}"
+
+# Hex digit value per ASCII code; every other byte (NUL padding, the 'x' of '0x') maps to -1
+_HEX_LUT = np.full(256, -1, dtype=np.int8)
+for _i, _c in enumerate(b'0123456789abcdef'):
+    _HEX_LUT[_c] = _i
+    _HEX_LUT[bytes([_c]).upper()[0]] = _i
+
+def parse_hex_ids(values):
+    # '0x1AB' strings -> uint32, one vectorized pass per character column instead of int(x, 16) per row
+    strings = np.asarray(values, dtype='S')
+    if strings.size == 0 or strings.itemsize == 0:
+        return np.zeros(len(strings), dtype=np.uint32)
+    digits = _HEX_LUT[strings.view(np.uint8).reshape(len(strings), strings.itemsize)]
+    result = np.zeros(len(strings), dtype=np.uint64)
+    for column in digits.T:
+        valid = column >= 0
+        result[valid] = result[valid] * 16 + column[valid].astype(np.uint64)
+    return result.astype(np.uint32)
+
+def decode_hex_payload(values, width=None):
+    # Hex data strings -> N x width uint8 matrix (zero padded). width defaults to 8, or 64 for CAN FD logs.
+    strings = np.asarray(values, dtype='S')
+    if width is None:
+        width = 8 if strings.itemsize <= 16 else 64
+    strings = strings.astype(f'S{2 * width}')
+    nibbles = _HEX_LUT[strings.view(np.uint8).reshape(len(strings), width, 2)]
+    nibbles[nibbles < 0] = 0
+    return (nibbles[:, :, 0] * 16 + nibbles[:, :, 1]).astype(np.uint8)
+
+def payload_to_hex(payload, dlc):
+    # Inverse of decode_hex_payload for a (small) selection of rows
+    return [row[:length].tobytes().hex() for row, length in zip(payload, dlc)]
+
+_COMPARISONS = {
+    '>': operator.gt, '>=': operator.ge, '<': operator.lt, '<=': operator.le, '==': operator.eq, '!=': operator.ne,
+}
+
+def to_typed_frame(raw_df):
+    # CSV-shaped frame ('0x123' IDs, hex data strings) -> typed frame plus N x 8/64 uint8 payload matrix
+    df = raw_df.drop(columns=['data']) if 'data' in raw_df.columns else raw_df.copy()
+    if 'arbitration_id' in df.columns:
+        df['arbitration_id'] = parse_hex_ids(df['arbitration_id'].to_numpy(dtype=object))
+    for flag in ('is_extended_id', 'is_remote_frame', 'is_error_frame'):
+        if flag in df.columns and df[flag].dtype != bool: # read_csv already parses True/False columns
+            df[flag] = df[flag].astype(str).str.lower().eq('true').to_numpy()
+    if 'dlc' in df.columns:
+        df['dlc'] = df['dlc'].astype(np.uint8)
+    payload = None
+    if 'data' in raw_df.columns:
+        payload = decode_hex_payload(raw_df['data'].fillna('').to_numpy(dtype=object))
+    return df, payload
+
+# can_stats.frame_bit_length over (dlc, extended, remote, fd), one table per stuffing setting
+_FRAME_BIT_LENGTHS = {
+    stuffing: np.array([[[[frame_bit_length(d, e, r, f, stuffing) for f in (False, True)]
+                          for r in (False, True)] for e in (False, True)] for d in range(65)], dtype=np.int64)
+    for stuffing in (False, True)
+}
+
+def frame_bit_lengths(dlc, is_extended_id, is_remote_frame, is_fd=None, stuffing=False):
+    # Vectorized can_stats.frame_bit_length through the precomputed lookup table
+    table = _FRAME_BIT_LENGTHS[bool(stuffing)]
+    dlc = np.minimum(np.asarray(dlc, dtype=np.int64), 64)
+    fd = np.zeros(len(dlc), dtype=np.int64) if is_fd is None else np.asarray(is_fd, dtype=np.int64)
+    return table[dlc, np.asarray(is_extended_id, dtype=np.int64), np.asarray(is_remote_frame, dtype=np.int64), fd]
+
+def archive_columns_to_frame(columns):
+    # Column dict from ArchiveReader -> typed frame plus payload matrix (same shape as load_log_data)
+    flags = columns['flags']
+    df = pd.DataFrame({
+        'timestamp': columns['timestamp'],
+        'arbitration_id': columns['arbitration_id'],
+        'is_extended_id': (flags & BINARY_FLAG_EXTENDED).astype(bool),
+        'is_remote_frame': (flags & BINARY_FLAG_REMOTE).astype(bool),
+        'is_error_frame': (flags & BINARY_FLAG_ERROR).astype(bool),
+        'dlc': columns['dlc'],
+    })
+    if 'channel' in columns:
+        df['channel'] = columns['channel']
+    return df, columns['payload']
+
+def _flags_from_frame(df):
+    flags = np.zeros(len(df), dtype=np.uint8)
+    for column, bit in (('is_extended_id', BINARY_FLAG_EXTENDED), ('is_remote_frame', BINARY_FLAG_REMOTE),
+                        ('is_error_frame', BINARY_FLAG_ERROR)):
+        if column in df.columns:
+            flags |= np.where(df[column].to_numpy(dtype=bool), bit, 0).astype(np.uint8)
+    return flags
+
+def convert_to_archive(log_file_path, archive_path, codec='zlib', chunk_rows=ARCHIVE_CHUNK_ROWS, payload_size=None):
+    # CSV or binary log -> compressed columnar archive (see can_archive.py), streamed chunk by chunk.
+    # payload_size defaults to that of the source (64 for CAN FD logs). Returns the number of frames.
+    writer = None
+    try:
+        if is_binary_log(log_file_path):
+            with open(log_file_path, 'rb') as f:
+                _, _, source_payload, _ = BINARY_HEADER_STRUCT.unpack(f.read(BINARY_HEADER_STRUCT.size))
+            dtype = binary_record_dtype(source_payload)
+            record_count = (os.path.getsize(log_file_path) - BINARY_HEADER_STRUCT.size) // dtype.itemsize
+            writer = ArchiveWriter(archive_path, codec, chunk_rows, payload_size or source_payload)
+            if record_count > 0:
+                records = np.memmap(log_file_path, dtype=dtype, mode='r', offset=BINARY_HEADER_STRUCT.size,
+                                    shape=(record_count,))
+                for start in range(0, record_count, chunk_rows):
+                    chunk = records[start:start + chunk_rows]
+                    writer.append(chunk['timestamp'], chunk['arbitration_id'], chunk['flags'], chunk['dlc'],
+                                  chunk['data'])
+        else:
+            reader = pd.read_csv(log_file_path, chunksize=chunk_rows, keep_default_na=False,
+                                 dtype={'arbitration_id': str, 'data': str, 'channel': str})
+            for raw_chunk in reader:
+                df, payload = to_typed_frame(raw_chunk)
+                if payload is None:
+                    payload = np.zeros((len(df), 8), dtype=np.uint8)
+                if writer is None:
+                    writer = ArchiveWriter(archive_path, codec, chunk_rows, payload_size or payload.shape[1])
+                elif payload.shape[1] > writer.payload_size and df['dlc'].max() > writer.payload_size:
+                    raise ValueError("CAN FD frames found after classic ones; convert with payload_size=64")
+                writer.append(df['timestamp'].to_numpy(), df['arbitration_id'].to_numpy(), _flags_from_frame(df),
+                              df['dlc'].to_numpy(), payload,
+                              df['channel'].to_numpy() if 'channel' in df.columns else None)
+            if writer is None:
+                writer = ArchiveWriter(archive_path, codec, chunk_rows, payload_size or 8) # Header-only log
+    except pd.errors.EmptyDataError:
+        writer = ArchiveWriter(archive_path, codec, chunk_rows, payload_size or 8)
+    finally:
+        if writer is not None:
+            writer.close()
+    return writer.rows_written
+
+STREAM_CHUNK_ROWS = 500000 # Rows per chunk in streaming mode; bounds peak memory
+
+def iter_log_chunks(log_file_path, chunksize=STREAM_CHUNK_ROWS, progress_callback=None):
+    # Yields the log as DataFrames of at most `chunksize` rows, for CSV and binary logs alike.
+    # progress_callback(fraction) is called after every chunk with the share of the file consumed.
+    total_size = os.path.getsize(log_file_path) or 1
+    if is_archive_log(log_file_path):
+        reader = ArchiveReader(log_file_path)
+        rows_read = 0
+        for columns in reader.iter_chunks():
+            df, _ = archive_columns_to_frame(columns)
+            yield df
+            rows_read += len(df)
+            if progress_callback:
+                progress_callback(rows_read / max(reader.rows, 1))
+        return
+    if is_binary_log(log_file_path):
+        with open(log_file_path, 'rb') as f:
+            _, _, payload_size, _ = BINARY_HEADER_STRUCT.unpack(f.read(BINARY_HEADER_STRUCT.size))
+        dtype = binary_record_dtype(payload_size)
+        record_count = (total_size - BINARY_HEADER_STRUCT.size) // dtype.itemsize
+        if record_count <= 0:
+            return
+        records = np.memmap(log_file_path, dtype=dtype, mode='r', offset=BINARY_HEADER_STRUCT.size,
+                            shape=(record_count,))
+        for start in range(0, record_count, chunksize):
+            chunk = records[start:start + chunksize]
+            flags = chunk['flags']
+            yield pd.DataFrame({
+                'timestamp': chunk['timestamp'],
+                'arbitration_id': chunk['arbitration_id'],
+                'is_extended_id': (flags & BINARY_FLAG_EXTENDED).astype(bool),
+                'is_remote_frame': (flags & BINARY_FLAG_REMOTE).astype(bool),
+                'is_error_frame': (flags & BINARY_FLAG_ERROR).astype(bool),
+                'dlc': chunk['dlc'],
+            })
+            if progress_callback:
+                progress_callback(min(start + chunksize, record_count) / record_count)
+        return
+
+    with open(log_file_path, 'rb') as f:
+        try:
+            for chunk in pd.read_csv(f, chunksize=chunksize):
+                yield chunk
+                if progress_callback:
+                    progress_callback(min(f.tell() / total_size, 1.0))
+        except pd.errors.EmptyDataError:
+            return
+
+class StreamingLogSummary:
+    # Incremental aggregates over log chunks. State grows with the number of distinct IDs
+    # and DLC values only, so peak memory does not depend on the log size.
+    def __init__(self):
+        self.total_messages = 0
+        self.id_counts = Counter() # '0x123' -> count
+        self.channel_counts = Counter() # Multi-bus logs only
+        self.dlc_counts = Counter()
+        self.first_seen = {} # '0x123' -> first timestamp
+        self.last_seen = {} # '0x123' -> last timestamp
+        self.start_time = None
+        self.end_time = None
+
+    def update(self, chunk):
+        if chunk.empty:
+            return
+        self.total_messages += len(chunk)
+
+        per_id = chunk.groupby('arbitration_id', sort=False)['timestamp'].agg(['count', 'min', 'max'])
+        integer_ids = pd.api.types.is_integer_dtype(chunk['arbitration_id'])
+        for can_id, count, first, last in zip(per_id.index, per_id['count'], per_id['min'], per_id['max']):
+            key = format_can_id(can_id) if integer_ids else can_id
+            self.id_counts[key] += int(count)
+            if key not in self.first_seen or first < self.first_seen[key]:
+                self.first_seen[key] = first
+            if key not in self.last_seen or last > self.last_seen[key]:
+                self.last_seen[key] = last
+
+        if 'channel' in chunk.columns:
+            for channel, count in chunk['channel'].astype(str).value_counts().items():
+                self.channel_counts[channel] += int(count)
+
+        for dlc, count in chunk['dlc'].value_counts().items():
+            self.dlc_counts[int(dlc)] += int(count)
+
+        chunk_start = chunk['timestamp'].min()
+        chunk_end = chunk['timestamp'].max()
+        self.start_time = chunk_start if self.start_time is None else min(self.start_time, chunk_start)
+        self.end_time = chunk_end if self.end_time is None else max(self.end_time, chunk_end)
+
+    def merge(self, other):
+        # Fold in the aggregates of another (disjoint) part of the log, e.g. from a parallel worker
+        self.total_messages += other.total_messages
+        self.id_counts.update(other.id_counts)
+        self.channel_counts.update(other.channel_counts)
+        self.dlc_counts.update(other.dlc_counts)
+        for key, first in other.first_seen.items():
+            if key not in self.first_seen or first < self.first_seen[key]:
+                self.first_seen[key] = first
+        for key, last in other.last_seen.items():
+            if key not in self.last_seen or last > self.last_seen[key]:
+                self.last_seen[key] = last
+        if other.start_time is not None:
+            self.start_time = other.start_time if self.start_time is None else min(self.start_time, other.start_time)
+            self.end_time = other.end_time if self.end_time is None else max(self.end_time, other.end_time)
+        return self
+
+    def message_frequency(self, top_n=10):
+        # Same shape as df['arbitration_id'].value_counts().head(top_n)
+        return pd.Series(dict(self.id_counts.most_common(top_n)), name='count', dtype='int64')
+
+    def summary(self):
+        # Same keys as CanAnalyzer.get_message_summary
+        if not self.total_messages:
+            return None
+        summary = {
+            "total_messages": self.total_messages,
+            "unique_can_ids": len(self.id_counts),
+            "most_common_ids": dict(self.id_counts.most_common(5)),
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "duration_seconds": self.end_time - self.start_time
+        }
+        if self.channel_counts:
+            summary["messages_per_channel"] = dict(self.channel_counts.most_common())
+        return summary
+
+class AnalysisCancelled(Exception):
+    pass
+
+def analyze_log_file(log_file_path, top_n=10, chunksize=STREAM_CHUNK_ROWS, progress_queue=None, cancel_event=None):
+    # Summary + top-N frequency of a log in one streaming pass. Meant to run in a worker process:
+    # arguments and result are plain picklable values, progress fractions are put on
+    # progress_queue and the pass stops at the next chunk once cancel_event is set.
+    # Returns None if the log is missing/empty, raises AnalysisCancelled when cancelled.
+    if not os.path.exists(log_file_path):
+        return None
+    stats = StreamingLogSummary()
+    progress_callback = progress_queue.put if progress_queue is not None else None
+    for chunk in iter_log_chunks(log_file_path, chunksize, progress_callback):
+        if cancel_event is not None and cancel_event.is_set():
+            raise AnalysisCancelled()
+        stats.update(chunk)
+    summary = stats.summary()
+    if summary is None:
+        return None
+    frequency = stats.message_frequency(top_n)
+    return {
+        'log_file_path': log_file_path,
+        'summary': summary,
+        'frequency': [(str(can_id), int(count)) for can_id, count in frequency.items()],
+    }
+
+# Set in analysis worker processes by init_analysis_worker; multiprocessing queues/events can only be
+# handed to a pool worker when it starts, not with each submitted job
+_worker_progress_queue = None
+_worker_cancel_event = None
+
+def init_analysis_worker(progress_queue, cancel_event):
+    global _worker_progress_queue, _worker_cancel_event
+    _worker_progress_queue = progress_queue
+    _worker_cancel_event = cancel_event
+
+def run_analysis_job(log_file_path, top_n=10):
+    # Entry point submitted to a ProcessPoolExecutor created with initializer=init_analysis_worker
+    return analyze_log_file(log_file_path, top_n, progress_queue=_worker_progress_queue,
+                            cancel_event=_worker_cancel_event)
 
 class CanAnalyzer:
     def __init__(self, log_file_path):
         self.log_file_path = log_file_path
         self.df = None
+        self.records = None # Memory-mapped structured array when a binary log is loaded
+        self.payload = None # N x 8 (or 64 for CAN FD) uint8 matrix of data bytes, row-aligned with self.df
+        self.stream_stats = None # StreamingLogSummary from the last stream_summary() call
+        self.signal_decoder = None # SignalDecoder for the DBC passed to decode_signals(); keeps decode plans cached
+        self.signals = None # Tidy per-signal time series from the last decode_signals() call
+        self._dbc_path = None # File the current signal_decoder was loaded from
+        self._timing_cache = {} # Inter-arrival/period/bus-load results for the loaded log; cleared on load
+        self.ring_snapshot = None # RingSnapshot behind self.df after load_ring_snapshot()
 
     def load_log_data(self):
+        self._timing_cache = {}
         if not os.path.exists(self.log_file_path):
             print(f"Error: Log file not found at {self.log_file_path}")
             return False
@@ -17,41 +365,187 @@ class CanAnalyzer:
         # Check if the file is empty (only header or completely empty)
         if os.path.getsize(self.log_file_path) == 0:
             print(f"Log file {self.log_file_path} is empty.")
-            self.df = pd.DataFrame(columns=['timestamp', 'arbitration_id', 'is_extended_id', 'is_remote_frame', 'is_error_frame', 'dlc', 'data'])
+            self._load_empty()
             return True # Return True, but with an empty DataFrame
 
+        if is_archive_log(self.log_file_path):
+            return self._load_archive()
+        if is_binary_log(self.log_file_path):
+            return self._load_binary_log()
+
         try:
-            self.df = pd.read_csv(self.log_file_path)
+            raw_df = pd.read_csv(self.log_file_path, dtype={'arbitration_id': str, 'data': str, 'channel': str},
+                                 keep_default_na=False)
+            # Typed representation: uint32 IDs, bool flags, uint8 DLC and a uint8 payload matrix
+            self.df, self.payload = to_typed_frame(raw_df)
+            self.records = None
             print(f"Loaded {len(self.df)} messages from {self.log_file_path}")
             return True
         except pd.errors.EmptyDataError:
             print(f"Log file {self.log_file_path} contains no data rows (only header or empty).")
-            self.df = pd.DataFrame(columns=['timestamp', 'arbitration_id', 'is_extended_id', 'is_remote_frame', 'is_error_frame', 'dlc', 'data'])
+            self._load_empty()
             return True # Successfully loaded an empty dataframe
         except Exception as e:
             print(f"Error loading log data: {e}")
             return False
 
+    def _load_empty(self):
+        # Empty frame, payload and records together, so nothing from a previously loaded log is left behind
+        self.df, self.payload = to_typed_frame(pd.DataFrame(columns=['timestamp', 'arbitration_id', 'is_extended_id',
+                                                                     'is_remote_frame', 'is_error_frame', 'dlc', 'data']))
+        self.records = None
+
+    def _load_archive(self):
+        try:
+            self.df, self.payload = archive_columns_to_frame(ArchiveReader(self.log_file_path).read())
+        except Exception as e: # Corrupt archive: bad footer or codec errors
+            print(f"Error loading log data: {e}")
+            return False
+        self.records = None
+        print(f"Loaded {len(self.df)} messages from {self.log_file_path} (archive)")
+        return True
+
+    def _read_archive(self, start_time=None, end_time=None, can_ids=None):
+        # Frames from only the archive chunks whose statistics allow a match
+        reader = ArchiveReader(self.log_file_path)
+        chunks = reader.select_chunks(start_time, end_time, can_ids)
+        df, payload = archive_columns_to_frame(reader.read(start_time, end_time, can_ids, chunks=chunks))
+        print(f"Read {len(chunks)} of {len(reader.chunks)} archive chunks")
+        return df, payload
+
+    def _load_binary_log(self):
+        try:
+            with open(self.log_file_path, 'rb') as f:
+                magic, version, payload_size, _ = BINARY_HEADER_STRUCT.unpack(f.read(BINARY_HEADER_STRUCT.size))
+            if version != BINARY_LOG_VERSION:
+                print(f"Error loading log data: unsupported binary log version {version}")
+                return False
+
+            dtype = binary_record_dtype(payload_size)
+            # Ignore a trailing partial record (e.g. capture still running or killed mid-write)
+            record_count = (os.path.getsize(self.log_file_path) - BINARY_HEADER_STRUCT.size) // dtype.itemsize
+            if record_count > 0:
+                self.records = np.memmap(self.log_file_path, dtype=dtype, mode='r',
+                                         offset=BINARY_HEADER_STRUCT.size, shape=(record_count,))
+            else:
+                self.records = np.empty(0, dtype=dtype)
+
+            self.df, self.payload = records_to_frame(self.records)
+            print(f"Loaded {len(self.df)} messages from {self.log_file_path} (binary)")
+            return True
+        except Exception as e:
+            print(f"Error loading log data: {e}")
+            return False
+
+    def load_ring_snapshot(self, ring, last_seconds=None, copy=False):
+        # Analyze the newest frames of a can_ring.FrameRingBuffer instead of a log file, while capture
+        # keeps running. The default is a zero-copy view, valid for ring.headroom further frames
+        # (self.ring_snapshot.intact tells); copy=True detaches it from the ring for longer use.
+        self._timing_cache = {}
+        self.ring_snapshot = ring.snapshot(last_seconds)
+        self.records = self.ring_snapshot.copy() if copy else self.ring_snapshot.records
+        self.df, self.payload = records_to_frame(self.records)
+        window = f"last {last_seconds:g} s" if last_seconds is not None else "all buffered frames"
+        print(f"Loaded {len(self.df)} messages from the ring buffer ({window})")
+        return True
+
+    def stream_summary(self, chunksize=STREAM_CHUNK_ROWS, progress_callback=None):
+        # Out-of-core alternative to load_log_data() + get_message_summary(): the log is read
+        # in bounded chunks and never held in memory as a whole.
+        if not os.path.exists(self.log_file_path):
+            print(f"Error: Log file not found at {self.log_file_path}")
+            return None
+        stats = StreamingLogSummary()
+        try:
+            for chunk in iter_log_chunks(self.log_file_path, chunksize, progress_callback):
+                stats.update(chunk)
+        except Exception as e:
+            print(f"Error streaming log data: {e}")
+            return None
+        self.stream_stats = stats
+        return stats.summary()
+
+    def get_message_frequency(self, top_n=10):
+        # Message counts per ID from the loaded DataFrame, or from the last streaming pass
+        if self.df is not None and not self.df.empty:
+            return self._id_value_counts().head(top_n)
+        if self.stream_stats is not None:
+            return self.stream_stats.message_frequency(top_n)
+        return pd.Series(dtype='int64')
+
+    def _id_value_counts(self):
+        # Binary logs carry integer IDs; present them in the same '0x123' form as CSV logs
+        id_counts = self.df['arbitration_id'].value_counts()
+        if pd.api.types.is_integer_dtype(self.df['arbitration_id']):
+            id_counts.index = [format_can_id(can_id) for can_id in id_counts.index]
+        return id_counts
+
     def get_message_summary(self):
         if self.df is None or self.df.empty:
             print("No data loaded or DataFrame is empty.")
             return None
-        
-        # Convert arbitration_id to numeric for proper unique counting if stored as '0x123'
-        # Or ensure it's loaded as string if you prefer.
-        # Assuming '0xABC' string format for common ID summary
-        
+
+        # IDs are uint32 after loading; most_common_ids keys are presented as '0xABC' strings
         summary = {
             "total_messages": len(self.df),
             "unique_can_ids": self.df['arbitration_id'].nunique(),
-            "most_common_ids": self.df['arbitration_id'].value_counts().head(5).to_dict(),
+            "most_common_ids": self._id_value_counts().head(5).to_dict(),
             "start_time": self.df['timestamp'].min(),
             "end_time": self.df['timestamp'].max(),
             "duration_seconds": self.df['timestamp'].max() - self.df['timestamp'].min()
         }
+        if 'channel' in self.df.columns:
+            summary["messages_per_channel"] = self.df['channel'].astype(str).value_counts().to_dict()
         return summary
 
+    def filter_by_channel(self, channel):
+        # Frames captured on one bus of a multi-channel log
+        if self.df is None or self.df.empty or 'channel' not in self.df.columns:
+            print("No multi-channel data loaded.")
+            return pd.DataFrame()
+        filtered_df = self._select(self.df['channel'].astype(str).to_numpy() == str(channel))
+        print(f"Filtered {len(filtered_df)} messages for channel: {channel}")
+        return filtered_df
+
+    def _current_index(self):
+        # Sidecar index of a CSV log, if one exists and still matches the log on disk
+        if (not os.path.exists(self.log_file_path) or is_binary_log(self.log_file_path)
+                or is_archive_log(self.log_file_path)):
+            return None
+        index = load_index(self.log_file_path)
+        if index is not None and not index.is_current(self.log_file_path):
+            print(f"Index for {self.log_file_path} is stale; rebuild it with can_index.py. Falling back to a full scan.")
+            return None
+        return index
+
+    def _read_csv_rows(self, index, offsets):
+        # Read just the rows at the given byte offsets and parse them in one read_csv call
+        lines = []
+        with open(self.log_file_path, 'rb') as f:
+            for offset in offsets:
+                f.seek(offset)
+                lines.append(f.readline())
+        return pd.read_csv(io.BytesIO(b''.join(lines)), names=index.columns, header=None)
+
+    def _read_csv_range(self, index, start, end):
+        with open(self.log_file_path, 'rb') as f:
+            f.seek(start)
+            chunk = f.read(end - start)
+        return pd.read_csv(io.BytesIO(chunk), names=index.columns, header=None)
+
     def filter_by_can_id(self, can_id):
+        if self.df is None and os.path.exists(self.log_file_path) and is_archive_log(self.log_file_path):
+            filtered_df = self._typed_selection(*self._read_archive(can_ids=[can_id]))
+            print(f"Filtered {len(filtered_df)} messages for CAN ID: 0x{can_id:X} (archive)")
+            return filtered_df
+        if self.df is None:
+            # Nothing loaded: an index lets us read only this ID's rows instead of the whole log
+            index = self._current_index()
+            if index is not None:
+                filtered_df = self._typed_selection(*to_typed_frame(self._read_csv_rows(index, index.offsets_for(can_id))))
+                print(f"Filtered {len(filtered_df)} messages for CAN ID: 0x{can_id:X} (indexed)")
+                return filtered_df
+
         if self.df is None or self.df.empty:
             print("No data loaded. Call load_log_data() first.")
             return pd.DataFrame() # Return empty DataFrame
@@ -59,22 +553,266 @@ class CanAnalyzer:
         # Ensure comparison is consistent (e.g., convert loaded ID to int if needed)
         # Assuming 'arbitration_id' in CSV is stored as '0x123' string
         can_id_hex_str = f"0x{can_id:X}"
-        filtered_df = self.df[self.df['arbitration_id'] == can_id_hex_str]
+        filtered_df = self._select(self.df['arbitration_id'].to_numpy() == can_id)
         print(f"Filtered {len(filtered_df)} messages for CAN ID: {can_id_hex_str}")
         return filtered_df
 
-    def plot_message_frequency(self, top_n=10):
+    def _typed_selection(self, df, payload, mask=None):
+        # Rows of a typed frame, with the selected payload rows re-attached as a hex 'data' column
+        if mask is not None:
+            df = df[mask]
+            payload = payload[mask] if payload is not None else None
+        else:
+            df = df.copy()
+        if payload is not None and 'dlc' in df.columns:
+            df['data'] = payload_to_hex(payload, df['dlc'].to_numpy())
+        return df
+
+    def _select(self, mask):
+        return self._typed_selection(self.df, self.payload, mask)
+
+    def payload_mask(self, byte_index, op, value, can_id=None):
+        # Boolean mask over self.df, e.g. payload_mask(2, '>', 0x80, can_id=0x100).
+        # Frames shorter than byte_index + 1 never match.
+        if self.df is None or self.payload is None:
+            print("No payload data loaded. Call load_log_data() first.")
+            return np.zeros(0 if self.df is None else len(self.df), dtype=bool)
+        if op not in _COMPARISONS:
+            raise ValueError(f"Unsupported comparison '{op}', expected one of {sorted(_COMPARISONS)}")
+        if byte_index >= self.payload.shape[1]:
+            return np.zeros(len(self.df), dtype=bool)
+        mask = _COMPARISONS[op](self.payload[:, byte_index], value)
+        mask &= self.df['dlc'].to_numpy() > byte_index
+        if can_id is not None:
+            mask &= self.df['arbitration_id'].to_numpy() == can_id
+        return mask
+
+    def filter_by_payload(self, byte_index, op, value, can_id=None):
+        mask = self.payload_mask(byte_index, op, value, can_id)
+        filtered_df = self._select(mask)
+        print(f"Filtered {len(filtered_df)} messages where byte {byte_index} {op} 0x{value:02X}"
+              + (f" for CAN ID: 0x{can_id:X}" if can_id is not None else ""))
+        return filtered_df
+
+    def query_time_range(self, start_time=None, end_time=None):
+        # Messages with start_time <= timestamp <= end_time (either bound may be None)
+        if self.df is not None:
+            df = self.df
+        elif os.path.exists(self.log_file_path) and is_archive_log(self.log_file_path):
+            df, payload = self._read_archive(start_time, end_time) # Whole chunks; trimmed below
+        else:
+            index = self._current_index()
+            if index is None:
+                print("No data loaded and no index available. Call load_log_data() first.")
+                return pd.DataFrame()
+            start, end = index.byte_range(start_time, end_time)
+            if start is None or start >= end:
+                return pd.DataFrame(columns=index.columns)
+            df, payload = to_typed_frame(self._read_csv_range(index, start, end)) # Whole buckets; trimmed below
+
+        timestamps = df['timestamp'].to_numpy()
+        mask = np.ones(len(df), dtype=bool)
+        if start_time is not None:
+            mask &= timestamps >= start_time
+        if end_time is not None:
+            mask &= timestamps <= end_time
+        result = self._select(mask) if df is self.df else self._typed_selection(df, payload, mask)
+        print(f"Found {len(result)} messages between {start_time} and {end_time}")
+        return result
+
+    def _inter_arrival(self):
+        # Frames grouped by ID in time order, with the time since the previous frame of the same ID
+        # (NaN for the first frame of each ID). One sort + diff over the whole log; cached.
+        cached = self._timing_cache.get('inter_arrival')
+        if cached is not None:
+            return cached
+        ids = self.df['arbitration_id'].to_numpy()
+        timestamps = self.df['timestamp'].to_numpy(dtype=np.float64)
+        if len(timestamps) < 2 or np.all(timestamps[1:] >= timestamps[:-1]):
+            order = np.argsort(ids, kind='stable') # Already time ordered: stable (radix) sort by ID suffices
+        else:
+            order = np.lexsort((timestamps, ids))
+        sorted_ids = ids[order]
+        sorted_ts = timestamps[order]
+        deltas = np.empty(len(sorted_ts))
+        deltas[:1] = np.nan
+        np.subtract(sorted_ts[1:], sorted_ts[:-1], out=deltas[1:])
+        deltas[1:][sorted_ids[1:] != sorted_ids[:-1]] = np.nan # First frame of each ID
+        cached = self._timing_cache['inter_arrival'] = (sorted_ids, sorted_ts, deltas)
+        return cached
+
+    def get_period_stats(self, percentiles=(50, 95, 99)):
+        # Per-ID inter-arrival statistics in milliseconds: count, mean, jitter (standard deviation),
+        # min, max and the requested percentiles. Indexed by '0x123' style IDs.
+        if self.df is None or self.df.empty:
+            print("No data loaded. Call load_log_data() first.")
+            return pd.DataFrame()
+        key = ('period_stats', tuple(percentiles))
+        if key in self._timing_cache:
+            return self._timing_cache[key]
+        sorted_ids, _, deltas = self._inter_arrival()
+        valid = ~np.isnan(deltas)
+        periods = pd.Series(deltas[valid] * 1000.0, index=sorted_ids[valid])
+        grouped = periods.groupby(level=0, sort=False)
+        stats = grouped.agg(['mean', 'std', 'min', 'max'])
+        stats.columns = ['mean_period_ms', 'jitter_ms', 'min_period_ms', 'max_period_ms']
+        if len(percentiles):
+            quantiles = grouped.quantile([p / 100.0 for p in percentiles]).unstack()
+            quantiles.columns = [f'p{p:g}_period_ms' for p in percentiles]
+            stats = stats.join(quantiles)
+        ids, counts = np.unique(sorted_ids, return_counts=True)
+        stats = stats.reindex(ids) # IDs seen only once have no period
+        stats.insert(0, 'count', counts)
+        stats.index = [format_can_id(can_id) for can_id in stats.index]
+        stats.index.name = 'arbitration_id'
+        self._timing_cache[key] = stats
+        return stats
+
+    def detect_missing_messages(self, expected_ids=None, k=2.0, nominal_periods=None):
+        # Gaps longer than k x the nominal period of their ID. nominal_periods maps CAN ID -> period in
+        # seconds; IDs not in it use their median inter-arrival time. IDs in expected_ids that never
+        # appear are reported as one gap over the whole log. Returns one row per gap.
+        columns = ['arbitration_id', 'gap_start', 'gap_end', 'gap_ms', 'nominal_period_ms', 'missing_frames']
+        if self.df is None or self.df.empty:
+            print("No data loaded. Call load_log_data() first.")
+            return pd.DataFrame(columns=columns)
+        key = ('gaps', k, tuple(sorted((nominal_periods or {}).items())))
+        gaps = self._timing_cache.get(key)
+        if gaps is None:
+            sorted_ids, sorted_ts, deltas = self._inter_arrival()
+            valid = ~np.isnan(deltas)
+            ids, starts = np.unique(sorted_ids, return_index=True)
+            # Median per ID from the sorted deltas, broadcast back to every frame of that ID
+            medians = pd.Series(deltas[valid], index=sorted_ids[valid]).groupby(level=0).median()
+            nominal = medians.reindex(ids).to_numpy(dtype=np.float64, copy=True) # Overridden per ID below
+            for can_id, period in (nominal_periods or {}).items():
+                position = np.searchsorted(ids, can_id)
+                if position < len(ids) and ids[position] == can_id:
+                    nominal[position] = period
+            frame_nominal = np.repeat(nominal, np.diff(np.append(starts, len(sorted_ids))))
+            # IDs without a usable period (0 from frames sharing timestamps, or NaN) cannot have gaps
+            with np.errstate(invalid='ignore'):
+                late = valid & (frame_nominal > 0) & (deltas > k * frame_nominal)
+            gap_ms = deltas[late] * 1000.0
+            nominal_ms = frame_nominal[late] * 1000.0
+            gaps = pd.DataFrame({
+                'arbitration_id': [format_can_id(can_id) for can_id in sorted_ids[late]],
+                'gap_start': sorted_ts[np.flatnonzero(late) - 1],
+                'gap_end': sorted_ts[late],
+                'gap_ms': gap_ms,
+                'nominal_period_ms': nominal_ms,
+                'missing_frames': np.rint(gap_ms / nominal_ms).astype(np.int64) - 1,
+            }, columns=columns)
+            self._timing_cache[key] = gaps
+
+        if expected_ids:
+            seen = set(self.df['arbitration_id'].unique().tolist())
+            never_seen = [can_id for can_id in expected_ids if can_id not in seen]
+            if never_seen:
+                start, end = self.df['timestamp'].min(), self.df['timestamp'].max()
+                absent = pd.DataFrame({
+                    'arbitration_id': [format_can_id(can_id) for can_id in never_seen],
+                    'gap_start': start, 'gap_end': end, 'gap_ms': (end - start) * 1000.0,
+                    'nominal_period_ms': np.nan, 'missing_frames': -1, # Unknown without a period
+                }, columns=columns)
+                gaps = pd.concat([gaps, absent], ignore_index=True)
+            gaps = gaps[gaps['arbitration_id'].isin([format_can_id(can_id) for can_id in expected_ids])]
+        print(f"Found {len(gaps)} gaps longer than {k:g}x the nominal period")
+        return gaps.reset_index(drop=True)
+
+    def bus_load_timeline(self, window_seconds=0.1, bitrate=CAN_BITRATE, stuffing=False):
+        # Bus load per fixed time window, from the on-wire bit length of every frame
         if self.df is None or self.df.empty:
-            print("No data loaded or DataFrame is empty. Cannot plot.")
-            # Use messagebox to inform the user in the GUI context
-            plt.figure().set_visible(False) # Create a blank figure and make it invisible
-            plt.close() # Close it immediately
+            print("No data loaded. Call load_log_data() first.")
+            return pd.DataFrame()
+        key = ('bus_load', window_seconds, bitrate, stuffing)
+        if key in self._timing_cache:
+            return self._timing_cache[key]
+        df = self.df
+        timestamps = df['timestamp'].to_numpy(dtype=np.float64)
+        bits = frame_bit_lengths(df['dlc'].to_numpy(), df['is_extended_id'].to_numpy(),
+                                 df['is_remote_frame'].to_numpy(),
+                                 df['is_fd'].to_numpy() if 'is_fd' in df.columns else None, stuffing)
+        start = timestamps.min()
+        windows = ((timestamps - start) // window_seconds).astype(np.int64)
+        frames = np.bincount(windows)
+        window_bits = np.bincount(windows, weights=bits)
+        timeline = pd.DataFrame({
+            'window_start': start + np.arange(len(frames)) * window_seconds,
+            'frames': frames,
+            'bits': window_bits.astype(np.int64),
+            'bus_load_percent': 100.0 * window_bits / (bitrate * window_seconds),
+        })
+        self._timing_cache[key] = timeline
+        return timeline
+
+    def decode_signals(self, dbc=None, can_ids=None, signal_names=None):
+        # Physical signal values for every frame of every DBC message in the loaded log.
+        # dbc is a DBC file path or a parsed can_dbc.DbcDatabase (default: config.DBC_FILE_PATH).
+        # Returns a tidy DataFrame with columns timestamp, arbitration_id, is_extended_id, message, signal, value, unit.
+        if dbc is None:
+            dbc = DBC_FILE_PATH
+            if dbc is None:
+                print("No DBC file given and DBC_FILE_PATH is not set in config.py.")
+                return pd.DataFrame()
+        if self.df is None or self.df.empty or self.payload is None:
+            print("No data loaded. Call load_log_data() first.")
+            return pd.DataFrame()
+        if isinstance(dbc, str):
+            if self.signal_decoder is not None and self._dbc_path == dbc:
+                dbc = self.signal_decoder.db # Same file as last time: keep the cached decode plans
+            else:
+                self._dbc_path = dbc
+                dbc = load_dbc(dbc)
+        else:
+            self._dbc_path = None
+        if self.signal_decoder is None or self.signal_decoder.db is not dbc:
+            self.signal_decoder = SignalDecoder(dbc)
+
+        df = self.df
+        self.signals = self.signal_decoder.decode_frames(
+            df['timestamp'].to_numpy(), df['arbitration_id'].to_numpy(), self.payload,
+            can_ids=can_ids, signal_names=signal_names,
+            is_extended_id=df['is_extended_id'].to_numpy() if 'is_extended_id' in df.columns else None,
+            dlc=df['dlc'].to_numpy() if 'dlc' in df.columns else None)
+        print(f"Decoded {len(self.signals)} signal values "
+              f"({self.signals['signal'].nunique()} signals)")
+        return self.signals
+
+    def filter_signal(self, signal_name, start_time=None, end_time=None):
+        # One signal's time series from the last decode_signals() call
+        if self.signals is None:
+            print("No signals decoded. Call decode_signals() first.")
+            return pd.DataFrame()
+        mask = self.signals['signal'].to_numpy() == signal_name
+        timestamps = self.signals['timestamp'].to_numpy()
+        if start_time is not None:
+            mask &= timestamps >= start_time
+        if end_time is not None:
+            mask &= timestamps <= end_time
+        return self.signals[mask]
+
+    def plot_signal(self, signal_name, start_time=None, end_time=None):
+        series = self.filter_signal(signal_name, start_time, end_time)
+        if series.empty:
+            print(f"No values for signal {signal_name} to plot.")
             return
 
-        id_counts = self.df['arbitration_id'].value_counts().head(top_n)
-        
+        unit = series['unit'].iloc[0]
+        plt.figure(figsize=(10, 6))
+        plt.plot(series['timestamp'], series['value'])
+        plt.title(f"{signal_name} ({series['message'].iloc[0]})")
+        plt.xlabel('Timestamp (s)')
+        plt.ylabel(f"{signal_name} [{unit}]" if unit else signal_name)
+        plt.grid(True)
+        plt.tight_layout()
+        plt.show()
+
+    def plot_message_frequency(self, top_n=10):
+        id_counts = self.get_message_frequency(top_n)
+
         if id_counts.empty:
-            print("No message IDs to plot (id_counts is empty).")
+            print("No message IDs to plot (no data loaded or streamed).")
             plt.figure().set_visible(False)
             plt.close()
             return
@@ -89,16 +827,53 @@ class CanAnalyzer:
         plt.show()
 
     # Add more analysis functions as needed:
-    # - analyze_data_patterns(can_id, byte_index)
     # - calculate_average_dlc()
-    # - detect_missing_messages(expected_ids)
 
 # Example Usage (for testing can_analyzer.py independently)
 if __name__ == "__main__":
+    import argparse
+    import csv
     from config import LOG_FILE_PATH, TARGET_CAN_ID_FOR_ANALYSIS
     import can # For creating dummy messages if no log exists
     import time
 
+    parser = argparse.ArgumentParser(description="Analyze a CAN log file")
+    parser.add_argument('log_file', nargs='?', default=LOG_FILE_PATH, help="CSV or binary log to analyze")
+    parser.add_argument('--stream', action='store_true',
+                        help="Print the summary using bounded-memory streaming (for logs larger than RAM)")
+    parser.add_argument('--dbc', default=DBC_FILE_PATH,
+                        help="DBC file; print per-signal statistics of the decoded log (default: DBC_FILE_PATH)")
+    parser.add_argument('--chunksize', type=int, default=STREAM_CHUNK_ROWS, help="Rows per chunk with --stream")
+    args = parser.parse_args()
+
+    if args.stream:
+        analyzer = CanAnalyzer(args.log_file)
+        summary = analyzer.stream_summary(chunksize=args.chunksize)
+        if summary is None:
+            print("No messages found.")
+            raise SystemExit(1)
+        print("\n--- Log Summary ---")
+        for key, value in summary.items():
+            print(f"{key}: {value}")
+        print("\n--- DLC distribution ---")
+        for dlc, count in sorted(analyzer.stream_stats.dlc_counts.items()):
+            print(f"DLC {dlc}: {count}")
+        print("\n--- First/last seen per ID ---")
+        for can_id, count in analyzer.stream_stats.id_counts.most_common():
+            print(f"{can_id}: {count} frames, {analyzer.stream_stats.first_seen[can_id]:.6f} .. "
+                  f"{analyzer.stream_stats.last_seen[can_id]:.6f}")
+        raise SystemExit(0)
+
+    if args.dbc:
+        analyzer = CanAnalyzer(args.log_file)
+        if not analyzer.load_log_data():
+            raise SystemExit(1)
+        signals = analyzer.decode_signals(args.dbc)
+        if not signals.empty:
+            print(signals.groupby(['message', 'signal', 'unit'])['value'].agg(['count', 'min', 'mean', 'max']))
+        raise SystemExit(0)
+
+    LOG_FILE_PATH = args.log_file
     # Ensure a log file exists for testing
     if not os.path.exists(LOG_FILE_PATH) or os.path.getsize(LOG_FILE_PATH) == 0:
         print(f"'{LOG_FILE_PATH}' not found or is empty. Creating a dummy one for analysis test.")
@@ -127,5 +902,12 @@ if __name__ == "__main__":
         filtered_messages = analyzer.filter_by_can_id(0x100)
         print(filtered_messages.head())
 
+        print("\n--- Period statistics per ID ---")
+        print(analyzer.get_period_stats())
+        print("\n--- Gaps longer than 2x the nominal period ---")
+        print(analyzer.detect_missing_messages(k=2.0))
+        print("\n--- Bus load timeline (100 ms windows) ---")
+        print(analyzer.bus_load_timeline(window_seconds=0.1).head())
+
         print("\n--- Plotting Message Frequency ---")
         analyzer.plot_message_frequency()
\ No newline at end of file
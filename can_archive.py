@@ -0,0 +1,247 @@
+# can_archive.py
+# Compressed columnar archive for long-term storage of CAN logs.
+#   header: magic (8s), version (H), codec (B), payload size (B), reserved (I)
+#   chunks: up to chunk_rows frames each, every column compressed separately:
+#     timestamp - integer nanoseconds, delta encoded from the chunk's first frame, byte-shuffled
+#     id        - index into the chunk's ID dictionary (uint8/uint16/uint32)
+#     flags     - can_logger BINARY_FLAG_* bits
+#     dlc       - uint8
+#     payload   - raw N x payload_size bytes
+#     channel   - index into the chunk's channel dictionary (multi-bus logs only)
+#   footer: JSON directory with per-chunk offsets, row count, min/max timestamp and ID set,
+#           then its length (Q) and the end magic (8s)
+# Queries read the footer only and skip every chunk whose time range or ID set rules it out.
+import bz2
+import json
+import lzma
+import os
+import struct
+import zlib
+
+import numpy as np
+
+ARCHIVE_MAGIC = b'PYCANARC'
+ARCHIVE_END_MAGIC = b'PYCANEND'
+ARCHIVE_VERSION = 1
+ARCHIVE_HEADER_STRUCT = struct.Struct('<8sHBBI')
+ARCHIVE_FOOTER_STRUCT = struct.Struct('<Q8s')
+ARCHIVE_CHUNK_ROWS = 65536
+
+# codec name -> (id, compress, decompress)
+ARCHIVE_CODECS = {
+    'none': (0, bytes, bytes),
+    'zlib': (1, lambda data: zlib.compress(data, 6), zlib.decompress),
+    'lzma': (2, lambda data: lzma.compress(data, preset=6), lzma.decompress),
+    'bz2': (3, lambda data: bz2.compress(data, 9), bz2.decompress),
+}
+_CODEC_BY_ID = {codec_id: name for name, (codec_id, _, _) in ARCHIVE_CODECS.items()}
+
+def is_archive_log(log_file_path):
+    with open(log_file_path, 'rb') as f:
+        return f.read(len(ARCHIVE_MAGIC)) == ARCHIVE_MAGIC
+
+def _code_dtype(count):
+    return np.uint8 if count <= 0x100 else np.uint16 if count <= 0x10000 else np.uint32
+
+def _shuffle(values):
+    # Byte-transpose so the (mostly constant) high bytes of all values sit next to each other
+    return np.ascontiguousarray(values.view(np.uint8).reshape(-1, values.dtype.itemsize).T).tobytes()
+
+def _unshuffle(data, dtype, rows):
+    return np.frombuffer(data, dtype=np.uint8).reshape(dtype.itemsize, rows).T.copy().view(dtype).ravel()
+
+class ArchiveWriter:
+    # Buffers frames and writes one compressed chunk every chunk_rows frames; close() writes the footer.
+    def __init__(self, archive_path, codec='zlib', chunk_rows=ARCHIVE_CHUNK_ROWS, payload_size=8):
+        if codec not in ARCHIVE_CODECS:
+            raise ValueError(f"Unknown codec '{codec}', expected one of {sorted(ARCHIVE_CODECS)}")
+        if payload_size not in (8, 64):
+            raise ValueError("payload_size must be 8 (classic CAN) or 64 (CAN FD)")
+        self.archive_path = archive_path
+        self.codec = codec
+        self.chunk_rows = chunk_rows
+        self.payload_size = payload_size
+        self._compress = ARCHIVE_CODECS[codec][1]
+        self.chunks = []
+        self.rows_written = 0
+        self._pending = []
+        self._pending_rows = 0
+        self.file = open(archive_path, 'wb')
+        self.file.write(ARCHIVE_HEADER_STRUCT.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, ARCHIVE_CODECS[codec][0],
+                                                   payload_size, 0))
+
+    def append(self, timestamps, ids, flags, dlc, payload, channels=None):
+        # Column arrays of equal length; payload is N x payload_size (narrower payloads are zero padded)
+        payload = np.asarray(payload, dtype=np.uint8)
+        if payload.shape[1] != self.payload_size:
+            padded = np.zeros((len(payload), self.payload_size), dtype=np.uint8)
+            width = min(payload.shape[1], self.payload_size)
+            padded[:, :width] = payload[:, :width]
+            payload = padded
+        self._pending.append((np.asarray(timestamps, dtype=np.float64), np.asarray(ids, dtype=np.uint32),
+                              np.asarray(flags, dtype=np.uint8), np.asarray(dlc, dtype=np.uint8), payload,
+                              None if channels is None else np.asarray(channels, dtype=object)))
+        self._pending_rows += len(timestamps)
+        while self._pending_rows >= self.chunk_rows:
+            self._flush_chunk(self.chunk_rows)
+
+    def _take(self, rows):
+        columns = [np.concatenate(parts) if parts[0] is not None else None for parts in zip(*self._pending)]
+        self._pending = [tuple(column[rows:] if column is not None else None for column in columns)]
+        self._pending_rows -= rows
+        if not self._pending_rows:
+            self._pending = []
+        return [column[:rows] if column is not None else None for column in columns]
+
+    def _write_column(self, data):
+        offset = self.file.tell()
+        compressed = self._compress(data)
+        self.file.write(compressed)
+        return [offset, len(compressed)]
+
+    def _flush_chunk(self, rows):
+        timestamps, ids, flags, dlc, payload, channels = self._take(rows)
+        ts_ns = np.rint(timestamps * 1e9).astype(np.int64)
+        deltas = np.diff(ts_ns, prepend=ts_ns[0])
+        delta_dtype = np.dtype('<i4') if deltas.size == 0 or (deltas.min() >= -2**31 and deltas.max() < 2**31) \
+            else np.dtype('<i8')
+        id_values, id_codes = np.unique(ids, return_inverse=True)
+        chunk = {
+            'rows': rows,
+            'ts_min': float(timestamps.min()),
+            'ts_max': float(timestamps.max()),
+            'ts_first_ns': int(ts_ns[0]),
+            'ts_delta_dtype': delta_dtype.str,
+            'ids': id_values.tolist(),
+            'columns': {
+                'timestamp': self._write_column(_shuffle(deltas.astype(delta_dtype))),
+                'id': self._write_column(id_codes.astype(_code_dtype(len(id_values))).tobytes()),
+                'flags': self._write_column(flags.tobytes()),
+                'dlc': self._write_column(dlc.tobytes()),
+                'payload': self._write_column(np.ascontiguousarray(payload).tobytes()),
+            },
+        }
+        if channels is not None:
+            channel_values, channel_codes = np.unique(channels.astype(str), return_inverse=True)
+            chunk['channels'] = channel_values.tolist()
+            chunk['columns']['channel'] = self._write_column(
+                channel_codes.astype(_code_dtype(len(channel_values))).tobytes())
+        self.chunks.append(chunk)
+        self.rows_written += rows
+
+    def close(self):
+        if self.file is None:
+            return
+        if self._pending_rows:
+            self._flush_chunk(self._pending_rows)
+        footer = json.dumps({'rows': self.rows_written, 'chunk_rows': self.chunk_rows,
+                             'chunks': self.chunks}, separators=(',', ':')).encode()
+        self.file.write(footer)
+        self.file.write(ARCHIVE_FOOTER_STRUCT.pack(len(footer), ARCHIVE_END_MAGIC))
+        self.file.close()
+        self.file = None
+
+class ArchiveReader:
+    def __init__(self, archive_path):
+        self.archive_path = archive_path
+        with open(archive_path, 'rb') as f:
+            magic, version, codec_id, payload_size, _ = ARCHIVE_HEADER_STRUCT.unpack(
+                f.read(ARCHIVE_HEADER_STRUCT.size))
+            if magic != ARCHIVE_MAGIC or version != ARCHIVE_VERSION or codec_id not in _CODEC_BY_ID:
+                raise ValueError(f"{archive_path} is not a supported CAN archive")
+            f.seek(-ARCHIVE_FOOTER_STRUCT.size, os.SEEK_END)
+            footer_size, end_magic = ARCHIVE_FOOTER_STRUCT.unpack(f.read(ARCHIVE_FOOTER_STRUCT.size))
+            if end_magic != ARCHIVE_END_MAGIC:
+                raise ValueError(f"{archive_path} is incomplete (archive was not closed)")
+            f.seek(-ARCHIVE_FOOTER_STRUCT.size - footer_size, os.SEEK_END)
+            directory = json.loads(f.read(footer_size))
+        self.codec = _CODEC_BY_ID[codec_id]
+        self.payload_size = payload_size
+        self.rows = directory['rows']
+        self.chunks = directory['chunks']
+        self._decompress = ARCHIVE_CODECS[self.codec][2]
+        self.has_channel = any('channels' in chunk for chunk in self.chunks)
+
+    def select_chunks(self, start_time=None, end_time=None, can_ids=None):
+        # Chunks that may hold matching frames, decided from the footer statistics alone
+        wanted = set(can_ids) if can_ids is not None else None
+        return [chunk for chunk in self.chunks
+                if (start_time is None or chunk['ts_max'] >= start_time)
+                and (end_time is None or chunk['ts_min'] <= end_time)
+                and (wanted is None or not wanted.isdisjoint(chunk['ids']))]
+
+    def _column(self, f, chunk, name):
+        offset, length = chunk['columns'][name]
+        f.seek(offset)
+        return self._decompress(f.read(length))
+
+    def read_chunk(self, f, chunk):
+        rows = chunk['rows']
+        deltas = _unshuffle(self._column(f, chunk, 'timestamp'), np.dtype(chunk['ts_delta_dtype']), rows)
+        ts_ns = chunk['ts_first_ns'] + np.cumsum(deltas, dtype=np.int64)
+        id_values = np.asarray(chunk['ids'], dtype=np.uint32)
+        columns = {
+            'timestamp': ts_ns / 1e9,
+            'arbitration_id': id_values[np.frombuffer(self._column(f, chunk, 'id'), dtype=_code_dtype(len(id_values)))],
+            'flags': np.frombuffer(self._column(f, chunk, 'flags'), dtype=np.uint8),
+            'dlc': np.frombuffer(self._column(f, chunk, 'dlc'), dtype=np.uint8),
+            'payload': np.frombuffer(self._column(f, chunk, 'payload'), dtype=np.uint8).reshape(rows, self.payload_size),
+        }
+        if self.has_channel:
+            if 'channels' in chunk:
+                channel_values = np.asarray(chunk['channels'], dtype=object)
+                columns['channel'] = channel_values[np.frombuffer(self._column(f, chunk, 'channel'),
+                                                                  dtype=_code_dtype(len(channel_values)))]
+            else:
+                columns['channel'] = np.full(rows, '', dtype=object)
+        return columns
+
+    def iter_chunks(self, start_time=None, end_time=None, can_ids=None, chunks=None):
+        # Column dicts of the chunks that survive the footer statistics (not filtered row by row);
+        # chunks: an already selected list of footer entries, e.g. from select_chunks()
+        if chunks is None:
+            chunks = self.select_chunks(start_time, end_time, can_ids)
+        with open(self.archive_path, 'rb') as f:
+            for chunk in chunks:
+                yield self.read_chunk(f, chunk)
+
+    def read(self, start_time=None, end_time=None, can_ids=None, chunks=None):
+        # Matching frames as one dict of columns, filtered row by row inside the selected chunks
+        parts = []
+        for columns in self.iter_chunks(start_time, end_time, can_ids, chunks):
+            mask = np.ones(len(columns['timestamp']), dtype=bool)
+            if start_time is not None:
+                mask &= columns['timestamp'] >= start_time
+            if end_time is not None:
+                mask &= columns['timestamp'] <= end_time
+            if can_ids is not None:
+                mask &= np.isin(columns['arbitration_id'], list(can_ids))
+            parts.append({name: values[mask] for name, values in columns.items()})
+        if not parts:
+            empty = {'timestamp': np.empty(0), 'arbitration_id': np.empty(0, dtype=np.uint32),
+                     'flags': np.empty(0, dtype=np.uint8), 'dlc': np.empty(0, dtype=np.uint8),
+                     'payload': np.empty((0, self.payload_size), dtype=np.uint8)}
+            if self.has_channel:
+                empty['channel'] = np.empty(0, dtype=object)
+            return empty
+        return {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+
+# Example Usage: python can_archive.py can_log.csv can_log.pcarc [codec]
+if __name__ == "__main__":
+    import sys
+    import time
+    from can_analyzer import convert_to_archive, CanAnalyzer
+    from config import LOG_FILE_PATH, TARGET_CAN_ID_FOR_ANALYSIS
+
+    source = sys.argv[1] if len(sys.argv) > 1 else LOG_FILE_PATH
+    target = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(source)[0] + '.pcarc'
+    codec = sys.argv[3] if len(sys.argv) > 3 else 'zlib'
+    start = time.perf_counter()
+    rows = convert_to_archive(source, target, codec=codec)
+    print(f"Converted {rows} frames in {time.perf_counter() - start:.2f} s: "
+          f"{os.path.getsize(source) / 1e6:.1f} MB -> {os.path.getsize(target) / 1e6:.1f} MB ({codec})")
+
+    reader = ArchiveReader(target)
+    selected = reader.select_chunks(can_ids=[TARGET_CAN_ID_FOR_ANALYSIS])
+    print(f"0x{TARGET_CAN_ID_FOR_ANALYSIS:X} is present in {len(selected)} of {len(reader.chunks)} chunks")
+    print(CanAnalyzer(target).filter_by_can_id(TARGET_CAN_ID_FOR_ANALYSIS).head())
@@ -0,0 +1,139 @@
+# can_async.py
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import can
+
+_CLOSED = object() # Pushed into subscriber queues on disconnect to end their iteration
+
+class AsyncCanInterface:
+    # asyncio counterpart of CanInterface. Reception runs through a can.Notifier bound to the
+    # event loop, so received frames are delivered to coroutines without polling or extra threads.
+    # Blocking driver sends run on one dedicated worker thread (keeps frame order), and at most
+    # max_pending_sends sends can be in flight before send() callers wait (backpressure).
+    def __init__(self, channel, bustype, bitrate, max_pending_sends=64):
+        self.channel = channel
+        self.bustype = bustype
+        self.bitrate = bitrate
+        self.max_pending_sends = max_pending_sends
+        self.bus = None
+        self.notifier = None
+        self.is_connected = False
+        self._readers = set()
+        self._send_slots = None
+        self._send_executor = None
+
+    async def connect(self):
+        loop = asyncio.get_running_loop()
+        try:
+            # Opening hardware can block for a while; keep the event loop responsive
+            self.bus = await loop.run_in_executor(
+                None, lambda: can.interface.Bus(channel=self.channel, bustype=self.bustype, bitrate=self.bitrate))
+        except Exception as e:
+            print(f"Error connecting to CAN bus ({self.bustype}, {self.channel}): {e}")
+            self.is_connected = False
+            return False
+        self.notifier = can.Notifier(self.bus, [], timeout=1.0, loop=loop)
+        self._send_slots = asyncio.Semaphore(self.max_pending_sends)
+        self._send_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='can-send')
+        self.is_connected = True
+        print(f"Successfully connected to CAN bus: {self.bustype} on {self.channel} at {self.bitrate} bps")
+        return True
+
+    async def disconnect(self):
+        if not self.bus:
+            return
+        self.is_connected = False
+        for reader in list(self._readers):
+            reader.buffer.put_nowait(_CLOSED)
+        if self.notifier is not None:
+            self.notifier.stop()
+            self.notifier = None
+        if self._send_executor is not None:
+            # Let queued sends finish before the bus goes away, without blocking the event loop
+            await asyncio.to_thread(self._send_executor.shutdown, True)
+            self._send_executor = None
+        await asyncio.get_running_loop().run_in_executor(None, self.bus.shutdown)
+        self.bus = None
+        print("Disconnected from CAN bus.")
+
+    async def messages(self):
+        # Async iterator over received frames. Every iterator gets its own buffer, so several
+        # test sequences can consume the same traffic concurrently. Ends on disconnect().
+        if not self.is_connected:
+            print("Not connected to CAN bus. Cannot receive messages.")
+            return
+        reader = can.AsyncBufferedReader()
+        self._readers.add(reader)
+        self.notifier.add_listener(reader)
+        try:
+            while True:
+                msg = await reader.get_message()
+                if msg is _CLOSED:
+                    return
+                yield msg
+        finally:
+            self._readers.discard(reader)
+            if self.notifier is not None:
+                self.notifier.remove_listener(reader)
+
+    def __aiter__(self):
+        return self.messages()
+
+    def _send_blocking(self, msgs, timeout):
+        sent = 0
+        for msg in msgs:
+            try:
+                self.bus.send(msg, timeout=timeout)
+                sent += 1
+            except Exception as e:
+                print(f"Error sending message: {e}")
+                break
+        return sent
+
+    async def send(self, arbitration_id, data, is_extended_id=False, timeout=None):
+        if not self.is_connected:
+            return False
+        msg = can.Message(arbitration_id=arbitration_id, data=data, is_extended_id=is_extended_id)
+        async with self._send_slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._send_executor, self._send_blocking, [msg], timeout) == 1
+
+    async def send_batch(self, frames, timeout=None):
+        # frames: iterable of (arbitration_id, data[, is_extended_id]). The whole batch is sent in a
+        # single hop to the send thread; returns the number of frames sent (stops at the first error).
+        if not self.is_connected:
+            return 0
+        msgs = [can.Message(arbitration_id=frame[0], data=frame[1],
+                            is_extended_id=frame[2] if len(frame) > 2 else False) for frame in frames]
+        async with self._send_slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._send_executor, self._send_blocking, msgs, timeout)
+
+# Example Usage (for testing can_async.py independently)
+if __name__ == "__main__":
+    from config import CAN_CHANNEL, CAN_BUSTYPE, CAN_BITRATE
+
+    async def main():
+        receiver = AsyncCanInterface(CAN_CHANNEL, CAN_BUSTYPE, CAN_BITRATE)
+        sender = AsyncCanInterface(CAN_CHANNEL, CAN_BUSTYPE, CAN_BITRATE) # Second node on the virtual bus
+        if not (await receiver.connect() and await sender.connect()):
+            return
+
+        async def consume():
+            count = 0
+            async for msg in receiver:
+                count += 1
+                if count <= 3:
+                    print(f"Received: {msg.timestamp:.4f} ID: 0x{msg.arbitration_id:X} Data: {msg.data.hex()}")
+            return count
+
+        consumer = asyncio.create_task(consume())
+        await asyncio.sleep(0.1)
+        await sender.send(0x100, [1, 2, 3])
+        print(f"Batch sent: {await sender.send_batch([(0x200 + i, [i]) for i in range(100)])} frames")
+        await asyncio.sleep(0.5)
+        await receiver.disconnect()
+        await sender.disconnect()
+        print(f"Consumer received {await consumer} frames")
+
+    asyncio.run(main())
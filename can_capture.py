@@ -0,0 +1,276 @@
+# can_capture.py
+# Headless capture: python can_capture.py --output logs/rig1.csv --rotate-size 100 --filter 0x100:0x700
+# Triggered:        python can_capture.py --output logs/rig1.csv --trigger error --trigger timeout:0x200:0.5
+# Multi-channel:    python can_capture.py --output logs/rig1.csv --multibus   (channels from CAN_CHANNELS)
+# Imports only what recording needs (no Tkinter, pandas or matplotlib), so it starts quickly and
+# stays small when run as a long-lived service.
+import argparse
+import os
+import signal
+import sys
+import threading
+import time
+from datetime import datetime
+
+from can_interface import CanInterface
+from can_multibus import MultiBusCapture
+from can_logger import CanLogger, BinaryCanLogger
+from can_metrics import metrics
+from can_trigger import TriggeredCapture, parse_trigger
+from config import CAN_CHANNEL, CAN_BUSTYPE, CAN_BITRATE, CAN_FILTERS, CAN_CHANNELS, MULTIBUS_REORDER_WINDOW
+from config import LOG_FILE_PATH, LOG_FORMAT, LOG_BACKEND, BINARY_LOG_FILE_PATH, BINARY_LOG_PAYLOAD_SIZE
+from config import LOG_QUEUE_SIZE, LOG_FLUSH_EVERY_N, LOG_FLUSH_INTERVAL_MS
+from config import TRIGGER_PRE_SECONDS, TRIGGER_POST_SECONDS
+
+def open_capture_logger(path, log_backend='csv', payload_size=8, log_format=None):
+    # Opened asynchronous logger for one capture file, or None if it cannot be opened
+    options = dict(async_mode=True, flush_every_n=LOG_FLUSH_EVERY_N,
+                   flush_interval_ms=LOG_FLUSH_INTERVAL_MS, queue_size=LOG_QUEUE_SIZE)
+    if log_backend == 'binary':
+        logger = BinaryCanLogger(path, payload_size=payload_size, **options)
+    else:
+        logger = CanLogger(path, log_format or LOG_FORMAT, **options)
+    logger._open_file()
+    return logger if logger.file_opened else None
+
+class RotatingCapture:
+    # Logs every received frame to the current log file and starts a new file once the current one
+    # exceeds rotate_bytes or is older than rotate_seconds. The receive callback and the rotation
+    # share a lock, so no frame is written to a logger that is being closed; the old file is
+    # drained and closed outside the lock, so reception never waits for disk I/O.
+    def __init__(self, output_path, log_backend='csv', rotate_bytes=None, rotate_seconds=None,
+                 payload_size=8, log_format=None):
+        self.output_path = output_path
+        self.log_backend = log_backend
+        self.log_format = log_format # CSV columns, default LOG_FORMAT
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self.payload_size = payload_size
+        self.logger = None
+        self.files_written = []
+        self.frames_received = 0
+        self._lock = threading.Lock()
+        self._opened_at = 0.0
+        self._sequence = 0
+        # Counters of loggers that were already closed, so totals survive rotation
+        self._closed_logged = 0
+        self._closed_dropped = 0
+
+    def _next_path(self):
+        if not (self.rotate_bytes or self.rotate_seconds):
+            return self.output_path
+        stem, ext = os.path.splitext(self.output_path)
+        self._sequence += 1
+        return f"{stem}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{self._sequence:04d}{ext}"
+
+    def _new_logger(self):
+        path = self._next_path()
+        logger = open_capture_logger(path, self.log_backend, self.payload_size, self.log_format)
+        if logger is None:
+            return None
+        self.files_written.append(path)
+        return logger
+
+    def open(self):
+        self.logger = self._new_logger()
+        self._opened_at = time.monotonic()
+        return self.logger is not None
+
+    def on_message(self, msg):
+        # Runs on the Notifier thread; only enqueues for the logger's writer thread
+        with self._lock:
+            self.frames_received += 1
+            self.logger.log_message(msg)
+
+    def rotate_if_needed(self):
+        logger = self.logger
+        due = self.rotate_seconds and time.monotonic() - self._opened_at >= self.rotate_seconds
+        if not due and self.rotate_bytes:
+            try:
+                # Reflects what the writer has flushed so far, so files overshoot by at most one flush
+                due = os.path.getsize(logger.log_file_path) >= self.rotate_bytes
+            except OSError:
+                due = False
+        if not due:
+            return
+        new_logger = self._new_logger()
+        if new_logger is None:
+            print("Rotation failed; continuing with the current log file")
+            return
+        with self._lock:
+            self.logger = new_logger
+        self._opened_at = time.monotonic()
+        self._close_logger(logger)
+
+    def _close_logger(self, logger):
+        logger.close() # Drains everything queued before the swap
+        self._closed_logged += logger.frames_logged
+        self._closed_dropped += logger.frames_dropped
+
+    def frames_logged(self):
+        return self._closed_logged + (self.logger.frames_logged if self.logger is not None else 0)
+
+    def frames_dropped(self):
+        return self._closed_dropped + (self.logger.frames_dropped if self.logger is not None else 0)
+
+    def close(self):
+        if self.logger is not None:
+            self._close_logger(self.logger)
+            self.logger = None
+
+def parse_filter(text):
+    # "ID:MASK" or "ID:MASK:ext" / "ID:MASK:std" (hex or decimal); ID alone means an exact match
+    parts = text.split(':')
+    can_id = int(parts[0], 0)
+    can_mask = int(parts[1], 0) if len(parts) > 1 and parts[1] else (0x1FFFFFFF if can_id > 0x7FF else 0x7FF)
+    flt = {'can_id': can_id, 'can_mask': can_mask}
+    if len(parts) > 2:
+        if parts[2] not in ('ext', 'std'):
+            raise argparse.ArgumentTypeError(f"Invalid filter '{text}': expected ext or std after the mask")
+        flt['extended'] = parts[2] == 'ext'
+    return flt
+
+def parse_trigger_arg(text):
+    try:
+        return parse_trigger(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Headless CAN capture to CSV or binary log files")
+    parser.add_argument('--channel', default=CAN_CHANNEL)
+    parser.add_argument('--bustype', default=CAN_BUSTYPE)
+    parser.add_argument('--bitrate', type=int, default=CAN_BITRATE)
+    parser.add_argument('--format', choices=['csv', 'binary'], default=LOG_BACKEND)
+    parser.add_argument('--output', help="Log file path (rotated files get a timestamp and sequence suffix)")
+    parser.add_argument('--payload-size', type=int, choices=[8, 64], default=BINARY_LOG_PAYLOAD_SIZE,
+                        help="Binary record payload size (64 for CAN FD)")
+    parser.add_argument('--filter', action='append', type=parse_filter, dest='filters',
+                        help="Acceptance filter ID[:MASK[:ext|std]], repeatable (default: CAN_FILTERS)")
+    parser.add_argument('--rotate-size', type=float, help="Start a new file after this many MB")
+    parser.add_argument('--rotate-seconds', type=float, help="Start a new file after this many seconds")
+    parser.add_argument('--multibus', action='store_true',
+                        help="Capture every channel in CAN_CHANNELS into one time-ordered log "
+                             "(--channel/--bustype/--bitrate are ignored)")
+    parser.add_argument('--reorder-window', type=float, default=MULTIBUS_REORDER_WINDOW,
+                        help="With --multibus: seconds a frame is held back so slower channels can slot in")
+    parser.add_argument('--trigger', action='append', type=parse_trigger_arg, dest='triggers',
+                        help="Only write frames around events: id:ID[:ext|std], payload:ID:BYTE:MASK:VALUE, "
+                             "error or timeout:ID:SECONDS; repeatable, each event goes to a numbered file")
+    parser.add_argument('--pre-trigger', type=float, default=TRIGGER_PRE_SECONDS,
+                        help="Seconds of frames before a trigger to write")
+    parser.add_argument('--post-trigger', type=float, default=TRIGGER_POST_SECONDS,
+                        help="Seconds of frames after the last trigger of an event to write")
+    parser.add_argument('--stats-interval', type=float, default=10.0,
+                        help="Seconds between throughput reports (0 to disable)")
+    parser.add_argument('--duration', type=float, help="Stop after this many seconds")
+    return parser
+
+def _channel_stats_text(stats):
+    # "can0: rx 1200 late 0 dropped 0 | can1: ..." from MultiBusCapture.stats()
+    channels = [f"{name}: rx {channel['received']} late {channel['late']} dropped {channel['dropped']}"
+                for name, channel in stats.items() if name != 'late_frames']
+    return " | ".join(channels)
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    output = args.output or (BINARY_LOG_FILE_PATH if args.format == 'binary' else LOG_FILE_PATH)
+    output_dir = os.path.dirname(output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    log_format = None
+    if args.multibus:
+        if args.format == 'binary':
+            print("Binary records have no channel field; use --format csv to keep the channel of each frame")
+        elif 'channel' not in LOG_FORMAT:
+            log_format = LOG_FORMAT + ['channel'] # Record which bus each merged frame came from
+    if args.triggers:
+        if args.rotate_size or args.rotate_seconds:
+            print("Rotation options are ignored with --trigger (every event gets its own file)")
+        capture = TriggeredCapture(output, args.triggers,
+                                   lambda path: open_capture_logger(path, args.format, args.payload_size, log_format),
+                                   pre_seconds=args.pre_trigger, post_seconds=args.post_trigger)
+    else:
+        capture = RotatingCapture(output, args.format,
+                                  rotate_bytes=int(args.rotate_size * 1024 * 1024) if args.rotate_size else None,
+                                  rotate_seconds=args.rotate_seconds, payload_size=args.payload_size,
+                                  log_format=log_format)
+
+    multibus = None
+    can_interface = None
+    if args.multibus:
+        channel_configs = CAN_CHANNELS
+        if args.filters is not None:
+            channel_configs = [dict(config, filters=args.filters) for config in CAN_CHANNELS]
+        multibus = MultiBusCapture(channel_configs, capture.on_message, reorder_window=args.reorder_window)
+        connected = multibus.connect()
+    else:
+        can_interface = CanInterface(args.channel, args.bustype, args.bitrate,
+                                     filters=args.filters if args.filters is not None else CAN_FILTERS)
+        connected = can_interface.connect()
+    if not connected:
+        return 1
+    if not capture.open():
+        if multibus is not None:
+            multibus.stop()
+        else:
+            can_interface.disconnect()
+        return 1
+
+    stop = threading.Event()
+    def request_stop(signum, frame):
+        print(f"Received signal {signum}, stopping capture...")
+        stop.set()
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    metrics.start_exporters() # Endpoint/JSON dump per config.py, only when METRICS_ENABLED
+    if multibus is not None:
+        multibus.start()
+    else:
+        can_interface.start_listening(callback=capture.on_message)
+    started = time.monotonic()
+    last_report = started
+    last_count = 0
+    while not stop.is_set():
+        stop.wait(0.5)
+        now = time.monotonic()
+        if args.duration and now - started >= args.duration:
+            break
+        if args.triggers:
+            capture.poll()
+        else:
+            capture.rotate_if_needed()
+        if args.stats_interval and now - last_report >= args.stats_interval:
+            count = capture.frames_received
+            logger = capture.logger # None while a triggered capture waits for its next event
+            if multibus is not None:
+                source_text = _channel_stats_text(multibus.stats())
+            else:
+                filter_stats = can_interface.filter_stats()
+                source_text = f"filtered {filter_stats['rejected'] if filter_stats['mode'] != 'backend' else 'in driver'}"
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] {(count - last_count) / (now - last_report):.0f} frames/s  "
+                  f"received {count}  logged {capture.frames_logged()}  dropped {capture.frames_dropped()}  "
+                  f"queue {logger.queue_depth if logger else 0} (max {logger.queue_high_water if logger else 0})  "
+                  f"{source_text}", flush=True)
+            last_report = now
+            last_count = count
+
+    # Clean drain: stop reception first, then let the writer flush everything still queued
+    if multibus is not None:
+        multibus.stop() # Also flushes the frames still held back for reordering
+    else:
+        can_interface.disconnect()
+    capture.close()
+    metrics.stop()
+    print(f"Capture finished: {capture.frames_received} frames received, {capture.frames_logged()} logged, "
+          f"{capture.frames_dropped()} dropped, {len(capture.files_written)} file(s)")
+    if multibus is not None:
+        print(_channel_stats_text(multibus.stats()))
+    if args.triggers:
+        print(f"{len(capture.events)} trigger(s) fired")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+# can_dbc.py
+import re
+import numpy as np
+import pandas as pd
+
+# Supported DBC subset: BO_ message definitions and their SG_ signals (start bit, length,
+# byte order, signedness, factor/offset, range, unit, simple multiplexing). Everything else
+# (attributes, value tables, comments, float signals) is ignored.
+_MESSAGE_RE = re.compile(r'^BO_\s+(\d+)\s+(\w+)\s*:\s*(\d+)\s+(\w+)')
+_SIGNAL_RE = re.compile(
+    r'^SG_\s+(\w+)\s*(M|m\d+)?\s*:\s*(\d+)\|(\d+)@([01])([+-])\s*'
+    r'\(\s*([^,\s]+)\s*,\s*([^)\s]+)\s*\)\s*\[\s*([^|\s]+)\s*\|\s*([^\]\s]+)\s*\]\s*"([^"]*)"'
+)
+DBC_EXTENDED_ID_FLAG = 0x80000000
+
+class DbcSignal:
+    def __init__(self, name, start_bit, length, little_endian, signed, factor, offset,
+                 minimum, maximum, unit, multiplexer=False, multiplex_value=None):
+        self.name = name
+        self.start_bit = start_bit
+        self.length = length
+        self.little_endian = little_endian # @1 (Intel); @0 is Motorola/big endian
+        self.signed = signed
+        self.factor = factor
+        self.offset = offset
+        self.minimum = minimum
+        self.maximum = maximum
+        self.unit = unit
+        self.multiplexer = multiplexer # This signal selects which muxed signals are present
+        self.multiplex_value = multiplex_value # Only present when the multiplexer equals this value
+
+    def __repr__(self):
+        return f"DbcSignal({self.name}, {self.start_bit}|{self.length}@{int(self.little_endian)})"
+
+class DbcMessage:
+    def __init__(self, frame_id, name, length, sender, is_extended_id):
+        self.frame_id = frame_id
+        self.name = name
+        self.length = length
+        self.sender = sender
+        self.is_extended_id = is_extended_id
+        self.signals = []
+
+    def __repr__(self):
+        return f"DbcMessage(0x{self.frame_id:X} {self.name}, {len(self.signals)} signals)"
+
+class DbcDatabase:
+    def __init__(self):
+        self.messages = {} # (arbitration ID, is_extended_id) -> DbcMessage
+
+    def get_message(self, can_id, is_extended_id=False):
+        return self.messages.get((can_id, is_extended_id))
+
+    def find_signal(self, signal_name):
+        for message in self.messages.values():
+            for signal in message.signals:
+                if signal.name == signal_name:
+                    return message, signal
+        return None, None
+
+def parse_dbc(text):
+    db = DbcDatabase()
+    message = None
+    for line in text.splitlines():
+        line = line.strip()
+        match = _MESSAGE_RE.match(line)
+        if match:
+            raw_id = int(match.group(1))
+            is_extended = bool(raw_id & DBC_EXTENDED_ID_FLAG)
+            message = DbcMessage(raw_id & 0x1FFFFFFF, match.group(2), int(match.group(3)), match.group(4), is_extended)
+            db.messages[(message.frame_id, is_extended)] = message
+            continue
+        match = _SIGNAL_RE.match(line)
+        if match and message is not None:
+            mux = match.group(2)
+            message.signals.append(DbcSignal(
+                name=match.group(1),
+                start_bit=int(match.group(3)),
+                length=int(match.group(4)),
+                little_endian=match.group(5) == '1',
+                signed=match.group(6) == '-',
+                factor=float(match.group(7)),
+                offset=float(match.group(8)),
+                minimum=float(match.group(9)),
+                maximum=float(match.group(10)),
+                unit=match.group(11),
+                multiplexer=mux == 'M',
+                multiplex_value=int(mux[1:]) if mux and mux.startswith('m') else None,
+            ))
+            continue
+        if not line.startswith('SG_'):
+            message = None # Signals only follow their BO_ line
+    return db
+
+def load_dbc(dbc_file_path):
+    with open(dbc_file_path, 'r', encoding='latin-1') as f: # DBC files are usually cp1252/latin-1
+        return parse_dbc(f.read())
+
+class _SignalPlan:
+    # Precomputed byte window and shifts for extracting one signal from a payload matrix
+    def __init__(self, signal):
+        self.signal = signal
+        length = signal.length
+        if signal.little_endian:
+            self.first_byte = signal.start_bit // 8
+            self.last_byte = (signal.start_bit + length - 1) // 8
+            self.shift = signal.start_bit - 8 * self.first_byte
+        else:
+            # Motorola: start bit is the MSB in sawtooth numbering; convert to a linear MSB-first position
+            msb = (signal.start_bit // 8) * 8 + (7 - signal.start_bit % 8)
+            self.first_byte = msb // 8
+            self.last_byte = (msb + length - 1) // 8
+            self.shift = 8 * (self.last_byte + 1) - (msb + length)
+        if self.last_byte - self.first_byte + 1 > 8:
+            raise ValueError(f"Signal {signal.name} spans more than 8 bytes; not supported")
+        self.mask = np.uint64((1 << length) - 1)
+
+    def raw_values(self, payload):
+        window = payload[:, self.first_byte:self.last_byte + 1].astype(np.uint64)
+        raw = np.zeros(len(payload), dtype=np.uint64)
+        byte_count = window.shape[1]
+        for i in range(byte_count):
+            # Intel assembles the window least significant byte first, Motorola most significant first
+            position = i if self.signal.little_endian else byte_count - 1 - i
+            raw |= window[:, i] << np.uint64(8 * position)
+        return (raw >> np.uint64(self.shift)) & self.mask
+
+    def physical_values(self, payload):
+        raw = self.raw_values(payload)
+        signal = self.signal
+        if signal.signed:
+            values = raw.view(np.int64)
+            if signal.length < 64:
+                sign_bit = np.int64(1 << (signal.length - 1))
+                values = (values ^ sign_bit) - sign_bit # Sign-extend the two's complement field
+        else:
+            values = raw
+        return values.astype(np.float64) * signal.factor + signal.offset
+
+class SignalDecoder:
+    # Decodes every signal of a message for all of its frames at once. Decode plans are
+    # built once per (arbitration ID, frame format) and reused for later calls.
+    def __init__(self, db):
+        self.db = db
+        self._plans = {}
+
+    def _plan_for(self, can_id, is_extended_id, payload_width):
+        key = (can_id, is_extended_id, payload_width)
+        plan = self._plans.get(key)
+        if plan is None:
+            message = self.db.get_message(can_id, is_extended_id)
+            plan = []
+            if message is not None:
+                for signal in message.signals:
+                    try:
+                        signal_plan = _SignalPlan(signal)
+                    except ValueError as e:
+                        print(f"Skipping signal: {e}")
+                        continue
+                    if signal_plan.last_byte >= payload_width:
+                        print(f"Skipping signal {signal.name}: lies outside the {payload_width}-byte payload")
+                        continue
+                    plan.append(signal_plan)
+            self._plans[key] = plan
+        return plan
+
+    def decode(self, can_id, payload, signal_names=None, is_extended_id=False, dlc=None):
+        # Returns {signal name: float64 array aligned with payload rows}; rows where a
+        # multiplexed signal is absent are NaN. With dlc, signals reaching past a frame's DLC
+        # (zero padding in the payload matrix) are NaN for that frame too.
+        plan = self._plan_for(can_id, is_extended_id, payload.shape[1])
+        mux_values = None
+        mux_missing = None
+        for signal_plan in plan:
+            if signal_plan.signal.multiplexer:
+                mux_values = signal_plan.raw_values(payload)
+                if dlc is not None:
+                    mux_missing = dlc <= signal_plan.last_byte
+        decoded = {}
+        for signal_plan in plan:
+            signal = signal_plan.signal
+            if signal_names is not None and signal.name not in signal_names:
+                continue
+            values = signal_plan.physical_values(payload)
+            if signal.multiplex_value is not None and mux_values is not None:
+                values[mux_values != signal.multiplex_value] = np.nan
+                if mux_missing is not None:
+                    values[mux_missing] = np.nan
+            if dlc is not None:
+                values[dlc <= signal_plan.last_byte] = np.nan
+            decoded[signal.name] = values
+        return decoded
+
+    def decode_frames(self, timestamps, arbitration_ids, payload, can_ids=None, signal_names=None,
+                      is_extended_id=None, dlc=None):
+        # Tidy per-signal time series for a whole log: one row per (frame, signal). Frames are
+        # matched to DBC messages by ID and format (is_extended_id; all standard when None).
+        extended = (np.zeros(len(arbitration_ids), dtype=bool) if is_extended_id is None
+                    else np.asarray(is_extended_id, dtype=bool))
+        keys = np.asarray(arbitration_ids, dtype=np.uint64) | (extended.astype(np.uint64) << np.uint64(32))
+        order = np.argsort(keys, kind='stable') # Group frames by ID and format once, keeping time order
+        sorted_keys = keys[order]
+        unique_keys, starts = np.unique(sorted_keys, return_index=True)
+        ends = np.append(starts[1:], len(sorted_keys))
+
+        parts = []
+        for key, start, end in zip(unique_keys, starts, ends):
+            can_id = int(key) & 0xFFFFFFFF
+            is_extended = bool(int(key) >> 32)
+            message = self.db.get_message(can_id, is_extended)
+            if message is None or (can_ids is not None and can_id not in can_ids):
+                continue
+            units = {signal.name: signal.unit for signal in message.signals}
+            rows = order[start:end]
+            frame_times = timestamps[rows]
+            frame_dlc = dlc[rows] if dlc is not None else None
+            for name, values in self.decode(can_id, payload[rows], signal_names, is_extended, frame_dlc).items():
+                present = ~np.isnan(values)
+                parts.append(pd.DataFrame({
+                    'timestamp': frame_times[present],
+                    'arbitration_id': np.uint32(can_id),
+                    'is_extended_id': is_extended,
+                    'message': message.name,
+                    'signal': name,
+                    'value': values[present],
+                    'unit': units[name],
+                }))
+        if not parts:
+            return pd.DataFrame(columns=['timestamp', 'arbitration_id', 'is_extended_id', 'message', 'signal',
+                                         'value', 'unit'])
+        return pd.concat(parts, ignore_index=True).sort_values(['signal', 'timestamp'], kind='stable',
+                                                               ignore_index=True)
+
+# Example Usage (for testing can_dbc.py independently)
+if __name__ == "__main__":
+    example = '''
+BO_ 256 EngineData: 8 ECU
+ SG_ EngineSpeed : 0|16@1+ (0.25,0) [0|16383.75] "rpm" Vector__XXX
+ SG_ CoolantTemp : 16|8@1- (1,-40) [-40|215] "degC" Vector__XXX
+ SG_ Throttle : 31|12@0+ (0.1,0) [0|409.5] "%" Vector__XXX
+'''
+    db = parse_dbc(example)
+    print(db.messages)
+    payload = np.array([[0x40, 0x1F, 0x5A, 0x03, 0xE8, 0, 0, 0]], dtype=np.uint8)
+    print(SignalDecoder(db).decode(0x100, payload))
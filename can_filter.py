@@ -0,0 +1,76 @@
+# can_filter.py
+import can
+
+STANDARD_ID_COUNT = 1 << 11
+EXTENDED_ID_MASK = 0x1FFFFFFF
+
+def backend_supports_filtering(bus):
+    # True if the backend applies acceptance filters itself (in the kernel, driver or hardware)
+    # rather than python-can matching every frame against the filter list after it is received.
+    internal = getattr(type(bus), '_apply_filters', None)
+    return internal is not None and internal is not can.BusABC._apply_filters
+
+class CompiledIdFilter:
+    # python-can style acceptance filters ([{'can_id': ..., 'can_mask': ..., 'extended': ...}]) compiled
+    # once into constant-time lookups: a 2048-entry bitmap for 11-bit IDs, and for 29-bit IDs a hash
+    # set of exact IDs plus one hash set per distinct mask. A frame matches when
+    # (id & can_mask) == (can_id & can_mask) for any filter; 'extended', if given, must match too.
+    # An empty or None filter list accepts everything.
+    def __init__(self, filters):
+        self.filters = list(filters or [])
+        self.accept_all = not self.filters
+        self.passed = 0
+        self.rejected = 0
+
+        self._standard = bytearray(STANDARD_ID_COUNT)
+        self._extended_exact = set()
+        self._extended_masked = {} # mask -> set of (can_id & mask)
+        for flt in self.filters:
+            can_id = flt['can_id']
+            mask = flt['can_mask']
+            extended = flt.get('extended')
+            if extended is not True:
+                std_mask = mask & 0x7FF
+                std_value = can_id & std_mask
+                for candidate in range(STANDARD_ID_COUNT):
+                    if candidate & std_mask == std_value:
+                        self._standard[candidate] = 1
+            if extended is not False:
+                ext_mask = mask & EXTENDED_ID_MASK
+                if ext_mask == EXTENDED_ID_MASK:
+                    self._extended_exact.add(can_id & EXTENDED_ID_MASK)
+                else:
+                    self._extended_masked.setdefault(ext_mask, set()).add(can_id & ext_mask)
+        self._masked_items = list(self._extended_masked.items())
+
+    def match_id(self, arbitration_id, is_extended_id):
+        if self.accept_all:
+            return True
+        if not is_extended_id:
+            return self._standard[arbitration_id & 0x7FF] == 1
+        if arbitration_id in self._extended_exact:
+            return True
+        for mask, values in self._masked_items:
+            if arbitration_id & mask in values:
+                return True
+        return False
+
+    def __call__(self, msg):
+        # Counting match used on the receive path
+        if self.match_id(msg.arbitration_id, msg.is_extended_id):
+            self.passed += 1
+            return True
+        self.rejected += 1
+        return False
+
+# Example Usage (for testing can_filter.py independently)
+if __name__ == "__main__":
+    id_filter = CompiledIdFilter([
+        {'can_id': 0x100, 'can_mask': 0x7F0, 'extended': False}, # 0x100..0x10F
+        {'can_id': 0x18FEF100, 'can_mask': 0x1FFFFFFF, 'extended': True}, # One J1939 PGN/source
+        {'can_id': 0x00FECA00, 'can_mask': 0x00FFFF00, 'extended': True}, # DM1 from any source
+    ])
+    for can_id, extended in [(0x105, False), (0x200, False), (0x18FEF100, True), (0x18FECA03, True), (0x18FEF200, True)]:
+        msg = can.Message(arbitration_id=can_id, is_extended_id=extended)
+        print(f"0x{can_id:X} ({'ext' if extended else 'std'}): {'pass' if id_filter(msg) else 'drop'}")
+    print(f"passed={id_filter.passed} rejected={id_filter.rejected}")
@@ -0,0 +1,168 @@
+# can_index.py
+import os
+import sys
+import json
+import struct
+import bisect
+from array import array
+
+# Sidecar index for CSV logs, stored next to the log as '<log>.idx':
+#   magic (8s), header length (I), JSON header, then uint64 row byte offsets grouped by arbitration ID.
+# The JSON header maps each ID to its [start, count] slice of the offset table and lists
+# coarse time buckets as [bucket_start_time, byte offset of the first row in that bucket].
+INDEX_MAGIC = b'PYCANIDX'
+INDEX_VERSION = 1
+INDEX_SUFFIX = '.idx'
+DEFAULT_BUCKET_SECONDS = 1.0
+_PREFIX_STRUCT = struct.Struct('<8sI')
+
+def index_path_for(log_file_path):
+    return log_file_path + INDEX_SUFFIX
+
+class CsvLogIndexBuilder:
+    def __init__(self, columns, bucket_seconds=DEFAULT_BUCKET_SECONDS):
+        self.columns = list(columns)
+        self.bucket_seconds = bucket_seconds
+        self.offsets_by_id = {} # arbitration ID -> array('Q') of row byte offsets
+        self.buckets = [] # [bucket_start_time, first row offset], in file order
+        self._last_bucket = None
+        self.rows = 0
+
+    def add(self, can_id, timestamp, offset):
+        offsets = self.offsets_by_id.get(can_id)
+        if offsets is None:
+            offsets = self.offsets_by_id[can_id] = array('Q')
+        offsets.append(offset)
+
+        bucket = int(timestamp // self.bucket_seconds)
+        # Logs are written in arrival order; a late frame never moves a bucket boundary backwards
+        if self._last_bucket is None or bucket > self._last_bucket:
+            self.buckets.append([bucket * self.bucket_seconds, offset])
+            self._last_bucket = bucket
+        self.rows += 1
+
+    def write(self, index_file_path, log_size):
+        table = array('Q')
+        ids = {}
+        for can_id in sorted(self.offsets_by_id):
+            offsets = self.offsets_by_id[can_id]
+            ids[str(can_id)] = [len(table), len(offsets)]
+            table.extend(offsets)
+
+        header = json.dumps({
+            'version': INDEX_VERSION,
+            'columns': self.columns,
+            'bucket_seconds': self.bucket_seconds,
+            'rows': self.rows,
+            'log_size': log_size, # Lets readers detect a log that grew after indexing
+            'ids': ids,
+            'buckets': self.buckets,
+        }).encode('ascii')
+
+        tmp_path = index_file_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(_PREFIX_STRUCT.pack(INDEX_MAGIC, len(header)))
+            f.write(header)
+            if sys.byteorder != 'little':
+                table.byteswap() # Offsets are stored little endian
+            table.tofile(f)
+        os.replace(tmp_path, index_file_path) # Never leave a half-written index behind
+
+def scan_csv_log(log_file_path, bucket_seconds=DEFAULT_BUCKET_SECONDS):
+    # Builds an index for an existing CSV log in one sequential pass.
+    # Rows written by CanLogger never contain quoted commas, so a plain split is enough.
+    with open(log_file_path, 'rb') as f:
+        header_line = f.readline()
+        columns = header_line.decode('ascii').strip().split(',')
+        if 'arbitration_id' not in columns or 'timestamp' not in columns:
+            raise ValueError("Log must contain 'timestamp' and 'arbitration_id' columns to be indexed")
+        id_col = columns.index('arbitration_id')
+        ts_col = columns.index('timestamp')
+
+        builder = CsvLogIndexBuilder(columns, bucket_seconds)
+        offset = len(header_line)
+        for line in f:
+            if not line.endswith(b'\n'):
+                break # Partial last row of a log that is still being written
+            fields = line.split(b',')
+            try:
+                builder.add(int(fields[id_col], 16), float(fields[ts_col]), offset)
+            except (ValueError, IndexError):
+                pass # Skip malformed rows, but keep offsets in step
+            offset += len(line)
+    return builder, offset
+
+def rebuild_index(log_file_path, bucket_seconds=DEFAULT_BUCKET_SECONDS):
+    builder, indexed_size = scan_csv_log(log_file_path, bucket_seconds)
+    builder.write(index_path_for(log_file_path), indexed_size)
+    print(f"Indexed {builder.rows} rows ({len(builder.offsets_by_id)} IDs) in {index_path_for(log_file_path)}")
+    return builder
+
+class CsvLogIndex:
+    def __init__(self, index_file_path, header, table_offset):
+        self.index_file_path = index_file_path
+        self.columns = header['columns']
+        self.bucket_seconds = header['bucket_seconds']
+        self.rows = header['rows']
+        self.log_size = header['log_size']
+        self.ids = {int(can_id): slice_ for can_id, slice_ in header['ids'].items()}
+        self.bucket_times = [bucket[0] for bucket in header['buckets']]
+        self.bucket_offsets = [bucket[1] for bucket in header['buckets']]
+        self._table_offset = table_offset
+
+    def is_current(self, log_file_path):
+        # Logs are only ever appended to; a size mismatch means rows are missing from the index
+        return os.path.exists(log_file_path) and os.path.getsize(log_file_path) == self.log_size
+
+    def offsets_for(self, can_id):
+        start, count = self.ids.get(can_id, (0, 0))
+        offsets = array('Q')
+        if count:
+            with open(self.index_file_path, 'rb') as f:
+                f.seek(self._table_offset + start * offsets.itemsize)
+                offsets.fromfile(f, count)
+            if sys.byteorder != 'little':
+                offsets.byteswap()
+        return offsets
+
+    def byte_range(self, start_time=None, end_time=None):
+        # Byte range of the log that covers [start_time, end_time]; rows still need an exact filter
+        if not self.bucket_offsets:
+            return None, None
+        start = self.bucket_offsets[0]
+        if start_time is not None:
+            i = bisect.bisect_right(self.bucket_times, start_time) - 1
+            start = self.bucket_offsets[max(i, 0)]
+        end = self.log_size
+        if end_time is not None:
+            i = bisect.bisect_right(self.bucket_times, end_time)
+            if i < len(self.bucket_offsets):
+                end = self.bucket_offsets[i]
+        return start, end
+
+def load_index(log_file_path):
+    index_file_path = index_path_for(log_file_path)
+    if not os.path.exists(index_file_path):
+        return None
+    try:
+        with open(index_file_path, 'rb') as f:
+            magic, header_len = _PREFIX_STRUCT.unpack(f.read(_PREFIX_STRUCT.size))
+            if magic != INDEX_MAGIC:
+                print(f"Ignoring {index_file_path}: not a CAN log index")
+                return None
+            header = json.loads(f.read(header_len))
+        if header.get('version') != INDEX_VERSION:
+            print(f"Ignoring {index_file_path}: unsupported index version {header.get('version')}")
+            return None
+        return CsvLogIndex(index_file_path, header, _PREFIX_STRUCT.size + header_len)
+    except (OSError, ValueError, struct.error) as e:
+        print(f"Error reading index {index_file_path}: {e}")
+        return None
+
+# Rebuild the index of an existing log: python can_index.py [log_file] [bucket_seconds]
+if __name__ == "__main__":
+    from config import LOG_FILE_PATH
+
+    log_path = sys.argv[1] if len(sys.argv) > 1 else LOG_FILE_PATH
+    bucket = float(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_BUCKET_SECONDS
+    rebuild_index(log_path, bucket)
@@ -2,23 +2,40 @@
 import can
 import time
 import threading
+from can_scheduler import PeriodicScheduler
+from can_filter import CompiledIdFilter, backend_supports_filtering
+from can_metrics import metrics
 
 class CanInterface:
-    def __init__(self, channel, bustype, bitrate):
+    def __init__(self, channel, bustype, bitrate, filters=None):
         self.channel = channel
         self.bustype = bustype
         self.bitrate = bitrate
+        self.filters = filters # python-can style acceptance filters, None to receive everything
+        self.hardware_filtering = False
+        self.id_filter = CompiledIdFilter(filters) # Software fallback when the backend cannot filter
         self.bus = None
         self.is_connected = False
         # self.received_messages = [] # Not used directly in this version with callback
         # self._lock = threading.Lock() # Not used directly in this version with callback
-        self.listener_thread = None
+        self.notifier = None
+        self.scheduler = None
+        self._frames_sent = metrics.counter('can_frames_sent_total', 'Frames sent through CanInterface')
+        self._send_errors = metrics.counter('can_send_errors_total', 'Failed sends')
+        self._filtered_source = None # can_frames_filtered_total source while connected, see connect()
 
     def connect(self):
         try:
             # For virtual bus, `can.Bus` directly creates the virtual interface
             self.bus = can.interface.Bus(channel=self.channel, bustype=self.bustype, bitrate=self.bitrate)
+            self._apply_filters()
             self.is_connected = True
+            # One source per connected interface; the registry sums them across all buses and keeps
+            # the count of this connection after disconnect() removes it
+            rejected_before = self.id_filter.rejected
+            self._filtered_source = metrics.counter_function(
+                'can_frames_filtered_total', 'Frames rejected by the software acceptance filter',
+                lambda: self.id_filter.rejected - rejected_before)
             print(f"Successfully connected to CAN bus: {self.bustype} on {self.channel} at {self.bitrate} bps")
             return True
         except Exception as e:
@@ -26,11 +43,42 @@ class CanInterface:
             self.is_connected = False
             return False
 
+    def _apply_filters(self):
+        # Push the filters down to the kernel/driver when the backend supports it, so rejected
+        # frames never reach Python. Otherwise they are checked by the compiled software filter
+        # in front of the receive callback (see start_listening).
+        self.hardware_filtering = False
+        if not self.filters:
+            return
+        if backend_supports_filtering(self.bus):
+            try:
+                self.bus.set_filters(self.filters)
+                self.hardware_filtering = True
+                print(f"Acceptance filters applied by the {self.bustype} backend.")
+                return
+            except Exception as e:
+                print(f"Backend filtering not available ({e}); filtering in software")
+        print("Acceptance filters applied in software.")
+
+    def filter_stats(self):
+        # Frames rejected by the acceptance filters. Frames dropped in the kernel/driver are not
+        # visible to us, so 'rejected' is None when filtering is done by the backend.
+        if self.hardware_filtering:
+            return {'mode': 'backend', 'passed': None, 'rejected': None}
+        return {'mode': 'software' if self.filters else 'off',
+                'passed': self.id_filter.passed, 'rejected': self.id_filter.rejected}
+
     def disconnect(self):
+        self.stop_periodic_schedule()
         if self.bus:
-            # If a listener thread is active, it will naturally stop when is_connected becomes False
+            if self.notifier is not None:
+                self.notifier.stop() # Joins the Notifier's receive thread
+                self.notifier = None
             self.bus.shutdown()
             self.is_connected = False
+            if self._filtered_source is not None:
+                self._filtered_source.remove()
+                self._filtered_source = None
             print("Disconnected from CAN bus.")
 
     def start_listening(self, callback=None):
@@ -38,22 +86,40 @@ class CanInterface:
             print("Not connected to CAN bus. Cannot start listening.")
             return
 
-        def receive_loop():
-            # Use a Notifier for asynchronous reception, which is more robust for GUIs
-            # Note: The Notifier processes messages on its own internal thread.
-            # The callback will be called from that thread, so ensure UI updates are thread-safe (handled by Tkinter's mainloop)
-            self.notifier = can.Notifier(self.bus, [callback], timeout=1.0) # Pass the callback directly
-            # The loop here is just to keep the thread alive while notifier runs
-            while self.is_connected:
-                time.sleep(0.1) # Small sleep to not busy-wait
-
-        if self.listener_thread is None or not self.listener_thread.is_alive():
-            self.listener_thread = threading.Thread(target=receive_loop, daemon=True)
-            self.listener_thread.start()
+        # can.Notifier runs its own receive thread and calls the callback from it, so no extra
+        # keep-alive thread is needed. UI code must hand frames over to its own thread.
+        if self.notifier is None:
+            if self.filters and not self.hardware_filtering:
+                id_filter = self.id_filter
+                user_callback = callback
+                def callback(msg):
+                    if id_filter(msg):
+                        user_callback(msg)
+            if metrics.enabled:
+                callback = self._instrumented(callback)
+            self.notifier = can.Notifier(self.bus, [callback], timeout=1.0)
             print("Started listening for CAN messages.")
         else:
-            print("Listener thread is already running.")
-
+            print("Listener is already running.")
+
+
+    def _instrumented(self, callback):
+        # Receive-path metrics around the user callback (only installed when metrics are enabled)
+        received = metrics.counter('can_frames_received_total', 'Frames delivered by the bus')
+        error_frames = metrics.counter('can_error_frames_total', 'Error frames reported by the bus')
+        latency = metrics.histogram('can_rx_latency_seconds', 'Frame timestamp to receive callback')
+        duration = metrics.histogram('can_rx_callback_seconds', 'Time spent in the receive callback')
+        clock = time.perf_counter
+        wall_clock = time.time
+        def instrumented(msg):
+            start = clock()
+            received.inc()
+            if msg.is_error_frame:
+                error_frames.inc()
+            latency.observe(max(wall_clock() - msg.timestamp, 0.0))
+            callback(msg)
+            duration.observe(clock() - start)
+        return instrumented
 
     def send_message(self, arbitration_id, data, is_extended_id=False):
         if not self.is_connected:
@@ -63,13 +129,53 @@ class CanInterface:
             msg = can.Message(arbitration_id=arbitration_id,
                               data=data,
                               is_extended_id=is_extended_id)
-            self.bus.send(msg)
+        except Exception as e:
+            print(f"Error sending message: {e}")
+            return False
+        return self.send_frame(msg)
+
+    def send_frame(self, msg, timeout=None):
+        # Send a prepared can.Message as is (remote/FD flags included), e.g. frames from a log replay
+        if not self.is_connected:
+            return False
+        try:
+            self.bus.send(msg, timeout=timeout)
             # print(f"Sent: {msg}") # Suppress for periodic sender to avoid console spam
+            self._frames_sent.inc()
             return True
         except Exception as e:
+            self._send_errors.inc()
             print(f"Error sending message: {e}")
             return False
 
+    def start_periodic_schedule(self, table, use_hardware=True):
+        # table rows: (arbitration_id, payload, period_seconds[, is_extended_id]) where payload is
+        # bytes/list, a callable returning the next payload, or an iterator of payloads.
+        # Static payloads go to the backend's cyclic tasks when it implements them natively.
+        if not self.is_connected:
+            print("Not connected to CAN bus. Cannot start periodic schedule.")
+            return False
+        self.stop_periodic_schedule()
+        try:
+            self.scheduler = PeriodicScheduler(self.bus, table, use_hardware=use_hardware, send=self.send_frame)
+        except ValueError as e:
+            print(f"Invalid periodic schedule: {e}")
+            return False
+        self.scheduler.start()
+        return True
+
+    def stop_periodic_schedule(self):
+        # Returns the final per-message timing statistics, or None if nothing was running
+        if self.scheduler is None:
+            return None
+        self.scheduler.stop()
+        stats = self.scheduler.stats()
+        self.scheduler = None
+        return stats
+
+    def periodic_schedule_stats(self):
+        return self.scheduler.stats() if self.scheduler is not None else {}
+
 # Example Usage (for testing can_interface.py independently)
 if __name__ == "__main__":
     from config import CAN_CHANNEL, CAN_BUSTYPE, CAN_BITRATE
@@ -92,8 +198,18 @@ if __name__ == "__main__":
             can_interface.send_message(0x100 + i, [i, i*2, i*3])
             time.sleep(0.1)
 
+        print("\nRunning a periodic schedule (1 ms, 10 ms, 100 ms)...")
+        counter = iter(range(1 << 30))
+        can_interface.start_periodic_schedule([
+            (0x010, lambda: [next(counter) % 256], 0.001),
+            (0x020, [0xAA, 0x55], 0.010),
+            (0x030, [0x01], 0.100),
+        ])
+
         print("\nLetting it run for a few seconds to receive...")
         time.sleep(3) # Let the listener receive messages
+        for index, stats in can_interface.stop_periodic_schedule().items():
+            print(f"#{index} 0x{stats['arbitration_id']:X}: {stats}")
 
         can_interface.disconnect()
         print("Test finished.")
\ No newline at end of file
@@ -1,15 +1,100 @@
 # can_logger.py
 import csv
+import io
 import os
+import queue
+import struct
+import threading
+import time
 from datetime import datetime
 
+from can_index import CsvLogIndexBuilder, scan_csv_log, index_path_for, DEFAULT_BUCKET_SECONDS
+from can_metrics import metrics
+
+# Binary log layout (little endian):
+#   header: magic (8s), version (H), payload size (H), reserved (I)
+#   record: timestamp (d), arbitration_id (I), flags (B), dlc (B), data (payload size bytes, zero padded)
+BINARY_LOG_MAGIC = b'PYCANLOG'
+BINARY_LOG_VERSION = 1
+BINARY_HEADER_STRUCT = struct.Struct('<8sHHI')
+BINARY_FLAG_EXTENDED = 0x01
+BINARY_FLAG_REMOTE = 0x02
+BINARY_FLAG_ERROR = 0x04
+BINARY_FLAG_FD = 0x08
+BINARY_FLAG_BRS = 0x10
+BINARY_FLAG_ESI = 0x20
+
+def binary_record_struct(payload_size):
+    return struct.Struct(f'<dIBB{payload_size}s')
+
+_STOP = object() # Sentinel telling the writer thread to drain and exit
+WRITE_BATCH_SIZE = 4096 # Max frames serialized per writerows() call
+
+def _compile_row_formatter(log_format):
+    # Resolve every LOG_FORMAT field to an extractor once, so formatting a frame
+    # is a single list comprehension instead of an if/elif walk per field.
+    extractors = {
+        'timestamp': lambda msg: msg.timestamp,
+        'arbitration_id': lambda msg: f"0x{msg.arbitration_id:X}", # Hex format
+        'is_extended_id': lambda msg: msg.is_extended_id,
+        'is_remote_frame': lambda msg: msg.is_remote_frame,
+        'is_error_frame': lambda msg: msg.is_error_frame,
+        'dlc': lambda msg: msg.dlc,
+        'data': lambda msg: msg.data.hex(), # Hex string for data
+        'channel': lambda msg: '' if msg.channel is None else msg.channel, # Set by multi-bus capture
+    }
+    getters = [extractors.get(field, lambda msg: '') for field in log_format] # '' for unknown fields
+
+    def format_row(msg):
+        return [getter(msg) for getter in getters]
+    return format_row
+
 class CanLogger:
-    def __init__(self, log_file_path, log_format):
+    def __init__(self, log_file_path, log_format, async_mode=False, flush_every_n=None,
+                 flush_interval_ms=None, queue_size=100000, index=False,
+                 index_bucket_seconds=DEFAULT_BUCKET_SECONDS):
         self.log_file_path = log_file_path
         self.log_format = log_format
         self.file = None
         self.writer = None
         self.file_opened = False
+        self._format_row = _compile_row_formatter(log_format)
+
+        # Flush policy: with neither limit set every write is flushed (the original behaviour)
+        self.flush_every_n = flush_every_n
+        self.flush_interval_ms = flush_interval_ms
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+        # Asynchronous mode: log_message only enqueues, a writer thread does the file I/O
+        self.async_mode = async_mode
+        self.queue_size = queue_size
+        self._queue = None
+        self._writer_thread = None
+        self.queue_high_water = 0
+        self.frames_logged = 0
+        self.frames_dropped = 0 # Frames rejected because the queue was full
+
+        # Optional sidecar index (see can_index.py), written when the log is closed
+        self.index = index and 'arbitration_id' in log_format and 'timestamp' in log_format
+        if index and not self.index:
+            print("Log index disabled: LOG_FORMAT needs 'timestamp' and 'arbitration_id' columns")
+        self.index_bucket_seconds = index_bucket_seconds
+        self._index_builder = None
+        self._offset = 0 # Byte offset of the next row, tracked while indexing
+
+        # Instrumentation, shared by every logger in the process (rotation and triggered capture open many).
+        # Totals are counted per batch/drop; the queue gauges read this logger while its writer runs.
+        self._write_seconds = metrics.histogram('can_log_write_seconds', 'Time to serialize and write one batch')
+        self._flush_seconds = metrics.histogram('can_log_flush_seconds', 'Time spent in file flush()')
+        self._logged_total = metrics.counter('can_frames_logged_total', 'Frames written to the log')
+        self._dropped_total = metrics.counter('can_log_frames_dropped_total',
+                                              'Frames dropped because the log queue was full')
+        self._metric_sources = []
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize() if self._queue is not None else 0
 
     def _open_file(self):
         try:
@@ -20,13 +105,54 @@ class CanLogger:
             # Check if file is empty or newly created to write header
             if not file_exists or os.path.getsize(self.log_file_path) == 0:
                 self.writer.writerow(self.log_format) # Write header
+            if self.index:
+                self.file.flush()
+                if file_exists and os.path.getsize(self.log_file_path) > 0:
+                    # Appending to an existing log: index the rows already in it first
+                    self._index_builder, self._offset = scan_csv_log(self.log_file_path, self.index_bucket_seconds)
+                else:
+                    self._index_builder = CsvLogIndexBuilder(self.log_format, self.index_bucket_seconds)
+                    self._offset = os.path.getsize(self.log_file_path)
             self.file_opened = True
+            self._unflushed = 0
+            self._last_flush = time.monotonic()
             print(f"Logging to: {self.log_file_path}")
         except IOError as e:
             print(f"Error opening log file {self.log_file_path}: {e}")
             self.file_opened = False
+            return
+
+        if self.async_mode:
+            self._start_writer()
+
+    def _start_writer(self):
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self.queue_high_water = 0
+        self._metric_sources = [
+            metrics.gauge('can_log_queue_depth', 'Frames waiting for log writer threads', lambda: self.queue_depth),
+            metrics.gauge('can_log_queue_high_water', 'Highest queue depth of the open logs',
+                          lambda: self.queue_high_water, aggregate=max),
+        ]
+        self._writer_thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self._writer_thread.start()
 
     def log_message(self, msg):
+        if self.async_mode:
+            # Safe to call from the receive thread. Never opens the file here, so a frame
+            # arriving just after close() cannot resurrect the writer.
+            if not self.file_opened:
+                return
+            try:
+                self._queue.put_nowait(msg)
+            except queue.Full:
+                self.frames_dropped += 1
+                self._dropped_total.inc()
+                return
+            depth = self._queue.qsize()
+            if depth > self.queue_high_water:
+                self.queue_high_water = depth
+            return
+
         if not self.file_opened:
             # This should ideally be called once before logging starts (e.g., by toggle_logging)
             # But as a fallback, try to open if not already.
@@ -35,37 +161,168 @@ class CanLogger:
                 return # Can't log if file couldn't be opened
 
         try:
-            row = []
-            for field in self.log_format:
-                if field == 'timestamp':
-                    row.append(msg.timestamp)
-                elif field == 'arbitration_id':
-                    row.append(f"0x{msg.arbitration_id:X}") # Hex format
-                elif field == 'is_extended_id':
-                    row.append(msg.is_extended_id)
-                elif field == 'is_remote_frame':
-                    row.append(msg.is_remote_frame)
-                elif field == 'is_error_frame':
-                    row.append(msg.is_error_frame)
-                elif field == 'dlc':
-                    row.append(msg.dlc)
-                elif field == 'data':
-                    row.append(msg.data.hex()) # Hex string for data
-                else:
-                    row.append('') # Placeholder for unknown/unmatched fields
-
-            self.writer.writerow(row)
-            self.file.flush() # Ensure data is written to disk immediately
+            self._timed_write([msg])
         except Exception as e:
             print(f"Error logging message: {e}")
 
+    def _timed_write(self, msgs):
+        if not metrics.enabled:
+            self._write_batch(msgs)
+            return
+        start = time.perf_counter()
+        self._write_batch(msgs)
+        self._write_seconds.observe(time.perf_counter() - start)
+
+    def _write_batch(self, msgs):
+        if self._index_builder is not None:
+            self._write_indexed_batch(msgs)
+        else:
+            self.writer.writerows(map(self._format_row, msgs))
+        self.frames_logged += len(msgs)
+        self._logged_total.inc(len(msgs))
+        self._unflushed += len(msgs)
+        self._maybe_flush()
+
+    def _write_indexed_batch(self, msgs):
+        # Serialize into a buffer first so each row's byte offset is known (rows are ASCII)
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        offset = self._offset
+        add = self._index_builder.add
+        for msg in msgs:
+            add(msg.arbitration_id, msg.timestamp, offset)
+            writer.writerow(self._format_row(msg))
+            offset = self._offset + buf.tell()
+        self.file.write(buf.getvalue())
+        self._offset = offset
+
+    def _maybe_flush(self):
+        if not self._unflushed:
+            return
+        if self.flush_every_n is None and self.flush_interval_ms is None:
+            due = True
+        else:
+            due = ((self.flush_every_n is not None and self._unflushed >= self.flush_every_n) or
+                   (self.flush_interval_ms is not None and
+                    (time.monotonic() - self._last_flush) * 1000 >= self.flush_interval_ms))
+        if due:
+            if metrics.enabled:
+                start = time.perf_counter()
+                self.file.flush()
+                self._flush_seconds.observe(time.perf_counter() - start)
+            else:
+                self.file.flush()
+            self._unflushed = 0
+            self._last_flush = time.monotonic()
+
+    def _writer_loop(self):
+        # Group commit: block for the first frame, then grab whatever else is already queued
+        # and serialize it with a single writerows() call.
+        poll_timeout = (self.flush_interval_ms / 1000) if self.flush_interval_ms else 0.1
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=poll_timeout)
+            except queue.Empty:
+                self._maybe_flush() # Honour the time-based policy on an idle bus
+                continue
+
+            batch = []
+            while True:
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+                if len(batch) >= WRITE_BATCH_SIZE:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if batch:
+                try:
+                    self._timed_write(batch)
+                except Exception as e:
+                    print(f"Error logging messages: {e}")
+
     def close(self):
         if self.file_opened and self.file:
+            self.file_opened = False # Stop accepting new frames
+            if self._writer_thread is not None:
+                self._queue.put(_STOP) # Blocking put: the sentinel must not be dropped
+                self._writer_thread.join() # Writer drains everything queued before the sentinel
+                self._writer_thread = None
+            for source in self._metric_sources:
+                source.remove()
+            self._metric_sources = []
             self.file.close()
             self.file = None # Clear file handle
             self.writer = None # Clear writer
+            if self._index_builder is not None:
+                try:
+                    self._index_builder.write(index_path_for(self.log_file_path), self._offset)
+                except OSError as e:
+                    print(f"Error writing log index: {e}")
+                self._index_builder = None
+            print(f"Log file closed. Frames logged: {self.frames_logged}, dropped: {self.frames_dropped}, "
+                  f"queue high-water mark: {self.queue_high_water}")
+
+class BinaryCanLogger(CanLogger):
+    # Fixed-width binary backend: 22 bytes per classic CAN frame (78 for CAN FD),
+    # readable with a memory map (see CanAnalyzer.load_log_data).
+    def __init__(self, log_file_path, log_format=None, payload_size=8, **kwargs):
+        if payload_size not in (8, 64):
+            raise ValueError("payload_size must be 8 (classic CAN) or 64 (CAN FD)")
+        super().__init__(log_file_path, log_format or [], **kwargs) # log_format is CSV-only
+        self.payload_size = payload_size
+        self._record = binary_record_struct(payload_size)
+
+    def _open_file(self):
+        try:
+            file_exists = os.path.exists(self.log_file_path) and os.path.getsize(self.log_file_path) > 0
+            if file_exists:
+                # Only append to a log with the same record layout
+                with open(self.log_file_path, 'rb') as f:
+                    magic, version, payload_size, _ = BINARY_HEADER_STRUCT.unpack(f.read(BINARY_HEADER_STRUCT.size))
+                if magic != BINARY_LOG_MAGIC or version != BINARY_LOG_VERSION or payload_size != self.payload_size:
+                    print(f"Error opening log file {self.log_file_path}: incompatible binary log header")
+                    self.file_opened = False
+                    return
+            self.file = open(self.log_file_path, 'ab')
+            if not file_exists:
+                self.file.write(BINARY_HEADER_STRUCT.pack(BINARY_LOG_MAGIC, BINARY_LOG_VERSION, self.payload_size, 0))
+            self.file_opened = True
+            self._unflushed = 0
+            self._last_flush = time.monotonic()
+            print(f"Logging to: {self.log_file_path}")
+        except (IOError, struct.error) as e:
+            print(f"Error opening log file {self.log_file_path}: {e}")
             self.file_opened = False
-            print("Log file closed.")
+            return
+
+        if self.async_mode:
+            self._start_writer()
+
+    def _write_batch(self, msgs):
+        record = self._record
+        buf = bytearray(record.size * len(msgs))
+        offset = 0
+        for msg in msgs:
+            flags = ((BINARY_FLAG_EXTENDED if msg.is_extended_id else 0) |
+                     (BINARY_FLAG_REMOTE if msg.is_remote_frame else 0) |
+                     (BINARY_FLAG_ERROR if msg.is_error_frame else 0) |
+                     (BINARY_FLAG_FD if msg.is_fd else 0) |
+                     (BINARY_FLAG_BRS if msg.bitrate_switch else 0) |
+                     (BINARY_FLAG_ESI if msg.error_state_indicator else 0))
+            record.pack_into(buf, offset, msg.timestamp, msg.arbitration_id, flags, msg.dlc,
+                             bytes(msg.data[:self.payload_size]))
+            offset += record.size
+        self.file.write(buf)
+        self.frames_logged += len(msgs)
+        self._logged_total.inc(len(msgs))
+        self._unflushed += len(msgs)
+        self._maybe_flush()
 
 # Example Usage (for testing can_logger.py independently)
 if __name__ == "__main__":
@@ -79,7 +336,8 @@ if __name__ == "__main__":
         os.remove(LOG_FILE_PATH)
         print(f"Removed existing log file: {LOG_FILE_PATH}")
 
-    logger = CanLogger(LOG_FILE_PATH, LOG_FORMAT)
+    logger = CanLogger(LOG_FILE_PATH, LOG_FORMAT, async_mode=True, flush_every_n=1000, flush_interval_ms=500)
+    logger._open_file()
 
     # Simulate receiving messages
     dummy_messages = [
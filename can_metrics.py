@@ -0,0 +1,323 @@
+# can_metrics.py
+# Low-overhead counters, gauges and histograms for the receive/log/display hot paths, exposed as a
+# snapshot dict, an optional periodic JSON dump and an optional localhost Prometheus text endpoint.
+# When metrics are disabled every metric is a shared no-op object and hot paths skip their timing
+# calls behind a single `if metrics.enabled` check.
+import bisect
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import METRICS_ENABLED, METRICS_HTTP_PORT, METRICS_JSON_PATH, METRICS_JSON_INTERVAL_S
+
+# Upper bounds in seconds, 10 us .. 1 s
+DEFAULT_BUCKETS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0)
+
+class CounterMetric:
+    # Monotonic count. Safe to increment from several threads (e.g. one Notifier thread per bus);
+    # the lock is only taken when metrics are enabled, disabled counters are _NULL_METRIC.
+    kind = 'counter'
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def collect(self):
+        return self.value
+
+class MetricSource:
+    # One owner's function feeding a GaugeMetric/FunctionCounterMetric; remove() detaches it
+    def __init__(self, metric, function):
+        self.metric = metric
+        self.function = function
+
+    def read(self):
+        try:
+            return self.function()
+        except Exception:
+            return None
+
+    def remove(self):
+        self.metric.remove_source(self)
+
+class _NullSource:
+    def remove(self):
+        pass
+
+_NULL_SOURCE = _NullSource()
+
+class GaugeMetric:
+    # Current value, either set explicitly or read from functions at collection time. Every owner
+    # (e.g. each open logger) adds its own function; collect() combines them with aggregate
+    # (sum, or max for high-water marks).
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, aggregate=sum):
+        self.name = name
+        self.help = help_text
+        self.value = 0
+        self.aggregate = aggregate
+        self._sources = []
+        self._lock = threading.Lock()
+
+    def set(self, value):
+        self.value = value
+
+    def add_function(self, function):
+        source = MetricSource(self, function)
+        with self._lock:
+            self._sources.append(source)
+        return source
+
+    def remove_source(self, source):
+        with self._lock:
+            if source in self._sources:
+                self._sources.remove(source)
+
+    def _read_sources(self):
+        with self._lock:
+            sources = list(self._sources)
+        return [value for value in (source.read() for source in sources) if value is not None]
+
+    def collect(self):
+        if not self._sources:
+            return self.value
+        values = self._read_sources()
+        return self.aggregate(values) if values else None
+
+class FunctionCounterMetric(GaugeMetric):
+    # Counter whose value is an existing attribute elsewhere (e.g. CanInterface.id_filter.rejected),
+    # so the hot path pays nothing extra for it. The total is summed over all owners; a removed
+    # source keeps its last value in the total, so the counter never goes backwards.
+    kind = 'counter'
+
+    def __init__(self, name, help_text):
+        super().__init__(name, help_text)
+        self._retired = 0
+
+    def remove_source(self, source):
+        value = source.read()
+        with self._lock:
+            if source in self._sources:
+                self._sources.remove(source)
+                self._retired += value or 0
+
+    def collect(self):
+        return self._retired + sum(self._read_sources())
+
+class HistogramMetric:
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1) # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock() # Observed from several threads, e.g. one receive callback per bus
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def collect(self):
+        with self._lock:
+            counts = list(self.counts)
+            value_sum = self.sum
+        cumulative = []
+        total = 0
+        for count in counts:
+            total += count
+            cumulative.append(total)
+        return {'buckets': dict(zip([*map(str, self.buckets), '+Inf'], cumulative)),
+                'sum': value_sum, 'count': total}
+
+class _NullMetric:
+    # Stands in for every metric type when metrics are disabled
+    def inc(self, amount=1):
+        pass
+
+    def set(self, value):
+        pass
+
+    def add_function(self, function):
+        return _NULL_SOURCE
+
+    def observe(self, value):
+        pass
+
+_NULL_METRIC = _NullMetric()
+
+class MetricsRegistry:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._http_server = None
+        self._dump_stop = threading.Event()
+        self._dump_thread = None
+
+    def _register(self, cls, name, help_text, *args):
+        if not self.enabled:
+            return _NULL_METRIC
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, *args)
+            return metric
+
+    def counter(self, name, help_text=''):
+        return self._register(CounterMetric, name, help_text)
+
+    def gauge(self, name, help_text='', function=None, aggregate=sum):
+        # With a function, returns its MetricSource (remove() it when the owner goes away)
+        metric = self._register(GaugeMetric, name, help_text, aggregate)
+        if function is not None:
+            return metric.add_function(function)
+        return metric
+
+    def counter_function(self, name, help_text, function):
+        # Returns the MetricSource; on remove() its last value stays in the total
+        return self._register(FunctionCounterMetric, name, help_text).add_function(function)
+
+    def histogram(self, name, help_text='', buckets=DEFAULT_BUCKETS):
+        return self._register(HistogramMetric, name, help_text, buckets)
+
+    def snapshot(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {'timestamp': time.time(), 'metrics': {metric.name: metric.collect() for metric in metrics}}
+
+    def prometheus_text(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            value = metric.collect()
+            if metric.help:
+                lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            if metric.kind == 'histogram':
+                for bound, count in value['buckets'].items():
+                    lines.append(f'{metric.name}_bucket{{le="{bound}"}} {count}')
+                lines.append(f"{metric.name}_sum {value['sum']}")
+                lines.append(f"{metric.name}_count {value['count']}")
+            elif value is not None:
+                lines.append(f"{metric.name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def start_http_server(self, port, host='127.0.0.1'):
+        # Prometheus text format on http://host:port/metrics; localhost only by default
+        if not self.enabled or self._http_server is not None:
+            return False
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass # Keep scrapes out of the console
+
+        try:
+            self._http_server = ThreadingHTTPServer((host, port), MetricsHandler)
+        except OSError as e:
+            print(f"Error starting metrics endpoint on {host}:{port}: {e}")
+            return False
+        threading.Thread(target=self._http_server.serve_forever, daemon=True).start()
+        print(f"Metrics available at http://{host}:{port}/metrics")
+        return True
+
+    def start_json_dump(self, path, interval_s=10.0):
+        # Rewrites path with a snapshot every interval_s seconds (atomic replace)
+        if not self.enabled or self._dump_thread is not None:
+            return False
+        def dump_loop():
+            while not self._dump_stop.wait(interval_s):
+                self.dump_json(path)
+        self._dump_stop.clear()
+        self._dump_thread = threading.Thread(target=dump_loop, daemon=True)
+        self._dump_thread.start()
+        return True
+
+    def dump_json(self, path):
+        try:
+            with open(path + '.tmp', 'w') as f:
+                json.dump(self.snapshot(), f, indent=1)
+            os.replace(path + '.tmp', path)
+        except OSError as e:
+            print(f"Error writing metrics to {path}: {e}")
+
+    def start_exporters(self):
+        # Starts whatever config.py asks for
+        if METRICS_HTTP_PORT:
+            self.start_http_server(METRICS_HTTP_PORT)
+        if METRICS_JSON_PATH:
+            self.start_json_dump(METRICS_JSON_PATH, METRICS_JSON_INTERVAL_S)
+
+    def stop(self):
+        if self._http_server is not None:
+            self._http_server.shutdown()
+            self._http_server.server_close()
+            self._http_server = None
+        if self._dump_thread is not None:
+            self._dump_stop.set()
+            self._dump_thread.join()
+            self._dump_thread = None
+
+# Process-wide registry used by CanInterface, CanLogger and CanBusApp
+metrics = MetricsRegistry(enabled=METRICS_ENABLED)
+
+# Example Usage (for testing can_metrics.py independently)
+if __name__ == "__main__":
+    import urllib.request
+
+    registry = MetricsRegistry(enabled=True)
+    frames = registry.counter('demo_frames_total', 'Frames processed')
+    latency = registry.histogram('demo_latency_seconds', 'Processing latency')
+    registry.gauge('demo_queue_depth', 'Queue depth', function=lambda: 42)
+    # Two owners of one function counter: the total covers both, also after one of them is removed
+    first = registry.counter_function('demo_items_total', 'Items handled by all workers', lambda: 10)
+    registry.counter_function('demo_items_total', 'Items handled by all workers', lambda: 5)
+    first.remove()
+    print(f"demo_items_total after removing one worker: {registry.snapshot()['metrics']['demo_items_total']}")
+    shared = registry.counter('demo_shared_total', 'Incremented from several threads')
+    worker_threads = [threading.Thread(target=lambda: [shared.inc() for _ in range(100000)]) for _ in range(4)]
+    for thread in worker_threads:
+        thread.start()
+    for thread in worker_threads:
+        thread.join()
+    print(f"demo_shared_total after 4 threads x 100000 inc(): {shared.collect()}")
+    for i in range(1000):
+        frames.inc()
+        latency.observe(i * 1e-6)
+    if registry.start_http_server(9108):
+        print(urllib.request.urlopen('http://127.0.0.1:9108/metrics').read().decode()[:600])
+    registry.stop()
+
+    disabled = MetricsRegistry(enabled=False)
+    null_counter = disabled.counter('demo_frames_total')
+    start = time.perf_counter()
+    for i in range(1000000):
+        null_counter.inc()
+    print(f"Disabled counter: {(time.perf_counter() - start) * 1000:.0f} ns per inc()")
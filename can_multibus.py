@@ -0,0 +1,196 @@
+# can_multibus.py
+import heapq
+import threading
+import time
+from collections import deque
+
+from can_interface import CanInterface
+from config import CAN_CHANNELS, MULTIBUS_REORDER_WINDOW, CAN_FILTERS
+
+class _ChannelState:
+    def __init__(self, name, interface, queue_size):
+        self.name = name
+        self.interface = interface
+        self.frames = deque() # Frames received on this channel, in arrival order
+        self.queue_size = queue_size
+        self.received = 0
+        self.dropped = 0 # Frames discarded because the merge fell more than queue_size behind
+        self.emitted = 0
+        self.late = 0 # Frames of this channel emitted after a newer frame of any channel
+        self.in_heap = False
+        self.last_ts = None # Timestamp of the newest frame received on this channel
+        self.last_arrival = 0.0 # time.monotonic() when it arrived
+        self._rate_count = 0
+        self._rate_time = time.monotonic()
+
+class MultiBusCapture:
+    # Captures several CAN channels at once and emits one stream ordered by timestamp.
+    # Each channel's Notifier appends to its own FIFO (already in time order for that channel);
+    # a merge thread does a k-way heap merge over the FIFO heads. A frame is released once every
+    # channel that was active within the last reorder_window has delivered a frame at least as
+    # new, so a channel that is merely slow to deliver cannot be overtaken, while an idle channel
+    # stops holding the others back after reorder_window.
+    def __init__(self, channel_configs=None, callback=None, reorder_window=None, queue_size=100000):
+        # channel_configs: [{'name': ..., 'channel': ..., 'bustype': ..., 'bitrate': ..., 'filters': ...}, ...],
+        # default config.CAN_CHANNELS; 'filters' is optional and defaults to CAN_FILTERS
+        if channel_configs is None:
+            channel_configs = CAN_CHANNELS
+        self.callback = callback
+        self.reorder_window = reorder_window if reorder_window is not None else MULTIBUS_REORDER_WINDOW
+        self.channels = [
+            _ChannelState(config.get('name', str(config['channel'])),
+                          CanInterface(config['channel'], config['bustype'], config['bitrate'],
+                                       filters=config.get('filters', CAN_FILTERS)),
+                          queue_size)
+            for config in channel_configs
+        ]
+        self.last_emitted_ts = None
+        self.late_frames = 0 # Frames that arrived after newer frames had already been emitted
+        self._heap = []
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._merge_thread = None
+        self._started_at = 0.0
+
+    def connect(self):
+        connected = [state for state in self.channels if state.interface.connect()]
+        if len(connected) != len(self.channels):
+            for state in connected:
+                state.interface.disconnect()
+            return False
+        return True
+
+    def start(self):
+        self._stop.clear()
+        self._started_at = time.monotonic()
+        self._merge_thread = threading.Thread(target=self._merge_loop, daemon=True)
+        self._merge_thread.start()
+        for state in self.channels:
+            state.interface.start_listening(callback=lambda msg, state=state: self._on_frame(state, msg))
+
+    def _on_frame(self, state, msg):
+        # Runs on the channel's Notifier thread
+        msg.channel = state.name
+        if len(state.frames) >= state.queue_size:
+            state.dropped += 1
+            return
+        state.frames.append(msg)
+        state.received += 1
+        state.last_ts = msg.timestamp
+        state.last_arrival = time.monotonic()
+        self._wake.set()
+
+    def _merge_loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.reorder_window)
+            self._wake.clear()
+            self._merge()
+        self._merge(flush=True)
+
+    def _merge(self, flush=False):
+        heap = self._heap
+        for index, state in enumerate(self.channels):
+            if not state.in_heap and state.frames:
+                heapq.heappush(heap, (state.frames[0].timestamp, index))
+                state.in_heap = True
+
+        watermark = float('inf')
+        if not flush:
+            # Low watermark over the channels still considered active
+            active_since = time.monotonic() - self.reorder_window
+            for state in self.channels:
+                if state.last_ts is None and self._started_at >= active_since:
+                    return # Right after start, wait for every channel's Notifier to come up
+                if state.last_ts is not None and state.last_arrival >= active_since and state.last_ts < watermark:
+                    watermark = state.last_ts
+        while heap and heap[0][0] <= watermark:
+            _, index = heapq.heappop(heap)
+            state = self.channels[index]
+            msg = state.frames.popleft()
+            if state.frames:
+                heapq.heappush(heap, (state.frames[0].timestamp, index))
+            else:
+                state.in_heap = False
+
+            if self.last_emitted_ts is not None and msg.timestamp < self.last_emitted_ts:
+                self.late_frames += 1
+                state.late += 1
+            else:
+                self.last_emitted_ts = msg.timestamp
+            state.emitted += 1
+            try:
+                self.callback(msg)
+            except Exception as e:
+                print(f"Error in multi-bus callback: {e}")
+
+    def stats(self):
+        # Per-channel counters; frames_per_second covers the time since the previous stats() call
+        now = time.monotonic()
+        result = {}
+        for state in self.channels:
+            elapsed = now - state._rate_time
+            rate = (state.received - state._rate_count) / elapsed if elapsed > 0 else 0.0
+            state._rate_count = state.received
+            state._rate_time = now
+            result[state.name] = {
+                'received': state.received,
+                'emitted': state.emitted,
+                'dropped': state.dropped,
+                'late': state.late,
+                'pending': len(state.frames),
+                'frames_per_second': rate,
+            }
+        result['late_frames'] = self.late_frames
+        return result
+
+    def stop(self):
+        for state in self.channels:
+            state.interface.disconnect() # Stops the Notifier, so no more frames arrive
+        self._stop.set()
+        self._wake.set()
+        if self._merge_thread is not None:
+            self._merge_thread.join() # Final merge flushes everything still queued
+            self._merge_thread = None
+
+# Example Usage: three virtual buses captured into one merged log
+if __name__ == "__main__":
+    import os
+    import can
+    from can_logger import CanLogger
+    from config import LOG_FORMAT
+
+    channel_configs = [
+        {'name': 'powertrain', 'channel': 'demo_pt', 'bustype': 'virtual', 'bitrate': 500000},
+        {'name': 'chassis', 'channel': 'demo_ch', 'bustype': 'virtual', 'bitrate': 500000},
+        {'name': 'body', 'channel': 'demo_body', 'bustype': 'virtual', 'bitrate': 125000},
+    ]
+    log_path = 'multibus_demo.csv'
+    if os.path.exists(log_path):
+        os.remove(log_path)
+    logger = CanLogger(log_path, LOG_FORMAT + ['channel'], async_mode=True, flush_every_n=1000)
+    logger._open_file()
+
+    merged = []
+    def on_merged(msg):
+        merged.append(msg.timestamp)
+        logger.log_message(msg)
+
+    capture = MultiBusCapture(channel_configs, on_merged)
+    if capture.connect():
+        capture.start()
+        # Separate sender nodes on each virtual channel
+        senders = [can.interface.Bus(channel=config['channel'], interface='virtual') for config in channel_configs]
+        for i in range(3000):
+            bus = senders[i % len(senders)]
+            bus.send(can.Message(arbitration_id=0x100 * (i % len(senders) + 1) + i % 4, data=[i % 256],
+                                 is_extended_id=False))
+            if i % 100 == 0:
+                time.sleep(0.001)
+        time.sleep(0.2)
+        print(capture.stats())
+        capture.stop()
+        for bus in senders:
+            bus.shutdown()
+        logger.close()
+        in_order = all(a <= b for a, b in zip(merged, merged[1:]))
+        print(f"Merged {len(merged)} frames, timestamp ordered: {in_order}")
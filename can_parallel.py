@@ -0,0 +1,175 @@
+# can_parallel.py
+# Map-reduce analysis of large logs on all CPU cores. A log (or a list of rotated segments) is cut
+# into byte ranges aligned to line boundaries (record boundaries for binary logs, chunk boundaries for
+# archives); every range is parsed and aggregated by a worker process and the partial results are
+# merged in file order.
+import os
+import io
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from can_analyzer import (StreamingLogSummary, binary_record_dtype, is_binary_log, to_typed_frame,
+                          payload_to_hex, archive_columns_to_frame)
+from can_archive import ArchiveReader, is_archive_log
+from can_logger import (BINARY_HEADER_STRUCT, BINARY_FLAG_EXTENDED, BINARY_FLAG_REMOTE, BINARY_FLAG_ERROR)
+
+PARALLEL_CHUNK_BYTES = 64 * 1024 * 1024 # Bytes of log per task; bounds the memory of each worker
+
+def split_log(log_file_path, chunk_bytes=PARALLEL_CHUNK_BYTES):
+    # Work units for one log file: ('csv', path, columns, start, end) byte ranges that start and end
+    # on line boundaries, ('binary', path, payload_size, first_record, end_record) record ranges, or
+    # ('archive', path, None, first_chunk, end_chunk) ranges of archive chunks.
+    size = os.path.getsize(log_file_path)
+    if size == 0:
+        return []
+    if is_archive_log(log_file_path):
+        reader = ArchiveReader(log_file_path)
+        row_bytes = binary_record_dtype(reader.payload_size).itemsize # Decoded size of one frame
+        tasks = []
+        start = 0
+        rows = 0
+        for index, chunk in enumerate(reader.chunks):
+            rows += chunk['rows']
+            if rows * row_bytes >= chunk_bytes:
+                tasks.append(('archive', log_file_path, None, start, index + 1))
+                start = index + 1
+                rows = 0
+        if start < len(reader.chunks):
+            tasks.append(('archive', log_file_path, None, start, len(reader.chunks)))
+        return tasks
+    if is_binary_log(log_file_path):
+        with open(log_file_path, 'rb') as f:
+            _, _, payload_size, _ = BINARY_HEADER_STRUCT.unpack(f.read(BINARY_HEADER_STRUCT.size))
+        record_size = binary_record_dtype(payload_size).itemsize
+        record_count = (size - BINARY_HEADER_STRUCT.size) // record_size # Ignore a trailing partial record
+        step = max(1, chunk_bytes // record_size)
+        return [('binary', log_file_path, payload_size, start, min(start + step, record_count))
+                for start in range(0, record_count, step)]
+
+    tasks = []
+    with open(log_file_path, 'rb') as f:
+        columns = f.readline().decode().strip().split(',')
+        start = f.tell()
+        while start < size:
+            # Move the cut forward to the start of the next line
+            f.seek(min(start + chunk_bytes, size))
+            f.readline()
+            end = min(f.tell(), size)
+            tasks.append(('csv', log_file_path, columns, start, end))
+            start = end
+    return tasks
+
+def _read_task(task):
+    # Typed frame and payload matrix for one work unit
+    kind, path, layout, start, end = task
+    if kind == 'archive':
+        reader = ArchiveReader(path)
+        return archive_columns_to_frame(reader.read(chunks=reader.chunks[start:end]))
+    if kind == 'binary':
+        dtype = binary_record_dtype(layout)
+        records = np.memmap(path, dtype=dtype, mode='r', offset=BINARY_HEADER_STRUCT.size + start * dtype.itemsize,
+                            shape=(end - start,))
+        flags = records['flags']
+        df = pd.DataFrame({
+            'timestamp': np.array(records['timestamp']),
+            'arbitration_id': np.array(records['arbitration_id']),
+            'is_extended_id': (flags & BINARY_FLAG_EXTENDED).astype(bool),
+            'is_remote_frame': (flags & BINARY_FLAG_REMOTE).astype(bool),
+            'is_error_frame': (flags & BINARY_FLAG_ERROR).astype(bool),
+            'dlc': np.array(records['dlc']),
+        })
+        return df, np.array(records['data'])
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    raw_df = pd.read_csv(io.BytesIO(data), names=layout, header=None,
+                         dtype={'arbitration_id': str, 'data': str, 'channel': str}, keep_default_na=False)
+    return to_typed_frame(raw_df)
+
+def _analyze_task(task, can_ids=None):
+    # Worker: partial summary of one work unit plus the rows of the requested IDs, if any
+    df, payload = _read_task(task)
+    stats = StreamingLogSummary()
+    stats.update(df)
+    subset = None
+    if can_ids:
+        mask = np.isin(df['arbitration_id'].to_numpy(), list(can_ids))
+        subset = df[mask]
+        if payload is not None and 'dlc' in subset.columns:
+            subset = subset.assign(data=payload_to_hex(payload[mask], subset['dlc'].to_numpy()))
+    return stats, subset
+
+class ParallelLogAnalyzer:
+    # Same results as CanAnalyzer.get_message_summary / filter_by_can_id, computed in a process pool.
+    # log_file_paths may be one path or a list of rotated segments (analyzed in the given order).
+    def __init__(self, log_file_paths, workers=None, chunk_bytes=PARALLEL_CHUNK_BYTES):
+        self.log_file_paths = [log_file_paths] if isinstance(log_file_paths, str) else list(log_file_paths)
+        self.workers = workers or os.cpu_count()
+        self.chunk_bytes = chunk_bytes
+        self.stats = None # Merged StreamingLogSummary of the last run
+
+    def _tasks(self):
+        tasks = []
+        for path in self.log_file_paths:
+            if not os.path.exists(path):
+                print(f"Error: Log file not found at {path}")
+                continue
+            tasks.extend(split_log(path, self.chunk_bytes))
+        return tasks
+
+    def run(self, can_ids=None):
+        # One pass over all segments: merged summary plus a DataFrame per requested CAN ID
+        tasks = self._tasks()
+        stats = StreamingLogSummary()
+        subsets = []
+        if tasks:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(tasks))) as executor:
+                # map() yields in submission order, so filtered rows stay in log order
+                for part_stats, subset in executor.map(_analyze_task, tasks, [can_ids] * len(tasks)):
+                    stats.merge(part_stats)
+                    if subset is not None and not subset.empty:
+                        subsets.append(subset)
+        self.stats = stats
+        filtered = {}
+        if can_ids:
+            combined = pd.concat(subsets, ignore_index=True) if subsets else pd.DataFrame()
+            for can_id in can_ids:
+                filtered[can_id] = (combined[combined['arbitration_id'].to_numpy() == can_id].reset_index(drop=True)
+                                    if not combined.empty else pd.DataFrame())
+        return stats, filtered
+
+    def get_message_summary(self):
+        stats, _ = self.run()
+        summary = stats.summary()
+        if summary is None:
+            print("No data loaded or DataFrame is empty.")
+        return summary
+
+    def filter_by_can_id(self, can_id):
+        _, filtered = self.run(can_ids=[can_id])
+        filtered_df = filtered[can_id]
+        print(f"Filtered {len(filtered_df)} messages for CAN ID: 0x{can_id:X}")
+        return filtered_df
+
+# Example Usage: python can_parallel.py can_log.csv [more segments...] [--workers N]
+if __name__ == "__main__":
+    import argparse
+    import time
+    from config import LOG_FILE_PATH, TARGET_CAN_ID_FOR_ANALYSIS
+
+    parser = argparse.ArgumentParser(description="Parallel summary of one or more CAN log segments")
+    parser.add_argument('logs', nargs='*', default=[LOG_FILE_PATH])
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-mb', type=float, default=PARALLEL_CHUNK_BYTES / (1024 * 1024))
+    args = parser.parse_args()
+
+    analyzer = ParallelLogAnalyzer(args.logs, workers=args.workers, chunk_bytes=int(args.chunk_mb * 1024 * 1024))
+    start = time.perf_counter()
+    stats, filtered = analyzer.run(can_ids=[TARGET_CAN_ID_FOR_ANALYSIS])
+    print(f"Analyzed {len(args.logs)} segment(s) with {analyzer.workers} workers in {time.perf_counter() - start:.2f} s")
+    print("\n--- Log Summary ---")
+    for key, value in (stats.summary() or {}).items():
+        print(f"{key}: {value}")
+    print(f"\nFrames for 0x{TARGET_CAN_ID_FOR_ANALYSIS:X}: {len(filtered[TARGET_CAN_ID_FOR_ANALYSIS])}")
@@ -0,0 +1,267 @@
+# can_replay.py
+# Replays a recorded CSV or binary log onto a bus at the original frame timing, optionally sped up.
+# Usage: python can_replay.py can_log.csv --speed 10 --id 0x100 --loop 3
+import csv
+import queue
+import struct
+import threading
+import time
+import can
+
+from can_filter import CompiledIdFilter
+from can_logger import (BINARY_LOG_MAGIC, BINARY_HEADER_STRUCT, BINARY_FLAG_EXTENDED, BINARY_FLAG_REMOTE,
+                        BINARY_FLAG_ERROR, BINARY_FLAG_FD, BINARY_FLAG_BRS, BINARY_FLAG_ESI, binary_record_struct)
+from can_scheduler import wait_until
+
+REPLAY_BATCH_SIZE = 1000 # Frames parsed per batch by the loader thread
+REPLAY_PRELOAD_BATCHES = 8 # Batches parsed ahead of the sender
+TIMING_BIN_SECONDS = 10e-6 # Resolution of the timing error histogram
+TIMING_BIN_COUNT = 100000 # 10 us x 100000 = 1 s; larger errors land in the last bin
+
+_PASS_END = object() # Loader -> sender: one pass over the log is complete
+_END = object() # Loader -> sender: nothing more to send
+
+def _parse_bool(value):
+    return value == 'True' or value == 'true' or value == '1'
+
+def iter_log_frames(log_file_path):
+    # Frames of a CSV or binary log as can.Message objects with their recorded timestamps,
+    # read sequentially so the log is never held in memory as a whole
+    with open(log_file_path, 'rb') as f:
+        binary = f.read(len(BINARY_LOG_MAGIC)) == BINARY_LOG_MAGIC
+    if binary:
+        with open(log_file_path, 'rb') as f:
+            _, _, payload_size, _ = BINARY_HEADER_STRUCT.unpack(f.read(BINARY_HEADER_STRUCT.size))
+            record = binary_record_struct(payload_size)
+            while True:
+                block = f.read(record.size * REPLAY_BATCH_SIZE)
+                usable = len(block) - len(block) % record.size # Drop a trailing partial record
+                if not usable:
+                    return
+                for timestamp, arbitration_id, flags, dlc, data in record.iter_unpack(block[:usable]):
+                    is_fd = bool(flags & BINARY_FLAG_FD)
+                    yield can.Message(timestamp=timestamp, arbitration_id=arbitration_id,
+                                      is_extended_id=bool(flags & BINARY_FLAG_EXTENDED),
+                                      is_remote_frame=bool(flags & BINARY_FLAG_REMOTE),
+                                      is_error_frame=bool(flags & BINARY_FLAG_ERROR),
+                                      is_fd=is_fd, bitrate_switch=bool(flags & BINARY_FLAG_BRS),
+                                      error_state_indicator=bool(flags & BINARY_FLAG_ESI),
+                                      dlc=dlc, data=data[:dlc] if not flags & BINARY_FLAG_REMOTE else None,
+                                      check=False)
+        return
+
+    with open(log_file_path, 'r', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        column = {name: i for i, name in enumerate(header)}
+        ts_col = column['timestamp']
+        id_col = column['arbitration_id']
+        ext_col = column.get('is_extended_id')
+        remote_col = column.get('is_remote_frame')
+        error_col = column.get('is_error_frame')
+        dlc_col = column.get('dlc')
+        data_col = column.get('data')
+        for row in reader:
+            if not row:
+                continue
+            data = bytes.fromhex(row[data_col]) if data_col is not None else b''
+            remote = remote_col is not None and _parse_bool(row[remote_col])
+            yield can.Message(timestamp=float(row[ts_col]), arbitration_id=int(row[id_col], 16),
+                              is_extended_id=ext_col is not None and _parse_bool(row[ext_col]),
+                              is_remote_frame=remote,
+                              is_error_frame=error_col is not None and _parse_bool(row[error_col]),
+                              dlc=int(row[dlc_col]) if dlc_col is not None else len(data),
+                              data=None if remote else data, check=False)
+
+class LogReplay:
+    # Sends the frames of a log through CanInterface.send_frame, each at its recorded time relative to
+    # the first frame divided by speed (speed=0 sends as fast as possible). A loader thread streams and
+    # parses the log in batches ahead of the sender, so file I/O and parsing stay off the timed path.
+    # Deadlines are absolute (perf_counter), so per-frame overhead never accumulates as drift.
+    def __init__(self, can_interface, log_file_path, speed=1.0, filters=None, loop=1,
+                 batch_size=REPLAY_BATCH_SIZE, preload_batches=REPLAY_PRELOAD_BATCHES):
+        if speed < 0:
+            raise ValueError("speed must be >= 0 (0 = as fast as possible)")
+        self.can_interface = can_interface
+        self.log_file_path = log_file_path
+        self.speed = speed
+        self.id_filter = CompiledIdFilter(filters) # python-can style filters, None replays every ID
+        self.loop = loop # Number of passes over the log; 0 repeats until stop()
+        self.batch_size = batch_size
+        self._batches = queue.Queue(maxsize=preload_batches)
+        self._stop = threading.Event()
+        self._loader = None
+        self._thread = None
+
+        self.frames_sent = 0
+        self.send_errors = 0
+        self.frames_skipped = 0 # Error frames in the log (cannot be transmitted)
+        self.passes_completed = 0
+        self.elapsed = 0.0
+        self._timing_hist = [0] * TIMING_BIN_COUNT
+        self._timing_count = 0
+        self._timing_sum = 0.0
+        self._timing_max = 0.0
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._batches.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _load(self):
+        passes = 0
+        id_filter = self.id_filter
+        try:
+            while self.loop == 0 or passes < self.loop:
+                batch = []
+                for msg in iter_log_frames(self.log_file_path):
+                    if msg.is_error_frame:
+                        self.frames_skipped += 1
+                        continue
+                    if not id_filter.match_id(msg.arbitration_id, msg.is_extended_id):
+                        continue
+                    batch.append(msg)
+                    if len(batch) >= self.batch_size:
+                        if not self._put(batch):
+                            return
+                        batch = []
+                if batch and not self._put(batch):
+                    return
+                if not self._put(_PASS_END):
+                    return
+                passes += 1
+        except (OSError, ValueError, KeyError, struct.error) as e:
+            print(f"Error reading replay log {self.log_file_path}: {e}")
+        self._put(_END)
+
+    def _record_timing(self, error):
+        self._timing_count += 1
+        self._timing_sum += error
+        if error > self._timing_max:
+            self._timing_max = error
+        self._timing_hist[min(int(error / TIMING_BIN_SECONDS), TIMING_BIN_COUNT - 1)] += 1
+
+    def run(self):
+        # Blocking replay; returns stats()
+        self._stop.clear()
+        self._loader = threading.Thread(target=self._load, daemon=True)
+        self._loader.start()
+
+        clock = time.perf_counter
+        send_frame = self.can_interface.send_frame
+        speed = self.speed
+        started = None # Replay clock starts once the first batch is parsed
+        pass_offset = 0.0 # Where on the replay clock the current pass starts
+        last_deadline = 0.0
+        first_ts = None
+        while not self._stop.is_set():
+            try:
+                batch = self._batches.get(timeout=0.1)
+            except queue.Empty:
+                continue # Loader still parsing (or stopped)
+            if started is None:
+                started = clock()
+            if batch is _END:
+                break
+            if batch is _PASS_END:
+                # Next pass starts right after the last frame of this one
+                self.passes_completed += 1
+                pass_offset = last_deadline
+                first_ts = None
+                continue
+            for msg in batch:
+                if speed:
+                    if first_ts is None:
+                        first_ts = msg.timestamp
+                    last_deadline = pass_offset + (msg.timestamp - first_ts) / speed
+                    deadline = started + last_deadline
+                    if not wait_until(deadline, self._stop):
+                        break
+                    if send_frame(msg):
+                        self.frames_sent += 1
+                        self._record_timing(max(clock() - deadline, 0.0))
+                    else:
+                        self.send_errors += 1
+                elif self._stop.is_set():
+                    break # As fast as possible: stop() takes effect before the rest of the batch
+                elif send_frame(msg):
+                    self.frames_sent += 1
+                else:
+                    self.send_errors += 1
+        self.elapsed = clock() - started if started is not None else 0.0
+        self._stop.set() # Releases the loader if stop() was not called
+        self._loader.join()
+        return self.stats()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self.wait()
+
+    def wait(self):
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _timing_percentile(self, fraction):
+        target = fraction * self._timing_count
+        seen = 0
+        for index, count in enumerate(self._timing_hist):
+            seen += count
+            if seen >= target:
+                return (index + 1) * TIMING_BIN_SECONDS # Upper edge of the bin
+        return self._timing_max
+
+    def stats(self):
+        timed = self._timing_count > 0
+        return {
+            'frames_sent': self.frames_sent,
+            'send_errors': self.send_errors,
+            'error_frames_skipped': self.frames_skipped,
+            'passes_completed': self.passes_completed,
+            'elapsed_seconds': self.elapsed,
+            'frames_per_second': self.frames_sent / self.elapsed if self.elapsed > 0 else 0.0,
+            # Lateness of each send versus its scheduled time (not measured when speed=0)
+            'timing_error_mean_ms': self._timing_sum / self._timing_count * 1000 if timed else None,
+            'timing_error_p50_ms': self._timing_percentile(0.5) * 1000 if timed else None,
+            'timing_error_p99_ms': self._timing_percentile(0.99) * 1000 if timed else None,
+            'timing_error_max_ms': self._timing_max * 1000 if timed else None,
+        }
+
+# Example Usage: python can_replay.py can_log.csv [--speed N] [--id ID[:MASK]] [--loop N]
+if __name__ == "__main__":
+    import argparse
+    import signal
+    from can_interface import CanInterface
+    from can_capture import parse_filter
+    from config import CAN_CHANNEL, CAN_BUSTYPE, CAN_BITRATE, LOG_FILE_PATH
+
+    parser = argparse.ArgumentParser(description="Replay a CAN log onto a bus with its original timing")
+    parser.add_argument('log_file', nargs='?', default=LOG_FILE_PATH)
+    parser.add_argument('--channel', default=CAN_CHANNEL)
+    parser.add_argument('--bustype', default=CAN_BUSTYPE)
+    parser.add_argument('--bitrate', type=int, default=CAN_BITRATE)
+    parser.add_argument('--speed', type=float, default=1.0, help="Time scale factor; 0 = as fast as possible")
+    parser.add_argument('--id', action='append', type=parse_filter, dest='filters',
+                        help="Replay only matching IDs: ID[:MASK[:ext|std]], repeatable")
+    parser.add_argument('--loop', type=int, default=1, help="Number of passes over the log; 0 = until interrupted")
+    args = parser.parse_args()
+
+    can_interface = CanInterface(args.channel, args.bustype, args.bitrate)
+    if not can_interface.connect():
+        raise SystemExit(1)
+    replay = LogReplay(can_interface, args.log_file, speed=args.speed, filters=args.filters, loop=args.loop)
+    signal.signal(signal.SIGINT, lambda signum, frame: replay.stop())
+    print(f"Replaying {args.log_file} at {'max' if args.speed == 0 else f'{args.speed:g}x'} speed...")
+    for key, value in replay.run().items():
+        print(f"{key}: {value:.3f}" if isinstance(value, float) else f"{key}: {value}")
+    can_interface.disconnect()
@@ -0,0 +1,114 @@
+# can_ring.py
+# Fixed-memory history of the most recent frames, filled from the receive callback, that the analyzer
+# can read without going through a log file. Frames are packed straight into one preallocated buffer
+# with the binary log record layout (timestamp, ID, flags, DLC, payload), so no Message objects are
+# kept alive. Every frame is written twice, at slot i and slot i + slots: the newest n frames are then
+# always one contiguous slice, and a snapshot is a zero-copy NumPy view rather than two wrapped halves.
+import numpy as np
+
+from can_analyzer import binary_record_dtype
+from can_logger import (BINARY_FLAG_EXTENDED, BINARY_FLAG_REMOTE, BINARY_FLAG_ERROR, BINARY_FLAG_FD,
+                        BINARY_FLAG_BRS, BINARY_FLAG_ESI, binary_record_struct)
+
+RING_HEADROOM_FRACTION = 0.25 # Extra slots beyond capacity that keep snapshot views intact while writing continues
+
+class RingSnapshot:
+    # Zero-copy view of the newest frames of a FrameRingBuffer. The writer overwrites the oldest
+    # slots, so the view stays valid for at least ring.headroom further frames; check intact (or
+    # take copy()) before relying on it for longer.
+    def __init__(self, ring, records, end_frame):
+        self.ring = ring
+        self.records = records
+        self.end_frame = end_frame # ring.frames_written when the snapshot was taken
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def intact(self):
+        return self.ring.frames_written - self.end_frame <= self.ring.slots - len(self.records)
+
+    def copy(self):
+        return self.records.copy()
+
+class FrameRingBuffer:
+    def __init__(self, capacity, payload_size=8, headroom=None):
+        if capacity <= 0:
+            raise ValueError("capacity must be > 0")
+        self.capacity = capacity # Frames a snapshot can cover
+        self.payload_size = payload_size # 8 for classic CAN, 64 to keep full CAN FD payloads
+        self.headroom = headroom if headroom is not None else max(1, int(capacity * RING_HEADROOM_FRACTION))
+        self.slots = capacity + self.headroom
+        self._record = binary_record_struct(payload_size)
+        self._buffer = bytearray(self._record.size * self.slots * 2)
+        self._mirror_offset = self._record.size * self.slots
+        # Structured view over the whole buffer (binary log record layout); snapshots are slices of it
+        self.records = np.frombuffer(self._buffer, dtype=binary_record_dtype(payload_size))
+        self.frames_written = 0
+
+    def __len__(self):
+        return min(self.frames_written, self.capacity)
+
+    @property
+    def nbytes(self):
+        return len(self._buffer)
+
+    def append(self, msg):
+        # Receive callback (or chained from one). Call from one thread only, e.g. the Notifier thread.
+        flags = ((BINARY_FLAG_EXTENDED if msg.is_extended_id else 0) |
+                 (BINARY_FLAG_REMOTE if msg.is_remote_frame else 0) |
+                 (BINARY_FLAG_ERROR if msg.is_error_frame else 0) |
+                 (BINARY_FLAG_FD if msg.is_fd else 0) |
+                 (BINARY_FLAG_BRS if msg.bitrate_switch else 0) |
+                 (BINARY_FLAG_ESI if msg.error_state_indicator else 0))
+        offset = (self.frames_written % self.slots) * self._record.size
+        # The 's' field pads short payloads and truncates ones longer than payload_size
+        self._record.pack_into(self._buffer, offset, msg.timestamp, msg.arbitration_id, flags, msg.dlc, msg.data)
+        self._record.pack_into(self._buffer, offset + self._mirror_offset, msg.timestamp, msg.arbitration_id,
+                               flags, msg.dlc, msg.data)
+        self.frames_written += 1 # Published last, so a concurrent snapshot never sees a half-written frame
+
+    def snapshot(self, last_seconds=None, max_frames=None):
+        # Newest frames as a RingSnapshot, oldest first. last_seconds keeps frames within that many
+        # seconds of the newest frame (frames are in arrival order, so timestamps are ascending).
+        written = self.frames_written
+        count = min(written, self.capacity)
+        if max_frames is not None:
+            count = min(count, max_frames)
+        end = written % self.slots + self.slots
+        records = self.records[end - count:end]
+        if last_seconds is not None and count:
+            timestamps = records['timestamp']
+            records = records[np.searchsorted(timestamps, timestamps[-1] - last_seconds, side='left'):]
+        return RingSnapshot(self, records, written)
+
+    def clear(self):
+        self.frames_written = 0
+
+# Example Usage (for testing can_ring.py independently)
+if __name__ == "__main__":
+    import time
+    import can
+
+    ring = FrameRingBuffer(capacity=1000000)
+    print(f"Ring of {ring.capacity} frames (+{ring.headroom} headroom): {ring.nbytes / (1024 * 1024):.0f} MB")
+
+    msg = can.Message(arbitration_id=0x123, data=[1, 2, 3, 4, 5, 6, 7, 8], is_extended_id=False)
+    start = time.perf_counter()
+    for i in range(1500000):
+        msg.timestamp = i * 0.0002 # 5000 frames/s
+        msg.arbitration_id = 0x100 + i % 16
+        ring.append(msg)
+    elapsed = time.perf_counter() - start
+    print(f"Appended {ring.frames_written} frames in {elapsed:.2f} s ({elapsed / ring.frames_written * 1e9:.0f} ns/frame)")
+
+    start = time.perf_counter()
+    snapshot = ring.snapshot(last_seconds=60)
+    ids, counts = np.unique(snapshot.records['arbitration_id'], return_counts=True)
+    print(f"Last 60 s: {len(snapshot)} frames, {len(ids)} IDs, "
+          f"{snapshot.records['timestamp'][0]:.4f} .. {snapshot.records['timestamp'][-1]:.4f} "
+          f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+    print(f"Shares memory with the ring: {np.shares_memory(snapshot.records, ring.records)}, intact: {snapshot.intact}")
+    for i in range(ring.headroom + len(ring) - len(snapshot) + 1):
+        ring.append(msg)
+    print(f"After {ring.frames_written - snapshot.end_frame} more frames, intact: {snapshot.intact}")
@@ -0,0 +1,180 @@
+# can_scheduler.py
+import heapq
+import math
+import threading
+import time
+import can
+
+from config import SCHEDULER_SPIN_SECONDS
+
+SPIN_THRESHOLD = SCHEDULER_SPIN_SECONDS # Sleep until this close to a deadline, then poll for the remainder
+
+def wait_until(deadline, stop_event, spin_seconds=SPIN_THRESHOLD, clock=time.perf_counter):
+    # Sleeps until spin_seconds before deadline, then polls the clock with sleep(0) so the GIL is
+    # released between polls and the receive/GUI threads keep running. Returns False if stop_event
+    # was set while sleeping.
+    remaining = deadline - clock()
+    while remaining > spin_seconds:
+        if stop_event.wait(remaining - spin_seconds):
+            return False
+        remaining = deadline - clock()
+    while clock() < deadline:
+        time.sleep(0)
+    return True
+
+def backend_supports_periodic(bus):
+    # True if the backend implements cyclic transmission itself (in the driver or hardware)
+    # rather than through python-can's one-thread-per-task software fallback.
+    internal = getattr(type(bus), '_send_periodic_internal', None)
+    return internal is not None and internal is not can.BusABC._send_periodic_internal
+
+class _ScheduledMessage:
+    def __init__(self, arbitration_id, payload, period, is_extended_id=False):
+        if period <= 0:
+            raise ValueError(f"Period for 0x{arbitration_id:X} must be positive")
+        self.arbitration_id = arbitration_id
+        self.period = period
+        self.is_extended_id = is_extended_id
+        # Payload is static bytes, a callable returning bytes, or an iterator of bytes
+        if callable(payload):
+            self._next_payload = payload
+        elif hasattr(payload, '__next__'):
+            self._next_payload = payload.__next__
+        else:
+            self._next_payload = None
+        static_data = None if self._next_payload is not None else payload
+        self.msg = can.Message(arbitration_id=arbitration_id, data=static_data, is_extended_id=is_extended_id)
+        self.task = None # Cyclic task when offloaded to the backend
+
+        self.sends = 0
+        self.errors = 0
+        self.overruns = 0 # Deadlines skipped because the scheduler fell more than one period behind
+        self.last_send = None
+        self.interval_count = 0
+        self.interval_mean = 0.0 # Achieved period (Welford running mean)
+        self.interval_m2 = 0.0
+        self.max_lateness = 0.0
+
+    @property
+    def is_static(self):
+        return self._next_payload is None
+
+    def next_message(self):
+        if self._next_payload is not None:
+            self.msg.data = bytearray(self._next_payload())
+            self.msg.dlc = len(self.msg.data)
+        return self.msg
+
+    def record_send(self, sent_at, deadline):
+        self.sends += 1
+        lateness = sent_at - deadline
+        if lateness > self.max_lateness:
+            self.max_lateness = lateness
+        if self.last_send is not None:
+            interval = sent_at - self.last_send
+            self.interval_count += 1
+            delta = interval - self.interval_mean
+            self.interval_mean += delta / self.interval_count
+            self.interval_m2 += delta * (interval - self.interval_mean)
+        self.last_send = sent_at
+
+    def stats(self):
+        jitter = math.sqrt(self.interval_m2 / (self.interval_count - 1)) if self.interval_count > 1 else 0.0
+        return {
+            'period_ms': self.period * 1000,
+            'offloaded': self.task is not None,
+            'sends': self.sends,
+            'errors': self.errors,
+            'overruns': self.overruns,
+            # Offloaded tasks are timed by the backend, so there is nothing to measure here
+            'achieved_period_ms': None if self.task is not None else self.interval_mean * 1000,
+            'jitter_ms': None if self.task is not None else jitter * 1000,
+            'max_lateness_ms': None if self.task is not None else self.max_lateness * 1000,
+        }
+
+class PeriodicScheduler:
+    # Transmits many messages at independent periods from one thread. Every message has an
+    # absolute deadline on a min-heap; the next deadline is always previous deadline + period,
+    # so the time spent sending never accumulates as drift. Software-scheduled frames go through
+    # send(msg) -> True/False, e.g. CanInterface.send_frame so they are counted like any other send;
+    # without it they are written to the bus directly.
+    def __init__(self, bus, table, use_hardware=True, spin_seconds=SPIN_THRESHOLD, send=None):
+        self.bus = bus
+        self.send = send if send is not None else self._send_on_bus
+        self.spin_seconds = spin_seconds
+        self.entries = []
+        for row in table:
+            self.entries.append(_ScheduledMessage(*row))
+        self.use_hardware = use_hardware and backend_supports_periodic(bus)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _send_on_bus(self, msg):
+        try:
+            self.bus.send(msg)
+            return True
+        except Exception:
+            return False
+
+    def start(self):
+        heap = []
+        now = time.perf_counter()
+        for seq, entry in enumerate(self.entries):
+            if self.use_hardware and entry.is_static:
+                try:
+                    entry.task = self.bus.send_periodic(entry.next_message(), entry.period)
+                    continue
+                except Exception as e:
+                    print(f"Cyclic task for 0x{entry.arbitration_id:X} not available ({e}); scheduling in software")
+                    entry.task = None
+            heap.append((now, seq, entry))
+        heapq.heapify(heap)
+
+        self._stop.clear()
+        if heap:
+            self._thread = threading.Thread(target=self._run, args=(heap,), daemon=True)
+            self._thread.start()
+        offloaded = sum(1 for entry in self.entries if entry.task is not None)
+        print(f"Periodic schedule started: {len(heap)} software, {offloaded} offloaded messages")
+
+    def _run(self, heap):
+        clock = time.perf_counter
+        while not self._stop.is_set():
+            deadline, seq, entry = heap[0]
+            if not wait_until(deadline, self._stop, self.spin_seconds):
+                break # stop() while waiting
+
+            try:
+                sent = self.send(entry.next_message())
+            except Exception: # e.g. a payload callable that raised
+                sent = False
+            if sent:
+                entry.record_send(clock(), deadline)
+            else:
+                entry.errors += 1
+
+            next_deadline = deadline + entry.period
+            now = clock()
+            if next_deadline < now:
+                # More than a full period behind: skip the missed slots instead of bursting them out
+                missed = int((now - next_deadline) / entry.period) + 1
+                entry.overruns += missed
+                next_deadline += missed * entry.period
+            heapq.heapreplace(heap, (next_deadline, seq, entry))
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        for entry in self.entries:
+            if entry.task is not None:
+                try:
+                    entry.task.stop()
+                except Exception as e:
+                    print(f"Error stopping cyclic task for 0x{entry.arbitration_id:X}: {e}")
+
+    def stats(self):
+        # Keyed by row index in the table, since the same ID may appear in several rows
+        return {index: dict(entry.stats(), arbitration_id=entry.arbitration_id)
+                for index, entry in enumerate(self.entries)}
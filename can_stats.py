@@ -0,0 +1,160 @@
+# can_stats.py
+import math
+import threading
+import time
+
+def frame_bit_length(dlc, is_extended_id=False, is_remote_frame=False, is_fd=False, stuffing=False):
+    # Approximate on-wire length of a data/remote frame in bits, including 3 bits of interframe space.
+    # With stuffing=True the worst-case number of stuff bits is added.
+    data_bits = 0 if is_remote_frame else 8 * dlc
+    if is_fd:
+        # Rough CAN FD estimate at the nominal bitrate: arbitration/control fields,
+        # stuff count + CRC (17 or 21 bits), ACK, EOF and IFS. Bitrate switching is ignored.
+        header = 49 if is_extended_id else 30
+        crc = 21 if dlc > 16 else 17
+        bits = header + data_bits + 4 + crc + 15
+        stuffable = header + data_bits
+    else:
+        header = 67 if is_extended_id else 47 # SOF..ACK..EOF + IFS
+        bits = header + data_bits
+        stuffable = (54 if is_extended_id else 34) + data_bits
+    if stuffing:
+        bits += (stuffable - 1) // 4
+    return bits
+
+class _IdStats:
+    __slots__ = ('count', 'last_ts', 'dt_count', 'dt_mean', 'dt_m2', 'dt_max', 'buckets', 'bucket_id')
+
+    def __init__(self, bucket_count):
+        self.count = 0
+        self.last_ts = None
+        self.dt_count = 0
+        self.dt_mean = 0.0 # Running mean of inter-arrival times (Welford)
+        self.dt_m2 = 0.0 # Running sum of squared deviations (Welford)
+        self.dt_max = 0.0
+        self.buckets = [0] * bucket_count
+        self.bucket_id = None
+
+def _advance(buckets, last_bucket_id, bucket_id):
+    # Zero the slots of a ring of time buckets that fell out of the window since last_bucket_id.
+    # Bounded by the ring size, so each frame costs O(1).
+    if last_bucket_id is not None and bucket_id > last_bucket_id:
+        for b in range(last_bucket_id + 1, min(bucket_id, last_bucket_id + len(buckets)) + 1):
+            buckets[b % len(buckets)] = 0
+    return bucket_id if last_bucket_id is None else max(bucket_id, last_bucket_id)
+
+class LiveBusStats:
+    # Running per-ID statistics fed directly from the CAN receive callback. All per-frame work is
+    # constant time; rates and bus load come from a ring of time buckets covering window_seconds.
+    def __init__(self, bitrate, window_seconds=1.0, bucket_count=10, stuffing=False):
+        self.bitrate = bitrate
+        self.window_seconds = window_seconds
+        self.bucket_count = bucket_count
+        self.bucket_seconds = window_seconds / bucket_count
+        self.stuffing = stuffing
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.total_frames = 0
+            self.total_bits = 0
+            self.latest_ts = None
+            self._clock_offset = 0.0 # Frame timestamp minus time.monotonic() when the newest frame arrived
+            self._ids = {}
+            self._frame_buckets = [0] * self.bucket_count
+            self._bit_buckets = [0] * self.bucket_count
+            self._bucket_id = None
+
+    def on_message(self, msg):
+        ts = msg.timestamp
+        bucket_id = int(ts / self.bucket_seconds)
+        bits = frame_bit_length(msg.dlc, msg.is_extended_id, msg.is_remote_frame, msg.is_fd, self.stuffing)
+        with self._lock:
+            self.total_frames += 1
+            self.total_bits += bits
+            if self.latest_ts is None or ts > self.latest_ts:
+                self.latest_ts = ts
+                self._clock_offset = ts - time.monotonic()
+
+            last = self._bucket_id
+            self._bucket_id = _advance(self._frame_buckets, last, bucket_id)
+            _advance(self._bit_buckets, last, bucket_id)
+            slot = bucket_id % self.bucket_count
+            # A frame older than the whole window (out-of-order timestamp) only counts in the totals
+            if bucket_id > self._bucket_id - self.bucket_count:
+                self._frame_buckets[slot] += 1
+                self._bit_buckets[slot] += bits
+
+            stats = self._ids.get(msg.arbitration_id)
+            if stats is None:
+                stats = self._ids[msg.arbitration_id] = _IdStats(self.bucket_count)
+            stats.count += 1
+            if stats.last_ts is not None:
+                dt = ts - stats.last_ts
+                stats.dt_count += 1
+                delta = dt - stats.dt_mean
+                stats.dt_mean += delta / stats.dt_count
+                stats.dt_m2 += delta * (dt - stats.dt_mean)
+                if dt > stats.dt_max:
+                    stats.dt_max = dt
+            stats.last_ts = ts
+            stats.bucket_id = _advance(stats.buckets, stats.bucket_id, bucket_id)
+            if bucket_id > stats.bucket_id - self.bucket_count:
+                stats.buckets[slot] += 1
+
+    def _window_sum(self, buckets, last_bucket_id, now_bucket_id):
+        # Sum of the buckets still inside the window ending at now_bucket_id
+        if last_bucket_id is None or now_bucket_id - last_bucket_id >= self.bucket_count:
+            return 0
+        total = 0
+        for b in range(now_bucket_id - self.bucket_count + 1, last_bucket_id + 1):
+            total += buckets[b % self.bucket_count]
+        return total
+
+    def snapshot(self):
+        # Point-in-time copy of all statistics; safe to call from any thread
+        with self._lock:
+            if self.latest_ts is None:
+                return {'total_frames': 0, 'frames_per_second': 0.0, 'bus_load_percent': 0.0, 'ids': {}}
+            # The window ends now, not at the newest frame, so rates and load fall to 0 on a quiet bus.
+            # "Now" is on the frames' time base (wall clock or device clock): the newest timestamp
+            # plus the local time elapsed since that frame arrived.
+            now = max(self.latest_ts, time.monotonic() + self._clock_offset)
+            now_bucket = int(now / self.bucket_seconds)
+            frames_in_window = self._window_sum(self._frame_buckets, self._bucket_id, now_bucket)
+            bits_in_window = self._window_sum(self._bit_buckets, self._bucket_id, now_bucket)
+            ids = {}
+            for can_id, stats in self._ids.items():
+                jitter = math.sqrt(stats.dt_m2 / (stats.dt_count - 1)) if stats.dt_count > 1 else 0.0
+                ids[can_id] = {
+                    'count': stats.count,
+                    'rate_hz': self._window_sum(stats.buckets, stats.bucket_id, now_bucket) / self.window_seconds,
+                    'mean_period_ms': stats.dt_mean * 1000,
+                    'max_period_ms': stats.dt_max * 1000,
+                    'jitter_ms': jitter * 1000, # Standard deviation of the inter-arrival time
+                    'last_seen': stats.last_ts,
+                }
+            return {
+                'total_frames': self.total_frames,
+                'frames_per_second': frames_in_window / self.window_seconds,
+                'bus_load_percent': 100.0 * bits_in_window / (self.bitrate * self.window_seconds),
+                'ids': ids,
+            }
+
+# Example Usage (for testing can_stats.py independently)
+if __name__ == "__main__":
+    import can
+    import time
+    from config import CAN_BITRATE
+
+    stats = LiveBusStats(CAN_BITRATE)
+    start = time.time()
+    for i in range(4000): # One second of traffic at 4k frames/s (~90% of a 500 kbps bus)
+        stats.on_message(can.Message(timestamp=start + i / 4000, arbitration_id=0x100 + i % 8,
+                                     is_extended_id=False, data=bytes(8)))
+    snapshot = stats.snapshot()
+    print(f"Frames/s: {snapshot['frames_per_second']:.0f}  Bus load: {snapshot['bus_load_percent']:.1f}%")
+    for can_id, id_stats in sorted(snapshot['ids'].items()):
+        print(f"0x{can_id:X}: {id_stats['rate_hz']:.0f} Hz, period {id_stats['mean_period_ms']:.3f} ms, "
+              f"jitter {id_stats['jitter_ms']:.4f} ms")
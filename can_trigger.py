@@ -0,0 +1,344 @@
+# can_trigger.py
+# Triggered capture: frames are kept in a bounded in-memory pre-trigger buffer and only written to
+# disk around events. When a trigger fires, the pre-trigger frames, the trigger frame and every frame
+# of the post-trigger window go to a new numbered log file; a trigger during the post-trigger window
+# extends it, so overlapping events end up in one file and none is missed.
+# Triggers: ID seen, payload byte/mask match, error frame, ID timeout (ID silent for too long).
+import heapq
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from config import TRIGGER_PRE_SECONDS, TRIGGER_POST_SECONDS, TRIGGER_PRE_MAX_FRAMES
+
+class IdTrigger:
+    # Fires on any frame with this ID (extended=None matches standard and extended IDs)
+    def __init__(self, can_id, extended=None, name=None):
+        self.can_id = can_id
+        self.extended = extended
+        self.name = name or f"id 0x{can_id:X}"
+
+    def matches(self, msg):
+        return self.extended is None or msg.is_extended_id == self.extended
+
+class PayloadTrigger:
+    # Fires when (data[byte_index] & mask) == value on a frame with this ID
+    def __init__(self, can_id, byte_index, mask, value, extended=None, name=None):
+        self.can_id = can_id
+        self.byte_index = byte_index
+        self.mask = mask
+        self.value = value & mask
+        self.extended = extended
+        self.name = name or f"0x{can_id:X} byte {byte_index} & 0x{mask:02X} == 0x{self.value:02X}"
+
+    def matches(self, msg):
+        if self.extended is not None and msg.is_extended_id != self.extended:
+            return False
+        return len(msg.data) > self.byte_index and msg.data[self.byte_index] & self.mask == self.value
+
+class ErrorFrameTrigger:
+    def __init__(self, name=None):
+        self.name = name or "error frame"
+
+class IdTimeoutTrigger:
+    # Fires when no frame with this ID arrived for timeout seconds (counted from arming for an ID
+    # that never shows up). Fires once per silence; re-armed by the next frame with the ID.
+    def __init__(self, can_id, timeout, name=None):
+        self.can_id = can_id
+        self.timeout = timeout
+        self.name = name or f"0x{can_id:X} silent for {timeout:g} s"
+        self.last_seen = 0.0
+        self.expired = False
+
+class TriggerEngine:
+    # Per-frame cost does not grow with the number of triggers: frame triggers are dispatched by
+    # arbitration ID through a dict, and timeouts sit in a deadline heap whose top is compared once.
+    def __init__(self, triggers):
+        self.triggers = list(triggers)
+        self._by_id = {} # arbitration_id -> [IdTrigger/PayloadTrigger]
+        self._watched = {} # arbitration_id -> [IdTimeoutTrigger]
+        self._error_trigger = None
+        self._timeouts = []
+        self._deadlines = [] # (deadline, sequence, IdTimeoutTrigger); entries may be stale, see check_timeouts
+        self._sequence = 0
+        for trigger in self.triggers:
+            if isinstance(trigger, ErrorFrameTrigger):
+                self._error_trigger = self._error_trigger or trigger
+            elif isinstance(trigger, IdTimeoutTrigger):
+                self._watched.setdefault(trigger.can_id, []).append(trigger)
+                self._timeouts.append(trigger)
+            else:
+                self._by_id.setdefault(trigger.can_id, []).append(trigger)
+
+    def _push_deadline(self, deadline, trigger):
+        self._sequence += 1
+        heapq.heappush(self._deadlines, (deadline, self._sequence, trigger))
+
+    def arm(self, now):
+        self._deadlines = []
+        for trigger in self._timeouts:
+            trigger.last_seen = now
+            trigger.expired = False
+            self._push_deadline(now + trigger.timeout, trigger)
+
+    def check_frame(self, msg, now):
+        # Triggers fired by this frame and by timeouts that have passed, as a list (usually empty)
+        fired = []
+        if msg.is_error_frame:
+            if self._error_trigger is not None:
+                fired.append(self._error_trigger)
+        else:
+            candidates = self._by_id.get(msg.arbitration_id)
+            if candidates is not None:
+                for trigger in candidates:
+                    if trigger.matches(msg):
+                        fired.append(trigger)
+            watchers = self._watched.get(msg.arbitration_id)
+            if watchers is not None:
+                for trigger in watchers:
+                    # The heap keeps its old deadline; check_timeouts moves it when it comes due
+                    trigger.last_seen = now
+                    if trigger.expired:
+                        trigger.expired = False
+                        self._push_deadline(now + trigger.timeout, trigger)
+        if self._deadlines and self._deadlines[0][0] <= now:
+            fired.extend(self.check_timeouts(now))
+        return fired
+
+    def check_timeouts(self, now):
+        # Also called periodically without frames, so a silent bus still fires its timeouts
+        fired = []
+        deadlines = self._deadlines
+        while deadlines and deadlines[0][0] <= now:
+            _, sequence, trigger = deadlines[0]
+            actual = trigger.last_seen + trigger.timeout
+            if actual > now:
+                heapq.heapreplace(deadlines, (actual, sequence, trigger)) # Seen since; not due yet
+            else:
+                heapq.heappop(deadlines)
+                trigger.expired = True
+                fired.append(trigger)
+        return fired
+
+class TriggeredCapture:
+    # Receive callback + housekeeping for triggered logging. logger_factory(path) returns an opened
+    # asynchronous CanLogger/BinaryCanLogger or None (see can_capture.open_capture_logger). File work
+    # never happens on the receive thread: poll() keeps the next event file opened in advance, and
+    # finished event files are drained and closed there, like in RotatingCapture. A trigger that finds
+    # no file ready (first event before poll(), or an open that failed) waits for poll() to open one
+    # while its frames stay in the pre-trigger buffer.
+    def __init__(self, output_path, triggers, logger_factory, pre_seconds=TRIGGER_PRE_SECONDS,
+                 post_seconds=TRIGGER_POST_SECONDS, pre_max_frames=TRIGGER_PRE_MAX_FRAMES):
+        self.output_path = output_path
+        self.engine = TriggerEngine(triggers)
+        self.logger_factory = logger_factory
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.logger = None # Logger of the event being captured, None while waiting for a trigger
+        self.files_written = []
+        self.events = [] # (wall clock time, trigger name, log file) for every trigger that fired
+        self.frames_received = 0
+        self._pre_trigger = deque(maxlen=pre_max_frames) # (receive time, msg), fed during events too
+        self._post_deadline = 0.0
+        self._spare = None # Next event's logger, opened ahead of time by poll()
+        self._spare_failed = False # Last open failed: retry only once an event is waiting for it
+        self._pending = None # Trigger time of an event waiting for poll() to open its file
+        self._pending_events = [] # (wall clock time, trigger name) of that event
+        self._finished = [] # Loggers of completed events, closed by poll()
+        self._lock = threading.Lock()
+        self._sequence = 0
+        # Counters of loggers that were already closed, so totals cover every event file
+        self._closed_logged = 0
+        self._closed_dropped = 0
+
+    def _next_path(self):
+        stem, ext = os.path.splitext(self.output_path)
+        self._sequence += 1
+        return f"{stem}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_event{self._sequence:04d}{ext}"
+
+    def _prepare_logger(self):
+        # Main thread, without the lock: the open may be slow
+        path = self._next_path()
+        logger = self.logger_factory(path)
+        self._spare_failed = logger is None
+        if logger is None:
+            print(f"Could not open {path} for the next event")
+            return
+        with self._lock:
+            self._spare = logger
+
+    def open(self):
+        self.engine.arm(time.monotonic())
+        self._prepare_logger()
+        return True
+
+    def _start_event(self, window_start):
+        # Called with the lock held and a spare logger ready. Writes the buffered frames from
+        # window_start on; for an event that waited for poll() that includes its post-trigger frames.
+        logger, self._spare = self._spare, None
+        self.logger = logger
+        self.files_written.append(logger.log_file_path)
+        for received, msg in self._pre_trigger:
+            if window_start <= received < self._post_deadline:
+                logger.log_message(msg)
+
+    def _start_pending_event(self):
+        # Called with the lock held
+        self._start_event(self._pending - self.pre_seconds)
+        for wall_time, name in self._pending_events:
+            self.events.append((wall_time, name, self.logger.log_file_path))
+        self._pending = None
+        self._pending_events = []
+
+    def _fire(self, fired, now):
+        # Called with the lock held
+        self._post_deadline = now + self.post_seconds # Starts or extends the post-trigger window
+        if self.logger is None and self._pending is None:
+            if self._spare is not None:
+                self._start_event(now - self.pre_seconds)
+            else:
+                self._pending = now
+        for trigger in fired:
+            if self.logger is None:
+                self._pending_events.append((time.time(), trigger.name))
+                print(f"Trigger '{trigger.name}' fired, waiting for the event file to open")
+            else:
+                self.events.append((time.time(), trigger.name, self.logger.log_file_path))
+                print(f"Trigger '{trigger.name}' fired, capturing to {self.logger.log_file_path}")
+
+    def _finish_event(self):
+        # Called with the lock held
+        self._finished.append(self.logger)
+        self.logger = None
+
+    def on_message(self, msg):
+        # Runs on the Notifier thread
+        now = time.monotonic()
+        with self._lock:
+            self.frames_received += 1
+            if self.logger is not None and now >= self._post_deadline:
+                self._finish_event()
+            fired = self.engine.check_frame(msg, now)
+            # Buffered also during an event, so an event right after this one still gets its full pre-window.
+            # A waiting event keeps its own window until poll() has written it.
+            pre_trigger = self._pre_trigger
+            pre_trigger.append((now, msg))
+            window_start = (now if self._pending is None else self._pending) - self.pre_seconds
+            while pre_trigger[0][0] < window_start:
+                pre_trigger.popleft()
+            if self.logger is not None:
+                self.logger.log_message(msg)
+            if fired:
+                self._fire(fired, now) # A new event writes msg with the pre-trigger frames
+
+    def poll(self):
+        # Call periodically (e.g. every 0.5 s) from the main thread: opens the next event file, fires
+        # timeouts on a silent bus, ends post-trigger windows that saw no further frames and closes
+        # finished event files
+        if self._spare is None and (self._pending is not None or not self._spare_failed):
+            self._prepare_logger()
+        now = time.monotonic()
+        with self._lock:
+            if self._pending is not None:
+                if self._spare is not None:
+                    self._start_pending_event()
+                else:
+                    print(f"Event not captured: {len(self._pending_events)} trigger(s) but no file could be opened")
+                    self._pending = None
+                    self._pending_events = []
+            if self.logger is not None and now >= self._post_deadline:
+                self._finish_event()
+            fired = self.engine.check_timeouts(now)
+            if fired:
+                self._fire(fired, now)
+            finished, self._finished = self._finished, []
+        for logger in finished:
+            self._close_logger(logger)
+
+    def _close_logger(self, logger):
+        logger.close() # Drains everything queued for this event
+        self._closed_logged += logger.frames_logged
+        self._closed_dropped += logger.frames_dropped
+
+    def frames_logged(self):
+        return self._closed_logged + (self.logger.frames_logged if self.logger is not None else 0)
+
+    def frames_dropped(self):
+        return self._closed_dropped + (self.logger.frames_dropped if self.logger is not None else 0)
+
+    def close(self):
+        # Ends a running event early (its file keeps everything captured so far)
+        if self._pending is not None and self._spare is None:
+            self._prepare_logger()
+        with self._lock:
+            if self._pending is not None and self._spare is not None:
+                self._start_pending_event()
+            if self.logger is not None:
+                self._finish_event()
+            finished, self._finished = self._finished, []
+            spare, self._spare = self._spare, None
+            self._pending = None
+            self._pending_events = []
+        for logger in finished:
+            self._close_logger(logger)
+        if spare is not None:
+            # Opened for an event that never came
+            spare.close()
+            try:
+                os.remove(spare.log_file_path)
+            except OSError as e:
+                print(f"Error removing unused event file {spare.log_file_path}: {e}")
+
+def parse_trigger(text):
+    # "id:ID[:ext|std]", "payload:ID:BYTE:MASK:VALUE", "error" or "timeout:ID:SECONDS" (hex or decimal)
+    parts = text.split(':')
+    kind = parts[0]
+    try:
+        if kind == 'id' and len(parts) in (2, 3):
+            if len(parts) == 3 and parts[2] not in ('ext', 'std'):
+                raise ValueError("expected ext or std after the ID")
+            return IdTrigger(int(parts[1], 0), extended=parts[2] == 'ext' if len(parts) == 3 else None)
+        if kind == 'payload' and len(parts) == 5:
+            return PayloadTrigger(int(parts[1], 0), int(parts[2], 0), int(parts[3], 0), int(parts[4], 0))
+        if kind == 'error' and len(parts) == 1:
+            return ErrorFrameTrigger()
+        if kind == 'timeout' and len(parts) == 3:
+            return IdTimeoutTrigger(int(parts[1], 0), float(parts[2]))
+    except ValueError as e:
+        raise ValueError(f"Invalid trigger '{text}': {e}")
+    raise ValueError(f"Invalid trigger '{text}': expected id:ID[:ext|std], payload:ID:BYTE:MASK:VALUE, "
+                     f"error or timeout:ID:SECONDS")
+
+# Example Usage (for testing can_trigger.py independently)
+if __name__ == "__main__":
+    import glob
+    import can
+    from can_capture import open_capture_logger
+
+    for path in glob.glob('trigger_demo_*.csv'):
+        os.remove(path)
+
+    triggers = [parse_trigger('payload:0x200:0:0xF0:0xA0'), parse_trigger('error'), parse_trigger('timeout:0x300:0.2')]
+    capture = TriggeredCapture('trigger_demo.csv', triggers, open_capture_logger, pre_seconds=0.05, post_seconds=0.05)
+    capture.open()
+
+    # 1 kHz traffic for ~1 s: two payload events, one error frame, and 0x300 going silent halfway
+    for i in range(1000):
+        capture.on_message(can.Message(arbitration_id=0x100, data=[i % 256]))
+        capture.on_message(can.Message(arbitration_id=0x200, data=[0xA5 if i in (200, 700) else 0x00]))
+        if i < 400:
+            capture.on_message(can.Message(arbitration_id=0x300, data=[1]))
+        if i == 450:
+            capture.on_message(can.Message(is_error_frame=True))
+        time.sleep(0.001)
+        if i % 100 == 0:
+            capture.poll()
+    capture.poll()
+    capture.close()
+
+    for _, name, path in capture.events:
+        print(f"{name}: {path}")
+    print(f"{capture.frames_received} frames received, {capture.frames_logged()} written to "
+          f"{len(capture.files_written)} file(s)")
@@ -8,6 +8,36 @@ CAN_CHANNEL = 'my_virtual_can'  # Use a string name for virtual bus
 CAN_BUSTYPE = 'virtual'         # 'pcan', 'vector', 'socketcan', 'virtual', etc.
 CAN_BITRATE = 500000            # 500 kbps (bitrate is less relevant for virtual, but good practice)
 
+# Multi-channel capture (can_multibus.py, python can_capture.py --multibus): every bus is opened and merged
+# into one time-ordered stream. An entry may carry its own 'filters' (default CAN_FILTERS).
+# Add 'channel' to LOG_FORMAT to record which bus each frame came from.
+CAN_CHANNELS = [
+    {'name': 'can0', 'channel': CAN_CHANNEL, 'bustype': CAN_BUSTYPE, 'bitrate': CAN_BITRATE},
+    # {'name': 'chassis', 'channel': 'can1', 'bustype': 'socketcan', 'bitrate': 500000},
+]
+MULTIBUS_REORDER_WINDOW = 0.01  # Seconds a frame is held back so slower channels can slot in before it
+
+# Acceptance filters, python-can style: {'can_id': ..., 'can_mask': ..., 'extended': True/False (optional)}.
+# A frame passes if (id & can_mask) == (can_id & can_mask) for any entry; None or [] passes everything.
+# CAN_FILTERS are pushed to the driver/kernel when the backend supports it (e.g. socketcan), otherwise
+# applied in software before the receive callback. DISPLAY_FILTERS and LOG_FILTERS narrow what is
+# shown and what is logged from the frames that got through CAN_FILTERS.
+CAN_FILTERS = None
+# CAN_FILTERS = [{'can_id': 0x100, 'can_mask': 0x700, 'extended': False}] # Only 0x100..0x1FF
+DISPLAY_FILTERS = None
+LOG_FILTERS = None
+
+# Periodic test traffic: (arbitration_id, period in seconds). Payloads use a rolling counter.
+PERIODIC_SEND_TABLE = [
+    (0x100, 0.1),
+    (0x200, 0.1),
+    (0x300, 0.1),
+]
+# The software scheduler (and log replay) sleeps until this close to a deadline, then polls the clock
+# and yields the GIL between polls. Smaller values cost less CPU. Larger ones give tighter timing
+# where sleep resolution is coarse. 0 disables the polling tail.
+SCHEDULER_SPIN_SECONDS = 0.0002
+
 # Logging Configuration
 LOG_FILE_PATH = 'can_log.csv'
 # Format of the data logged to CSV. Ensure consistency with how you extract data from can.Message
@@ -20,6 +50,56 @@ LOG_FORMAT = [
     'dlc',
     'data' # Hex string representation of data bytes
 ]
+# Sidecar index (can_log.csv.idx) with per-ID row offsets and time buckets, written when logging stops.
+# Existing logs can be indexed offline with: python can_index.py can_log.csv
+LOG_INDEX = False
+LOG_INDEX_BUCKET_SECONDS = 1.0
+# Log backend: 'csv' (human readable) or 'binary' (fixed-width records, memory-mapped by the analyzer)
+LOG_BACKEND = 'csv'
+BINARY_LOG_FILE_PATH = 'can_log.bin'
+BINARY_LOG_PAYLOAD_SIZE = 8     # 8 for classic CAN, 64 for CAN FD
+# Asynchronous logging: frames are queued from the receive callback and written in batches by a writer thread
+LOG_ASYNC = True
+LOG_QUEUE_SIZE = 200000         # Frames buffered for the writer thread before new frames are dropped
+LOG_FLUSH_EVERY_N = 1000        # Flush after this many frames (None to disable)
+LOG_FLUSH_INTERVAL_MS = 500     # Flush at least this often while frames are pending (None to disable)
+
+# Triggered capture (can_trigger.py, can_capture.py --trigger): only the frames around each event are written
+TRIGGER_PRE_SECONDS = 5.0       # Frames kept in memory and written before the trigger frame
+TRIGGER_POST_SECONDS = 5.0      # Frames written after the last trigger of an event
+TRIGGER_PRE_MAX_FRAMES = 100000 # Memory bound of the pre-trigger buffer (keep below LOG_QUEUE_SIZE)
+
+# DBC file used to decode physical signal values (CanAnalyzer.decode_signals); None if not available
+DBC_FILE_PATH = None
+ANALYSIS_POLL_MS = 100         # How often the GUI checks the background analysis for progress/results
+
+# In-memory history of recent frames (can_ring.py) for instant "last N seconds" analysis in the GUI.
+# Fixed memory: 2 x (frames + 25% headroom) x (14 + payload size) bytes, ~55 MB for 1M classic frames.
+RING_BUFFER_FRAMES = 1000000   # 0 disables the ring buffer
+RING_BUFFER_PAYLOAD_SIZE = 8   # 64 to keep full CAN FD payloads
+RING_SNAPSHOT_SECONDS = 300    # Window analyzed by "Analyze Recent"
 
 # Analysis Configuration (example - not directly used in the current main.py, but useful for analyzer.py's own tests)
-TARGET_CAN_ID_FOR_ANALYSIS = 0x123 # Example CAN ID to focus analysis on
\ No newline at end of file
+TARGET_CAN_ID_FOR_ANALYSIS = 0x123 # Example CAN ID to focus analysis on
+
+# Live Display Configuration
+# Received frames are queued by the Notifier thread and drained by the GUI on a fixed tick.
+RX_QUEUE_SIZE = 100000          # Max frames waiting for the GUI; older frames are dropped beyond this
+DISPLAY_REFRESH_MS = 40         # GUI refresh tick (40 ms = 25 Hz)
+DISPLAY_MAX_LINES = 2000        # Lines kept in the live display; older lines are trimmed
+DISPLAY_MAX_LINES_PER_TICK = 200 # Frames rendered per tick; the rest are counted as display-dropped (still logged)
+DISPLAY_MODE = 'scroll'         # Live view at startup: 'scroll' (one line per frame) or 'table' (one row per ID)
+ID_VIEW_REFRESH_MS = 250        # Refresh period of the per-ID table; only rows that changed are redrawn
+
+# Live Bus Statistics Configuration (can_stats.py, statistics panel in main.py)
+STATS_REFRESH_MS = 250          # Bus statistics panel refresh period
+STATS_WINDOW_SECONDS = 1.0      # Sliding window for per-ID rates and bus load
+STATS_MAX_ROWS = 15             # IDs shown in the statistics panel (highest rate first)
+STATS_COUNT_STUFF_BITS = False  # Add worst-case stuff bits to the bus load estimate
+
+# Instrumentation (can_metrics.py): counters/histograms for the receive, logging and display paths.
+# Disabled metrics cost one attribute check on the hot paths.
+METRICS_ENABLED = False
+METRICS_HTTP_PORT = None        # e.g. 9108 to serve Prometheus text on http://127.0.0.1:9108/metrics
+METRICS_JSON_PATH = None        # e.g. 'can_metrics.json' to rewrite a JSON snapshot periodically
+METRICS_JSON_INTERVAL_S = 10.0
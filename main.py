@@ -3,30 +3,105 @@ import sys
 import time
 import threading
 import tkinter as tk
-from tkinter import scrolledtext, messagebox
+from tkinter import scrolledtext, messagebox, ttk
 import os # Import os for file operations
+import multiprocessing
+import queue
+import bisect
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
 # Import modules from your project structure
 from can_interface import CanInterface
-from can_logger import CanLogger
-from can_analyzer import CanAnalyzer
+from can_logger import CanLogger, BinaryCanLogger
+from can_analyzer import CanAnalyzer, AnalysisCancelled, init_analysis_worker, run_analysis_job
+from can_index import index_path_for
+from can_stats import LiveBusStats
+from can_filter import CompiledIdFilter
+from can_metrics import metrics
+from can_ring import FrameRingBuffer
 from config import CAN_CHANNEL, CAN_BUSTYPE, CAN_BITRATE, LOG_FILE_PATH, LOG_FORMAT
+from config import LOG_BACKEND, BINARY_LOG_FILE_PATH, BINARY_LOG_PAYLOAD_SIZE
+from config import LOG_INDEX, LOG_INDEX_BUCKET_SECONDS
+from config import LOG_ASYNC, LOG_QUEUE_SIZE, LOG_FLUSH_EVERY_N, LOG_FLUSH_INTERVAL_MS
+from config import RX_QUEUE_SIZE, DISPLAY_REFRESH_MS, DISPLAY_MAX_LINES, DISPLAY_MAX_LINES_PER_TICK
+from config import DISPLAY_MODE, ID_VIEW_REFRESH_MS
+from config import PERIODIC_SEND_TABLE
+from config import CAN_FILTERS, DISPLAY_FILTERS, LOG_FILTERS
+from config import ANALYSIS_POLL_MS
+from config import RING_BUFFER_FRAMES, RING_BUFFER_PAYLOAD_SIZE, RING_SNAPSHOT_SECONDS
+from config import STATS_REFRESH_MS, STATS_WINDOW_SECONDS, STATS_MAX_ROWS, STATS_COUNT_STUFF_BITS
 
 class CanBusApp:
     def __init__(self, master):
         self.master = master
         master.title("CAN Bus Logger & Analyzer")
-        master.geometry("800x600") # Set initial window size
-
-        self.can_interface = CanInterface(CAN_CHANNEL, CAN_BUSTYPE, CAN_BITRATE)
-        self.can_logger = CanLogger(LOG_FILE_PATH, LOG_FORMAT)
-        self.can_analyzer = CanAnalyzer(LOG_FILE_PATH) # Analyzer needs log file path
+        master.geometry("800x800") # Set initial window size
+
+        self.can_interface = CanInterface(CAN_CHANNEL, CAN_BUSTYPE, CAN_BITRATE, filters=CAN_FILTERS)
+        logger_options = dict(async_mode=LOG_ASYNC, flush_every_n=LOG_FLUSH_EVERY_N,
+                              flush_interval_ms=LOG_FLUSH_INTERVAL_MS, queue_size=LOG_QUEUE_SIZE)
+        if LOG_BACKEND == 'binary':
+            self.can_logger = BinaryCanLogger(BINARY_LOG_FILE_PATH, payload_size=BINARY_LOG_PAYLOAD_SIZE,
+                                              **logger_options)
+        else:
+            self.can_logger = CanLogger(LOG_FILE_PATH, LOG_FORMAT, index=LOG_INDEX,
+                                        index_bucket_seconds=LOG_INDEX_BUCKET_SECONDS, **logger_options)
+        self.can_analyzer = CanAnalyzer(self.can_logger.log_file_path) # Analyzer reads whichever log is written
+        # Fed from the Notifier thread; the GUI only reads snapshots of it
+        self.bus_stats = LiveBusStats(CAN_BITRATE, window_seconds=STATS_WINDOW_SECONDS,
+                                      stuffing=STATS_COUNT_STUFF_BITS)
         
         self.is_logging = False
         self.periodic_sender_active = False
         self.message_counter = 0 # To vary test message data and IDs
 
+        # Frames handed over from the Notifier thread. deque.append/popleft are atomic,
+        # so no lock is needed between the receive callback and the GUI drain tick.
+        self.rx_queue = deque(maxlen=RX_QUEUE_SIZE)
+        self.frames_received = 0
+        self.frames_displayed = 0
+        self.frames_display_dropped = 0 # Skipped by the display but still logged
+        self.frames_queue_dropped = 0   # Overflowed the rx queue (neither displayed nor logged)
+        # Per-stage filters, compiled once; CAN_FILTERS is handled by CanInterface
+        self.display_filter = CompiledIdFilter(DISPLAY_FILTERS)
+        self.log_filter = CompiledIdFilter(LOG_FILTERS)
+        # Per-ID table view: the receive callback only overwrites the latest state of each ID and marks
+        # it dirty; the table redraws dirty rows on its own timer, so its cost follows the ID count
+        self.table_view_active = DISPLAY_MODE == 'table'
+        self._id_view_lock = threading.Lock()
+        # Keyed by (arbitration_id, is_extended_id): a standard and an extended frame with the same ID are two rows
+        self._id_view_state = {} # key -> [latest msg, count, timestamp of last data change]
+        self._id_view_dirty = set()
+        self._id_view_pending = 0 # Frames applied to the state since the last refresh
+        self._id_view_rows = {} # key -> values currently shown in the table
+        self._id_view_order = [] # Sorted keys, i.e. row order
+
+        # Recent history of every received frame (independent of the display/log filters) for "Analyze Recent"
+        self.ring = FrameRingBuffer(RING_BUFFER_FRAMES, RING_BUFFER_PAYLOAD_SIZE) if RING_BUFFER_FRAMES else None
+
+        # Instrumentation (no-op unless METRICS_ENABLED); the counters read the attributes above
+        metrics.gauge('can_gui_rx_queue_depth', 'Frames waiting for the display tick', lambda: len(self.rx_queue))
+        self._metric_sources = self._add_counter_sources()
+        self._drain_seconds = metrics.histogram('can_gui_drain_seconds', 'Duration of one display drain tick')
+        self._tick_lag_seconds = metrics.histogram('can_gui_tick_lag_seconds', 'Display tick start later than scheduled')
+        self._next_tick = None
+        metrics.start_exporters()
+
+        # Background analysis: one worker process, created on first use and reused afterwards.
+        # Progress and cancellation cross the process boundary through a queue/event given to the worker.
+        self._analysis_executor = None
+        self._analysis_future = None
+        self._analysis_progress = None
+        self._analysis_cancel = None
+        self.analysis_window = None # Reusable result window with an embedded plot
+
         self.create_widgets()
+        self._schedule_drain()
+        self.master.after(STATS_REFRESH_MS, self._refresh_stats_panel)
+        self.master.after(ID_VIEW_REFRESH_MS, self._refresh_id_view)
 
     def create_widgets(self):
         # Connection Frame
@@ -54,7 +129,44 @@ class CanBusApp:
         msg_frame.pack(pady=10, padx=10, fill='both', expand=True)
 
         self.message_display = scrolledtext.ScrolledText(msg_frame, width=80, height=15, state='disabled', wrap='word') # Added wrap for better display
-        self.message_display.pack(fill='both', expand=True)
+
+        # Alternative live view: one row per ID, overwritten in place
+        self.id_view_frame = tk.Frame(msg_frame)
+        columns = ('id', 'dlc', 'data', 'count', 'rate', 'changed')
+        self.id_view = ttk.Treeview(self.id_view_frame, columns=columns, show='headings', height=15)
+        for column, heading, width, anchor in (('id', 'ID', 90, 'w'), ('dlc', 'DLC', 40, 'e'),
+                                               ('data', 'Data', 200, 'w'), ('count', 'Count', 90, 'e'),
+                                               ('rate', 'Rate Hz', 80, 'e'), ('changed', 'Last change', 110, 'e')):
+            self.id_view.heading(column, text=heading)
+            self.id_view.column(column, width=width, anchor=anchor, stretch=column == 'data')
+        id_view_scrollbar = ttk.Scrollbar(self.id_view_frame, orient='vertical', command=self.id_view.yview)
+        self.id_view.configure(yscrollcommand=id_view_scrollbar.set)
+        id_view_scrollbar.pack(side=tk.RIGHT, fill='y')
+        self.id_view.pack(side=tk.LEFT, fill='both', expand=True)
+
+        if self.table_view_active:
+            self.id_view_frame.pack(fill='both', expand=True)
+        else:
+            self.message_display.pack(fill='both', expand=True)
+
+        self.view_mode_button = tk.Button(msg_frame, command=self.toggle_view_mode,
+                                          text="Scroll View" if self.table_view_active else "Table View")
+        self.view_mode_button.pack(anchor='e')
+
+        self.counters_label = tk.Label(msg_frame, text="", anchor='w')
+        self.counters_label.pack(fill='x')
+        self._update_counters_label()
+
+        # Live Bus Statistics
+        stats_frame = tk.LabelFrame(self.master, text="Bus Statistics", padx=10, pady=10)
+        stats_frame.pack(pady=10, padx=10, fill='x')
+
+        self.stats_summary_label = tk.Label(stats_frame, text="", anchor='w')
+        self.stats_summary_label.pack(fill='x')
+
+        self.stats_display = tk.Text(stats_frame, width=80, height=STATS_MAX_ROWS + 1, state='disabled',
+                                     font=('Courier', 9))
+        self.stats_display.pack(fill='x')
 
         # Logging Control
         log_frame = tk.LabelFrame(self.master, text="Logging & Analysis", padx=10, pady=10)
@@ -66,6 +178,18 @@ class CanBusApp:
         self.analyze_button = tk.Button(log_frame, text="Analyze Log", command=self.run_analysis)
         self.analyze_button.pack(side=tk.LEFT, padx=5)
 
+        self.analyze_recent_button = tk.Button(log_frame, text=f"Analyze Last {RING_SNAPSHOT_SECONDS:g} s",
+                                               command=self.analyze_recent,
+                                               state=tk.NORMAL if self.ring is not None else tk.DISABLED)
+        self.analyze_recent_button.pack(side=tk.LEFT, padx=5)
+
+        self.cancel_analysis_button = tk.Button(log_frame, text="Cancel Analysis", command=self.cancel_analysis,
+                                                state=tk.DISABLED)
+        self.cancel_analysis_button.pack(side=tk.LEFT, padx=5)
+
+        self.analysis_progress_label = tk.Label(log_frame, text="")
+        self.analysis_progress_label.pack(side=tk.LEFT, padx=5)
+
         self.clear_display_button = tk.Button(log_frame, text="Clear Display", command=self.clear_display)
         self.clear_display_button.pack(side=tk.RIGHT, padx=5)
 
@@ -105,27 +229,236 @@ class CanBusApp:
         self.toggle_periodic_send_button.config(state=tk.DISABLED) # Disable periodic send button
 
     def display_message(self, msg):
-        # Tkinter UI updates must be done on the main thread.
-        # If this callback is from a different thread (like Notifier's thread),
-        # use master.after to schedule it.
-        # The current implementation of can.Notifier often calls callbacks on its own thread.
-        self.master.after(0, lambda: self._update_message_display(msg))
-
-    def _update_message_display(self, msg):
-        formatted_msg = (
+        # Called on the Notifier thread. Only enqueue here; the GUI drains the queue
+        # on its own refresh tick so the Tk event queue never sees one event per frame.
+        self.bus_stats.on_message(msg)
+        if self.ring is not None:
+            self.ring.append(msg)
+        log_frame = self.is_logging and self.log_filter(msg)
+        if log_frame and self.can_logger.async_mode:
+            self.can_logger.log_message(msg) # Straight to the writer thread, independent of GUI speed
+            log_frame = False
+        show = self.display_filter(msg)
+        if show and self.table_view_active:
+            self._update_id_view_state(msg)
+            show = False # The table reads the state, not the queue
+        if not show and not log_frame:
+            return # Neither shown nor (synchronously) logged, so it never reaches the GUI thread
+        if len(self.rx_queue) == RX_QUEUE_SIZE:
+            self.frames_queue_dropped += 1 # Oldest frame is about to be pushed out
+        self.rx_queue.append(msg)
+
+    def _update_id_view_state(self, msg):
+        # Notifier thread: O(1) per frame, no Tk calls
+        key = (msg.arbitration_id, msg.is_extended_id)
+        with self._id_view_lock:
+            state = self._id_view_state.get(key)
+            if state is None:
+                self._id_view_state[key] = [msg, 1, msg.timestamp]
+            else:
+                if msg.data != state[0].data or msg.dlc != state[0].dlc:
+                    state[2] = msg.timestamp
+                state[0] = msg
+                state[1] += 1
+            self._id_view_dirty.add(key)
+            self._id_view_pending += 1
+
+    def _format_message(self, msg):
+        return (
             f"[{msg.timestamp:.4f}] ID: 0x{msg.arbitration_id:03X} "
             f"DLC: {msg.dlc} Data: {msg.data.hex().upper()} "
             f"{'(Extended)' if msg.is_extended_id else ''} "
             f"{'(Remote)' if msg.is_remote_frame else ''} "
             f"{'(Error)' if msg.is_error_frame else ''}\n"
         )
+
+    def _schedule_drain(self):
+        if metrics.enabled:
+            self._next_tick = time.perf_counter() + DISPLAY_REFRESH_MS / 1000.0
+        self.master.after(DISPLAY_REFRESH_MS, self._drain_rx_queue)
+
+    def _drain_rx_queue(self):
+        if metrics.enabled:
+            tick_start = time.perf_counter()
+            if self._next_tick is not None:
+                self._tick_lag_seconds.observe(max(tick_start - self._next_tick, 0.0))
+
+        # Take everything queued since the last tick
+        batch = []
+        try:
+            while True:
+                batch.append(self.rx_queue.popleft())
+        except IndexError:
+            pass
+
+        if batch and self.table_view_active:
+            self._drain_into_table(batch, apply_shown=False)
+        elif batch:
+            self.frames_received += len(batch)
+
+            if self.is_logging and not self.can_logger.async_mode:
+                log_match = self.log_filter.match_id
+                for msg in batch:
+                    if log_match(msg.arbitration_id, msg.is_extended_id):
+                        self.can_logger.log_message(msg)
+            if not self.display_filter.accept_all:
+                # Frames queued only for the synchronous logger
+                display_match = self.display_filter.match_id
+                batch = [msg for msg in batch if display_match(msg.arbitration_id, msg.is_extended_id)]
+
+            # Render only the newest frames; older ones in this batch would scroll off immediately anyway
+            shown = batch[-DISPLAY_MAX_LINES_PER_TICK:]
+            self.frames_display_dropped += len(batch) - len(shown)
+            self.frames_displayed += len(shown)
+            self._append_display_lines("".join(self._format_message(msg) for msg in shown))
+
+        self._update_counters_label()
+        if metrics.enabled:
+            self._drain_seconds.observe(time.perf_counter() - tick_start)
+        self._schedule_drain()
+
+    def _drain_into_table(self, batch, apply_shown):
+        # Table view: queued frames go to the synchronous logger. Frames that pass the display filter were
+        # applied to the table on receive and are counted there, unless they were queued in scroll view
+        # (apply_shown); the rest only count as received.
+        if self.is_logging and not self.can_logger.async_mode:
+            log_match = self.log_filter.match_id
+            for msg in batch:
+                if log_match(msg.arbitration_id, msg.is_extended_id):
+                    self.can_logger.log_message(msg)
+        display_match = self.display_filter.match_id
+        for msg in batch:
+            if not display_match(msg.arbitration_id, msg.is_extended_id):
+                self.frames_received += 1
+            elif apply_shown:
+                self._update_id_view_state(msg)
+
+    def _refresh_id_view(self):
+        # Throttled table refresh: full values for IDs that received frames since the last refresh,
+        # rate only for the others; Tk is touched only for rows whose text actually changes
+        if self.table_view_active:
+            with self._id_view_lock:
+                dirty, self._id_view_dirty = self._id_view_dirty, set()
+                updates = {key: tuple(self._id_view_state[key]) for key in dirty}
+                pending, self._id_view_pending = self._id_view_pending, 0
+            self.frames_received += pending
+            self.frames_displayed += pending
+
+            rates = self.bus_stats.snapshot()['ids'] # Per arbitration ID, like the statistics panel
+            for key, (msg, count, changed) in updates.items():
+                can_id, is_extended = key
+                rate = rates.get(can_id)
+                values = (f"0x{can_id:03X}" + (" (Ext)" if is_extended else ""), msg.dlc,
+                          msg.data.hex(' ').upper() if not msg.is_remote_frame else "(Remote)", count,
+                          f"{rate['rate_hz']:.1f}" if rate is not None else "", f"{changed:.4f}")
+                self._set_id_view_row(key, values)
+            for key, values in list(self._id_view_rows.items()):
+                if key in updates:
+                    continue
+                rate = rates.get(key[0])
+                rate_text = f"{rate['rate_hz']:.1f}" if rate is not None else ""
+                if values[4] != rate_text: # The ID went quiet; its rate decays towards zero
+                    self._set_id_view_row(key, values[:4] + (rate_text,) + values[5:])
+        self.master.after(ID_VIEW_REFRESH_MS, self._refresh_id_view)
+
+    def _set_id_view_row(self, key, values):
+        shown = self._id_view_rows.get(key)
+        if shown == values:
+            return
+        iid = f"{key[0]}:{int(key[1])}"
+        if shown is None:
+            position = bisect.bisect(self._id_view_order, key)
+            self._id_view_order.insert(position, key)
+            self.id_view.insert('', position, iid=iid, values=values)
+        else:
+            self.id_view.item(iid, values=values)
+        self._id_view_rows[key] = values
+
+    def _count_id_view_pending(self):
+        # Frames the table took since its last refresh still count as received and displayed
+        with self._id_view_lock:
+            pending, self._id_view_pending = self._id_view_pending, 0
+        self.frames_received += pending
+        self.frames_displayed += pending
+
+    def _clear_id_view(self):
+        self._count_id_view_pending()
+        with self._id_view_lock:
+            self._id_view_state = {}
+            self._id_view_dirty = set()
+        for iid in self.id_view.get_children():
+            self.id_view.delete(iid)
+        self._id_view_rows = {}
+        self._id_view_order = []
+
+    def toggle_view_mode(self):
+        if self.table_view_active:
+            self.table_view_active = False
+            self._count_id_view_pending()
+            self.id_view_frame.pack_forget()
+            self.message_display.pack(fill='both', expand=True, before=self.view_mode_button)
+            self.view_mode_button.config(text="Table View")
+        else:
+            self._clear_id_view() # Start from a fresh table rather than state left from an earlier session
+            self.table_view_active = True
+            # Frames still queued from scroll view go into the table instead of being lost at the next tick
+            batch = []
+            try:
+                while True:
+                    batch.append(self.rx_queue.popleft())
+            except IndexError:
+                pass
+            self._drain_into_table(batch, apply_shown=True)
+            self.message_display.pack_forget()
+            self.id_view_frame.pack(fill='both', expand=True, before=self.view_mode_button)
+            self.view_mode_button.config(text="Scroll View")
+
+    def _append_display_lines(self, text):
+        # One insert per tick, then trim the oldest lines to keep the widget bounded
         self.message_display.config(state='normal')
-        self.message_display.insert(tk.END, formatted_msg)
+        self.message_display.insert(tk.END, text)
+        line_count = int(self.message_display.index('end-1c').split('.')[0])
+        excess = line_count - DISPLAY_MAX_LINES
+        if excess > 0:
+            self.message_display.delete('1.0', f'{excess + 1}.0')
         self.message_display.see(tk.END) # Auto-scroll to bottom
         self.message_display.config(state='disabled')
 
-        if self.is_logging:
-            self.can_logger.log_message(msg)
+    def _update_counters_label(self):
+        self.counters_label.config(text=(
+            f"Received: {self.frames_received}  Displayed: {self.frames_displayed}  "
+            f"Display-dropped (logged): {self.frames_display_dropped}  "
+            f"Queue-dropped: {self.frames_queue_dropped}  "
+            f"Filtered: bus {self._bus_filtered_text()}, display {self.display_filter.rejected}, "
+            f"log {self.log_filter.rejected}  "
+            f"Log queue: {self.can_logger.queue_depth} (max {self.can_logger.queue_high_water}, "
+            f"dropped {self.can_logger.frames_dropped})"
+        ))
+
+    def _bus_filtered_text(self):
+        filter_stats = self.can_interface.filter_stats()
+        if filter_stats['mode'] == 'backend':
+            return "in driver"
+        return str(filter_stats['rejected'])
+
+    def _refresh_stats_panel(self):
+        snapshot = self.bus_stats.snapshot()
+        self.stats_summary_label.config(text=(
+            f"Frames: {snapshot['total_frames']}  Rate: {snapshot['frames_per_second']:.0f} frames/s  "
+            f"Bus load: {snapshot['bus_load_percent']:.1f}% of {CAN_BITRATE // 1000} kbps"
+        ))
+
+        busiest = sorted(snapshot['ids'].items(), key=lambda item: item[1]['rate_hz'], reverse=True)
+        lines = [f"{'ID':>10} {'Count':>10} {'Rate Hz':>9} {'Period ms':>10} {'Max ms':>9} {'Jitter ms':>10}"]
+        for can_id, stats in busiest[:STATS_MAX_ROWS]:
+            lines.append(f"{f'0x{can_id:X}':>10} {stats['count']:>10} {stats['rate_hz']:>9.1f} "
+                         f"{stats['mean_period_ms']:>10.3f} {stats['max_period_ms']:>9.3f} {stats['jitter_ms']:>10.3f}")
+        self.stats_display.config(state='normal')
+        self.stats_display.delete('1.0', tk.END)
+        self.stats_display.insert(tk.END, "\n".join(lines))
+        self.stats_display.config(state='disabled')
+
+        self.master.after(STATS_REFRESH_MS, self._refresh_stats_panel)
 
     def toggle_logging(self):
         if not self.is_logging:
@@ -138,6 +471,13 @@ class CanBusApp:
                     print(f"Error removing old log file {self.can_logger.log_file_path}: {e}. Please close any programs using it.")
                     messagebox.showerror("File Error", f"Could not remove old log file: {e}\nPlease ensure it's not open in another program.")
                     return # Don't start logging if old file can't be removed
+            # Its index (if any) describes the removed log
+            stale_index = index_path_for(self.can_logger.log_file_path)
+            if os.path.exists(stale_index):
+                try:
+                    os.remove(stale_index)
+                except OSError as e:
+                    print(f"Error removing old log index {stale_index}: {e}")
 
             self.can_logger._open_file() # Ensure file is open for logging
             if self.can_logger.file_opened:
@@ -174,58 +514,190 @@ class CanBusApp:
         else:
             messagebox.showwarning("Send Warning", "Not connected to CAN bus.")
 
-    def periodic_sender(self):
-        while self.periodic_sender_active and self.can_interface.is_connected:
-            self.send_test_message()
-            time.sleep(0.1) # Send every 100ms (adjust as needed)
+    def _test_payload(self):
+        # Payload generator for the periodic schedule; varies data for better analysis
+        self.message_counter += 1
+        return [(self.message_counter % 256), (self.message_counter + 1) % 256, (self.message_counter + 2) % 256,
+                0x03, 0x04, 0x05, 0x06, 0x07]
 
     def toggle_periodic_send(self):
         if not self.periodic_sender_active:
             if self.can_interface.is_connected:
+                # One deadline-based scheduler thread sends every ID at its own period
+                table = [(can_id, self._test_payload, period) for can_id, period in PERIODIC_SEND_TABLE]
+                if not self.can_interface.start_periodic_schedule(table):
+                    messagebox.showerror("Send Error", "Could not start periodic sending.")
+                    return
                 self.periodic_sender_active = True
-                # Start the periodic sender in a separate daemon thread
-                self.periodic_send_thread = threading.Thread(target=self.periodic_sender, daemon=True)
-                self.periodic_send_thread.start()
                 self.toggle_periodic_send_button.config(text="Stop Periodic Send", bg="orange")
                 self.update_status("Periodic Sending Active", "purple")
             else:
                 messagebox.showwarning("Send Warning", "Connect to CAN bus first to start periodic sending.")
         else:
             self.periodic_sender_active = False
-            # The thread will exit its loop naturally due to the flag becoming False
-            # No need to explicitly join unless you need to wait for it.
+            stats = self.can_interface.stop_periodic_schedule() or {}
+            for index, message_stats in stats.items():
+                print(f"Periodic #{index} 0x{message_stats['arbitration_id']:X}: {message_stats}")
             self.toggle_periodic_send_button.config(text="Start Periodic Send", bg="SystemButtonFace")
             self.update_status("Periodic Sending Stopped", "black")
 
     def run_analysis(self):
+        if self._analysis_future is not None:
+            return # Already running
         # Always stop logging first to ensure all data is written to file
         if self.is_logging:
             self.toggle_logging() 
 
-        if not self.can_analyzer.load_log_data():
+        log_file_path = self.can_analyzer.log_file_path
+        if not os.path.exists(log_file_path):
             messagebox.showerror("Analysis Error", "Failed to load log data. Ensure logging was active and data was captured.")
             return
 
-        # Check if DataFrame is empty after loading
-        if self.can_analyzer.df.empty:
-            messagebox.showinfo("Analysis Info", "No messages found in the log file for analysis.")
+        if self._analysis_executor is None:
+            # 'spawn' so the worker does not inherit the receive/writer threads of this process
+            context = multiprocessing.get_context('spawn')
+            self._analysis_progress = context.Queue()
+            self._analysis_cancel = context.Event()
+            self._analysis_executor = ProcessPoolExecutor(max_workers=1, mp_context=context,
+                                                          initializer=init_analysis_worker,
+                                                          initargs=(self._analysis_progress, self._analysis_cancel))
+        self._analysis_cancel.clear()
+        self._analysis_future = self._analysis_executor.submit(run_analysis_job, log_file_path, 10)
+        self.analyze_button.config(state=tk.DISABLED)
+        self.cancel_analysis_button.config(state=tk.NORMAL)
+        self.analysis_progress_label.config(text="Analyzing... 0%")
+        self.master.after(ANALYSIS_POLL_MS, self._poll_analysis)
+
+    def analyze_recent(self):
+        # Summary of the ring buffer; runs on the Tk thread since it takes milliseconds and needs
+        # neither logging to stop nor a log file
+        if self.ring is None or len(self.ring) == 0:
+            messagebox.showinfo("Analysis Info", "No messages received yet.")
+            return
+        analyzer = CanAnalyzer(self.can_analyzer.log_file_path)
+        analyzer.load_ring_snapshot(self.ring, last_seconds=RING_SNAPSHOT_SECONDS)
+        summary = analyzer.get_message_summary()
+        if summary is None:
+            messagebox.showinfo("Analysis Info", "No messages received in the analyzed window.")
+            return
+        frequency = analyzer.get_message_frequency(10)
+        self.analysis_progress_label.config(text="Analysis done")
+        self._show_analysis_result({
+            'log_file_path': f"last {RING_SNAPSHOT_SECONDS:g} s (ring buffer)",
+            'summary': summary,
+            'frequency': [(str(can_id), int(count)) for can_id, count in frequency.items()],
+        })
+
+    def cancel_analysis(self):
+        if self._analysis_future is not None:
+            self._analysis_cancel.set() # Worker stops at its next chunk
+            self.analysis_progress_label.config(text="Cancelling...")
+
+    def _poll_analysis(self):
+        # Runs on the Tk thread; never blocks on the worker
+        fraction = None
+        try:
+            while True:
+                fraction = self._analysis_progress.get_nowait()
+        except queue.Empty:
+            pass
+        if fraction is not None and not self._analysis_cancel.is_set():
+            self.analysis_progress_label.config(text=f"Analyzing... {fraction * 100:.0f}%")
+
+        future = self._analysis_future
+        if not future.done():
+            self.master.after(ANALYSIS_POLL_MS, self._poll_analysis)
             return
 
-        summary = self.can_analyzer.get_message_summary()
-        if summary:
-            summary_text = "\n--- Log Summary ---\n"
-            for key, value in summary.items():
-                summary_text += f"{key}: {value}\n"
-            messagebox.showinfo("Analysis Summary", summary_text)
-            
-            # Offer to plot only if there's data to plot
-            if messagebox.askyesno("Analysis", "Do you want to see message frequency plot?"):
-                self.can_analyzer.plot_message_frequency()
+        self._analysis_future = None
+        self.analyze_button.config(state=tk.NORMAL)
+        self.cancel_analysis_button.config(state=tk.DISABLED)
+        try:
+            result = future.result()
+        except AnalysisCancelled:
+            self.analysis_progress_label.config(text="Analysis cancelled")
+            return
+        except Exception as e:
+            self.analysis_progress_label.config(text="Analysis failed")
+            messagebox.showerror("Analysis Error", f"Failed to analyze log data: {e}")
+            return
+        if result is None:
+            self.analysis_progress_label.config(text="")
+            messagebox.showinfo("Analysis Info", "No messages found in the log file for analysis.")
+            return
+        self.analysis_progress_label.config(text="Analysis done")
+        self._show_analysis_result(result)
+
+    def _create_analysis_window(self):
+        self.analysis_window = tk.Toplevel(self.master)
+        self.analysis_window.title("Log Analysis")
+        # Closing only hides the window so the figure and canvas are reused next time
+        self.analysis_window.protocol("WM_DELETE_WINDOW", self.analysis_window.withdraw)
+
+        self.analysis_summary_text = tk.Text(self.analysis_window, width=80, height=10, state='disabled',
+                                             font=('Courier', 9))
+        self.analysis_summary_text.pack(fill='x', padx=10, pady=5)
+
+        self.analysis_figure = Figure(figsize=(8, 4))
+        self.analysis_axes = self.analysis_figure.add_subplot(111)
+        self.analysis_canvas = FigureCanvasTkAgg(self.analysis_figure, master=self.analysis_window)
+        self.analysis_canvas.get_tk_widget().pack(fill='both', expand=True)
+
+    def _show_analysis_result(self, result):
+        if self.analysis_window is None:
+            self._create_analysis_window()
+
+        summary_text = f"--- Log Summary: {result['log_file_path']} ---\n"
+        for key, value in result['summary'].items():
+            summary_text += f"{key}: {value}\n"
+        self.analysis_summary_text.config(state='normal')
+        self.analysis_summary_text.delete('1.0', tk.END)
+        self.analysis_summary_text.insert(tk.END, summary_text)
+        self.analysis_summary_text.config(state='disabled')
+
+        # Redraw the existing axes in place
+        ids = [can_id for can_id, _ in result['frequency']]
+        counts = [count for _, count in result['frequency']]
+        axes = self.analysis_axes
+        axes.clear()
+        axes.bar(range(len(ids)), counts)
+        axes.set_xticks(range(len(ids)))
+        axes.set_xticklabels(ids, rotation=45, ha='right')
+        axes.set_title(f'Top {len(ids)} Most Frequent CAN IDs')
+        axes.set_xlabel('CAN ID')
+        axes.set_ylabel('Frequency')
+        self.analysis_figure.tight_layout()
+        self.analysis_canvas.draw_idle()
+        self.analysis_window.deiconify()
+        self.analysis_window.lift()
+
+    def _add_counter_sources(self):
+        return [
+            metrics.counter_function('can_gui_frames_received_total', 'Frames taken off the rx queue',
+                                     lambda: self.frames_received),
+            metrics.counter_function('can_gui_frames_displayed_total', 'Frames rendered', lambda: self.frames_displayed),
+            metrics.counter_function('can_gui_frames_display_dropped_total',
+                                     'Frames skipped by the display (still logged)', lambda: self.frames_display_dropped),
+            metrics.counter_function('can_gui_frames_queue_dropped_total', 'Frames lost to rx queue overflow',
+                                     lambda: self.frames_queue_dropped),
+        ]
 
     def clear_display(self):
         self.message_display.config(state='normal')
         self.message_display.delete(1.0, tk.END)
         self.message_display.config(state='disabled')
+        self._clear_id_view()
+        for source in self._metric_sources:
+            source.remove() # Keeps the counts so far in the metric totals
+        self.frames_received = 0
+        self.frames_displayed = 0
+        self.frames_display_dropped = 0
+        self.frames_queue_dropped = 0
+        self.display_filter.passed = self.display_filter.rejected = 0
+        self.log_filter.passed = self.log_filter.rejected = 0
+        self._metric_sources = self._add_counter_sources()
+        self._update_counters_label()
+        self.bus_stats.reset()
 
 
     def on_closing(self):
@@ -235,6 +707,11 @@ class CanBusApp:
         if self.is_logging:
             self.toggle_logging() # Ensure log file is closed
         self.can_interface.disconnect()
+        if self._analysis_executor is not None:
+            if self._analysis_future is not None:
+                self._analysis_cancel.set()
+            self._analysis_executor.shutdown(wait=True)
+        metrics.stop()
         self.master.destroy() # Destroy the Tkinter window
 
 if __name__ == "__main__":